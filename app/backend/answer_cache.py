@@ -0,0 +1,328 @@
+# app/backend/answer_cache.py
+"""
+Semantic cache for ChatBot.retrieve_grounded_info. A grounded Vertex AI Search
+generation takes seconds; a paraphrase of a question answered a minute ago
+("what interest do you pay on savings?" / "savings account interest rate?")
+gets the stored answer and grounding context instead.
+
+Queries are accent-folded, stripped of stop words and embedded locally (hashed
+word and character 4-gram features); the nearest cached question in the same
+language is a hit when its cosine similarity reaches ANSWER_CACHE_THRESHOLD.
+Entries expire after ANSWER_CACHE_TTL seconds and the least recently used go
+beyond ANSWER_CACHE_SIZE. Questions that carry personal details are never
+stored. After the data store is re-indexed:
+
+    python -m app.backend.answer_cache invalidate
+
+bumps the version file every process checks, so cached answers are dropped.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import CACHE_DIR
+from .dialog.policy import IDENTITY, extract
+from .intents import STOPWORDS, TOKEN_RE, char_grams, fold, token_lang
+from .rag import Embedder, hash_feature, load_embedder
+
+logger = logging.getLogger("uvicorn")
+
+# Cosine similarity a cached question needs to answer a new one; above 1 disables the cache.
+THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.8"))
+MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+TTL_S = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+EMBEDDER = os.getenv("ANSWER_CACHE_EMBEDDER", "chargram")
+DIM = int(os.getenv("ANSWER_CACHE_DIM", "512"))
+# Rewritten by `invalidate`; its content is the data store version every process compares against.
+VERSION_PATH = Path(os.getenv("ANSWER_CACHE_VERSION_PATH", CACHE_DIR / "answer_cache.version"))
+VERSION_CHECK_S = 5.0
+
+# Answers to these are about one customer, not about the bank.
+PERSONAL_SLOTS = frozenset(IDENTITY + ("email", "phone", "address"))
+
+HISTOGRAM_BINS = 20
+
+
+def normalize(text: str) -> Tuple[str, List[str]]:
+    """(language, content tokens) of a query: folded, stop words of its language dropped."""
+    tokens = TOKEN_RE.findall(fold(text))
+    lang = token_lang(tokens)
+    stop = STOPWORDS[lang]
+    return lang, [token for token in tokens if token not in stop]
+
+
+class CharGramEmbedder:
+    """
+    Signed hashing of content words and their character 4-grams, so inflections
+    and compounds ("spaarrekening" / "spaarrekeningen") still land close.
+    """
+
+    name = "chargram"
+
+    def __init__(self, dim: int = DIM) -> None:
+        self.dim = dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = text.split()
+            features: Counter = Counter(tokens)
+            for token in tokens:
+                features.update(char_grams(token))
+            for feature, count in features.items():
+                bucket, sign = hash_feature(feature, self.dim)
+                out[row, bucket] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+def get_embedder(spec: str = EMBEDDER, dim: int = DIM) -> Embedder:
+    return CharGramEmbedder(dim) if spec == CharGramEmbedder.name else load_embedder(spec, dim)
+
+
+@dataclass
+class CachedAnswer:
+    key: Tuple[str, str]                 # (language, normalized question)
+    question: str
+    answer: str
+    context: str
+    vector: np.ndarray
+    created_at: float
+
+
+@dataclass(frozen=True)
+class CacheHit:
+    answer: str
+    context: str
+    question: str
+    similarity: float
+
+
+class SemanticAnswerCache:
+    """Thread-safe LRU + TTL of grounded answers, searched per language by embedding."""
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        threshold: float = THRESHOLD,
+        maxsize: int = MAX_ENTRIES,
+        ttl_s: float = TTL_S,
+        version_path: Optional[Path] = VERSION_PATH,
+    ) -> None:
+        self.embedder = embedder or get_embedder()
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.version_path = version_path
+        self._entries: "OrderedDict[Tuple[str, str], CachedAnswer]" = OrderedDict()
+        # lang -> (keys, stacked vectors), rebuilt after the entries of that language change.
+        self._matrices: Dict[str, Tuple[List[Tuple[str, str]], np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._version_checked = 0.0
+        self.counts: Dict[str, int] = {"hits": 0, "misses": 0, "exact_hits": 0, "stored": 0, "skipped_personal": 0,
+                                       "expired": 0, "evicted": 0, "invalidations": 0}
+        self.per_lang: Dict[str, Dict[str, int]] = {}
+        self.histogram = [0] * HISTOGRAM_BINS
+        self.recent: Deque[float] = deque(maxlen=1000)
+
+    # ---------------- Lookup ----------------
+    @staticmethod
+    def _key(query: str) -> Tuple[str, str]:
+        lang, tokens = normalize(query)
+        return lang, " ".join(tokens)
+
+    def get(self, query: str) -> Optional[CacheHit]:
+        """The cached answer to ``query`` or a paraphrase of it, None on a miss."""
+        if self.threshold > 1.0:
+            return None
+        lang, text = self._key(query)
+        if not text:
+            return None
+        self._check_version()
+        vector = None
+        with self._lock:
+            exact = self._live(lang, text)
+        if exact is None:
+            vector = self.embedder.embed([text])[0]
+        with self._lock:
+            if exact is not None:
+                entry, similarity = exact, 1.0
+            else:
+                entry, similarity = self._nearest(lang, vector)
+            hit = entry is not None and similarity >= self.threshold
+            self._record(lang, similarity if entry is not None else None, hit, exact is not None)
+            if not hit:
+                return None
+            self._entries.move_to_end(entry.key)
+            return CacheHit(entry.answer, entry.context, entry.question, round(float(similarity), 4))
+
+    def _live(self, lang: str, text: str) -> Optional[CachedAnswer]:
+        entry = self._entries.get((lang, text))
+        if entry is not None and time.time() - entry.created_at > self.ttl_s:
+            self._drop((lang, text), "expired")
+            return None
+        return entry
+
+    def _nearest(self, lang: str, vector: np.ndarray) -> Tuple[Optional[CachedAnswer], float]:
+        now = time.time()
+        while True:
+            keys, matrix = self._matrix(lang)
+            if not keys:
+                return None, 0.0
+            sims = matrix @ vector
+            best = int(np.argmax(sims))
+            entry = self._entries[keys[best]]
+            if now - entry.created_at <= self.ttl_s:
+                return entry, float(sims[best])
+            self._drop(keys[best], "expired")
+
+    def _matrix(self, lang: str) -> Tuple[List[Tuple[str, str]], np.ndarray]:
+        cached = self._matrices.get(lang)
+        if cached is None:
+            keys = [key for key in self._entries if key[0] == lang]
+            matrix = np.stack([self._entries[key].vector for key in keys]) if keys else np.zeros((0, 0), np.float32)
+            cached = self._matrices[lang] = (keys, matrix)
+        return cached
+
+    # ---------------- Store ----------------
+    def put(self, query: str, answer: str, context: str) -> bool:
+        """Cache a complete grounded answer; False when it isn't stored."""
+        if self.threshold > 1.0 or not answer.strip():
+            return False
+        lang, text = self._key(query)
+        if not text:
+            return False
+        if PERSONAL_SLOTS.intersection(extract(query)):
+            with self._lock:
+                self.counts["skipped_personal"] += 1
+            return False
+        self._check_version()
+        vector = self.embedder.embed([text])[0]
+        with self._lock:
+            key = (lang, text)
+            self._entries[key] = CachedAnswer(key, query, answer, context, vector, time.time())
+            self._entries.move_to_end(key)
+            self._matrices.pop(lang, None)
+            self.counts["stored"] += 1
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)), "evicted")
+        return True
+
+    def _drop(self, key: Tuple[str, str], reason: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            self._matrices.pop(key[0], None)
+            self.counts[reason] += 1
+
+    # ---------------- Invalidation ----------------
+    def invalidate(self) -> int:
+        """Drop every entry (the data store behind the answers changed); returns how many."""
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._matrices.clear()
+            self.counts["invalidations"] += 1
+        logger.info(f"ANSWER CACHE: invalidated, {dropped} answers dropped")
+        return dropped
+
+    def _check_version(self) -> None:
+        # One stat every VERSION_CHECK_S at most; a changed version file empties the cache.
+        if self.version_path is None or time.monotonic() - self._version_checked < VERSION_CHECK_S:
+            return
+        self._version_checked = time.monotonic()
+        version = read_version(self.version_path)
+        if self._version is None:
+            self._version = version
+        elif version != self._version:
+            self._version = version
+            self.invalidate()
+
+    # ---------------- Stats ----------------
+    def _record(self, lang: str, similarity: Optional[float], hit: bool, exact: bool) -> None:
+        self.counts["hits" if hit else "misses"] += 1
+        if exact:
+            self.counts["exact_hits"] += 1
+        lang_counts = self.per_lang.setdefault(lang, {"hits": 0, "misses": 0})
+        lang_counts["hits" if hit else "misses"] += 1
+        if similarity is not None:
+            self.histogram[min(int(max(similarity, 0.0) * HISTOGRAM_BINS), HISTOGRAM_BINS - 1)] += 1
+            self.recent.append(similarity)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Hit rates overall and per language, plus the best-match similarity of recent lookups."""
+        with self._lock:
+            lookups = self.counts["hits"] + self.counts["misses"]
+            recent = np.asarray(self.recent, dtype=np.float32)
+            return {
+                **self.counts,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl_s,
+                "threshold": self.threshold,
+                "hit_rate": round(self.counts["hits"] / lookups, 4) if lookups else 0.0,
+                "per_lang": {
+                    lang: {**c, "hit_rate": round(c["hits"] / (c["hits"] + c["misses"]), 4)}
+                    for lang, c in sorted(self.per_lang.items())
+                },
+                "similarity_p50": round(float(np.percentile(recent, 50)), 4) if recent.size else None,
+                "similarity_p90": round(float(np.percentile(recent, 90)), 4) if recent.size else None,
+                # Lower bin edge -> lookups whose best cached question scored in [edge, edge + 0.05).
+                "similarity_histogram": {
+                    f"{i / HISTOGRAM_BINS:.2f}": n for i, n in enumerate(self.histogram) if n
+                },
+            }
+
+
+def read_version(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+
+
+def bump_version(path: Path = VERSION_PATH) -> str:
+    version = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(version, encoding="utf-8")
+    os.replace(tmp, path)
+    return version
+
+
+@lru_cache(maxsize=1)
+def get_answer_cache() -> SemanticAnswerCache:
+    return SemanticAnswerCache()
+
+
+def _main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the semantic answer cache of the grounded search.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("invalidate", help="Drop cached answers in every process (run after re-indexing the data store).")
+    sub.add_parser("version", help="Print the current data store version.")
+    args = parser.parse_args(argv)
+
+    if args.command == "invalidate":
+        print(f"answer cache version -> {bump_version(VERSION_PATH)} ({VERSION_PATH})")
+    if args.command == "version":
+        print(read_version(VERSION_PATH) or "(none)")
+
+
+if __name__ == "__main__":
+    _main()
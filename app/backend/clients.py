@@ -0,0 +1,313 @@
+# app/backend/clients.py
+"""
+Long-lived Google Speech / Text-to-Speech clients shared by every request.
+
+The registry is started in the FastAPI lifespan hook: credentials are resolved
+once, each backend gets a small pool of clients (one gRPC channel each), and
+callers borrow the least busy client through ``acquire()``, which also caps
+the RPCs in flight per channel. ``set_registry`` swaps in fakes for tests.
+Async handlers use the ``*_async`` clients behind ``limits``: one semaphore
+per backend, so a slow dependency only queues its own callers.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger("uvicorn")
+
+CHANNELS = int(os.getenv("GOOGLE_CLIENT_CHANNELS", 2))
+MAX_IN_FLIGHT = int(os.getenv("GOOGLE_MAX_IN_FLIGHT", 50))
+ACQUIRE_TIMEOUT_S = float(os.getenv("GOOGLE_ACQUIRE_TIMEOUT_S", 30))
+
+# A local subchannel pool gives every channel its own connection; grpc otherwise
+# dedupes identical channels onto one HTTP/2 connection and its stream limit.
+CHANNEL_OPTIONS = [
+    ("grpc.use_local_subchannel_pool", 1),
+    ("grpc.keepalive_time_ms", 30_000),
+    ("grpc.max_send_message_length", -1),
+    ("grpc.max_receive_message_length", -1),
+]
+
+ClientFactory = Callable[[Any], Any]
+
+
+# ---------------- Default factories ----------------
+def google_credentials() -> Any:
+    import google.auth
+
+    credentials, _ = google.auth.default(scopes=["https://www.googleapis.com/auth/cloud-platform"])
+    return credentials
+
+
+def speech_client(credentials: Any) -> Any:
+    from google.cloud import speech
+    from google.cloud.speech_v1.services.speech.transports import SpeechGrpcTransport
+
+    channel = SpeechGrpcTransport.create_channel(credentials=credentials, options=CHANNEL_OPTIONS)
+    return speech.SpeechClient(transport=SpeechGrpcTransport(channel=channel))
+
+
+def tts_client(credentials: Any) -> Any:
+    from google.cloud import texttospeech
+    from google.cloud.texttospeech_v1.services.text_to_speech.transports import TextToSpeechGrpcTransport
+
+    channel = TextToSpeechGrpcTransport.create_channel(credentials=credentials, options=CHANNEL_OPTIONS)
+    return texttospeech.TextToSpeechClient(transport=TextToSpeechGrpcTransport(channel=channel))
+
+
+def speech_async_client(credentials: Any) -> Any:
+    from google.cloud import speech
+    from google.cloud.speech_v1.services.speech.transports import SpeechGrpcAsyncIOTransport
+
+    channel = SpeechGrpcAsyncIOTransport.create_channel(credentials=credentials, options=CHANNEL_OPTIONS)
+    return speech.SpeechAsyncClient(transport=SpeechGrpcAsyncIOTransport(channel=channel))
+
+
+def tts_async_client(credentials: Any) -> Any:
+    from google.cloud import texttospeech
+    from google.cloud.texttospeech_v1.services.text_to_speech.transports import (
+        TextToSpeechGrpcAsyncIOTransport,
+    )
+
+    channel = TextToSpeechGrpcAsyncIOTransport.create_channel(credentials=credentials, options=CHANNEL_OPTIONS)
+    return texttospeech.TextToSpeechAsyncClient(transport=TextToSpeechGrpcAsyncIOTransport(channel=channel))
+
+
+# grpc.aio channels bind to the running loop: the *_async pools must be started from it.
+DEFAULT_FACTORIES: Dict[str, ClientFactory] = {
+    "speech": speech_client,
+    "tts": tts_client,
+    "speech_async": speech_async_client,
+    "tts_async": tts_async_client,
+}
+
+
+def close_client(client: Any) -> Optional[Awaitable]:
+    """Close the client's transport; asyncio transports return an awaitable."""
+    transport = getattr(client, "transport", None)
+    closer = getattr(transport, "close", None) or getattr(client, "close", None)
+    if closer is not None:
+        result = closer()
+        if inspect.isawaitable(result):
+            return result
+    return None
+
+
+# ---------------- Pool ----------------
+class ChannelPool:
+    """``size`` clients of one kind, at most ``max_in_flight`` concurrent RPCs each."""
+
+    def __init__(self, name: str, clients: List[Any], max_in_flight: int = MAX_IN_FLIGHT) -> None:
+        if not clients:
+            raise ValueError(f"ChannelPool {name!r} needs at least one client")
+        self.name = name
+        self.clients = clients
+        self.max_in_flight = max_in_flight
+        self._in_flight = [0] * len(clients)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.calls = 0
+        self.waits = 0
+        self.peak_in_flight = 0
+
+    @classmethod
+    def create(
+        cls, name: str, factory: ClientFactory, credentials: Any, size: int = CHANNELS,
+        max_in_flight: int = MAX_IN_FLIGHT,
+    ) -> "ChannelPool":
+        return cls(name, [factory(credentials) for _ in range(max(1, size))], max_in_flight)
+
+    def _free_slot(self) -> Optional[int]:
+        slot = min(range(len(self.clients)), key=self._in_flight.__getitem__)
+        return slot if self._in_flight[slot] < self.max_in_flight else None
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = ACQUIRE_TIMEOUT_S) -> Iterator[Any]:
+        """Borrow the least busy client; blocks while every channel is at its cap."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            slot = self._free_slot()
+            if slot is None:
+                self.waits += 1
+            while slot is None and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"{self.name}: all {len(self.clients)} channels busy")
+                self._cond.wait(remaining)
+                slot = self._free_slot()
+            if self._closed:
+                raise RuntimeError(f"{self.name}: client pool is closed")
+            self._in_flight[slot] += 1
+            self.calls += 1
+            self.peak_in_flight = max(self.peak_in_flight, sum(self._in_flight))
+        try:
+            yield self.clients[slot]
+        finally:
+            with self._cond:
+                self._in_flight[slot] -= 1
+                self._cond.notify()
+
+    def close(self) -> List[Awaitable]:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        pending = []
+        for client in self.clients:
+            try:
+                result = close_client(client)
+            except Exception:
+                logger.exception(f"CLIENTS: closing {self.name} channel failed")
+                continue
+            if result is not None:
+                pending.append(result)
+        return pending
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "channels": len(self.clients),
+                "max_in_flight": self.max_in_flight,
+                "in_flight": sum(self._in_flight),
+                "peak_in_flight": self.peak_in_flight,
+                "calls": self.calls,
+                "waits": self.waits,
+            }
+
+
+# ---------------- Registry ----------------
+class ClientRegistry:
+    """
+    One ChannelPool per backend name. Pools are built by ``start()`` (lifespan)
+    or lazily on first use, so scripts that never run the app still work.
+    """
+
+    def __init__(
+        self,
+        factories: Optional[Dict[str, ClientFactory]] = None,
+        credentials: Optional[Callable[[], Any]] = google_credentials,
+        size: int = CHANNELS,
+        max_in_flight: int = MAX_IN_FLIGHT,
+    ) -> None:
+        self.factories = dict(DEFAULT_FACTORIES if factories is None else factories)
+        self._credentials_fn = credentials
+        self.size = size
+        self.max_in_flight = max_in_flight
+        self._credentials: Any = None
+        self._pools: Dict[str, ChannelPool] = {}
+        self._lock = threading.Lock()
+
+    def _start_pool(self, name: str, credentials: Any) -> ChannelPool:
+        started = time.perf_counter()
+        pool = ChannelPool.create(name, self.factories[name], credentials, self.size, self.max_in_flight)
+        logger.info(
+            f"CLIENTS: {name} ready, {len(pool.clients)} channels in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return pool
+
+    def start(self, names: Optional[Iterable[str]] = None) -> "ClientRegistry":
+        with self._lock:
+            wanted = self.factories if names is None else names
+            missing = [name for name in wanted if name not in self._pools]
+            if missing:
+                if self._credentials is None and self._credentials_fn is not None:
+                    self._credentials = self._credentials_fn()
+                for name in missing:
+                    self._pools[name] = self._start_pool(name, self._credentials)
+        return self
+
+    def pool(self, name: str) -> ChannelPool:
+        pool = self._pools.get(name)
+        if pool is None:
+            self.start([name])
+            pool = self._pools[name]
+        return pool
+
+    def acquire(self, name: str, timeout: Optional[float] = ACQUIRE_TIMEOUT_S):
+        return self.pool(name).acquire(timeout)
+
+    def close(self) -> List[Awaitable]:
+        """Close every channel; returns the awaitables of asyncio transports (see aclose)."""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        return [pending for pool in pools.values() for pending in pool.close()]
+
+    async def aclose(self) -> None:
+        for pending in self.close():
+            await pending
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        return {name: pool.snapshot() for name, pool in list(self._pools.items())}
+
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ClientRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry()
+        return _registry
+
+
+def set_registry(registry: Optional[ClientRegistry]) -> Optional[ClientRegistry]:
+    """Install ``registry`` (e.g. one built from fakes) and return the previous one."""
+    global _registry
+    with _registry_lock:
+        previous, _registry = _registry, registry
+    return previous
+
+
+# ---------------- Per-backend concurrency ----------------
+BACKEND_CONCURRENCY = {
+    "speech": int(os.getenv("SPEECH_MAX_CONCURRENCY", 64)),
+    # Streams hold a slot for a whole utterance; kept apart so they can't starve /stt.
+    # speech + speech_stream share the speech_async pool and must fit its capacity.
+    "speech_stream": int(os.getenv("SPEECH_STREAM_MAX_CONCURRENCY", 32)),
+    "tts": int(os.getenv("TTS_MAX_CONCURRENCY", 64)),
+    "llm": int(os.getenv("LLM_MAX_CONCURRENCY", 32)),
+}
+
+
+class BackendLimits:
+    """
+    asyncio semaphores keyed by backend. Each limit should stay at or below the
+    backend's pool capacity (channels x max in flight) so acquire() never waits.
+    """
+
+    def __init__(self, limits: Dict[str, int]) -> None:
+        self.limits = dict(limits)
+        self.reset()
+
+    def reset(self) -> None:
+        # Semaphores bind to the loop that first waits on them; fresh ones per app start.
+        self._semaphores = {name: asyncio.Semaphore(limit) for name, limit in self.limits.items()}
+        self._stats = {name: {"in_flight": 0, "peak_in_flight": 0, "calls": 0, "waits": 0} for name in self.limits}
+
+    @asynccontextmanager
+    async def slot(self, name: str) -> AsyncIterator[None]:
+        semaphore, stats = self._semaphores[name], self._stats[name]
+        if semaphore.locked():
+            stats["waits"] += 1
+        async with semaphore:
+            stats["calls"] += 1
+            stats["in_flight"] += 1
+            stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+            try:
+                yield
+            finally:
+                stats["in_flight"] -= 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        return {name: {"limit": self.limits[name], **stats} for name, stats in self._stats.items()}
+
+
+limits = BackendLimits(BACKEND_CONCURRENCY)
@@ -44,4 +44,29 @@ def default_data_directory() -> Path:
     )
 
 
-DATA_DIR = default_data_directory()
\ No newline at end of file
+def default_chunks_directory() -> Path:
+    """
+    Return the directory containing the scraped website chunks.
+    CHUNKS_ROOT wins when it exists; otherwise fall back to ../data/chunks so
+    local runs work without the container layout.
+    """
+    candidates: List[Path] = []
+    env_dir = os.getenv("CHUNKS_ROOT")
+    if env_dir:
+        candidates.append(Path(env_dir).expanduser().resolve())
+    candidates.append(PACKAGE_ROOT.parent / "data" / "chunks")
+    for candidate in candidates:
+        if candidate.is_dir():
+            return candidate
+    return candidates[0]
+
+
+CACHE_DIR = Path(os.getenv("CACHE_DIR", PACKAGE_ROOT.parent / "cache")).expanduser()
+
+
+def __getattr__(name: str):
+    # DATA_DIR is resolved on first access (the data store), not as an import side effect.
+    if name == "DATA_DIR":
+        value = globals()["DATA_DIR"] = default_data_directory()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
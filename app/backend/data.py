@@ -2,15 +2,16 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from decimal import Decimal, InvalidOperation
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Iterable, Optional
+from typing import Dict, Iterable, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
-from .config import DATA_DIR
+from . import config
 
 
 ACCOUNT_TYPE_KEYWORDS: Dict[str, Iterable[str]] = {
@@ -47,6 +48,34 @@ def _normalize_phone(raw: str) -> str:
         return candidate
 
 
+@dataclass(frozen=True)
+class CustomerRows:
+    """
+    Contiguous row range of each customer in a frame sorted by customer_id:
+    the rows of ``keys[i]`` are ``offsets[i]:offsets[i + 1]``.
+    """
+
+    keys: np.ndarray
+    offsets: np.ndarray
+
+    @classmethod
+    def sort(cls, frame: pd.DataFrame) -> Tuple[pd.DataFrame, "CustomerRows"]:
+        # Stable, so each customer's rows keep the order they were loaded in.
+        frame = frame.sort_values("customer_id", kind="stable", na_position="last")
+        # Rows without a customer (transactions on an unknown product) sort last and are left out of the keys.
+        values = frame["customer_id"].to_numpy()[: int(frame["customer_id"].notna().sum())]
+        if len(values) == 0:
+            return frame, cls(values, np.zeros(1, dtype=np.int64))
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        return frame, cls(values[starts], np.append(starts, len(values)))
+
+    def rows(self, frame: pd.DataFrame, customer_id) -> pd.DataFrame:
+        i = int(np.searchsorted(self.keys, customer_id))
+        if i == len(self.keys) or self.keys[i] != customer_id:
+            return frame.iloc[0:0]
+        return frame.iloc[self.offsets[i]:self.offsets[i + 1]]
+
+
 @dataclass
 class DataStore:
     customers: pd.DataFrame
@@ -54,6 +83,15 @@ class DataStore:
     products_closed: pd.DataFrame
     transactions: pd.DataFrame
     product_balances: Dict[str, float]
+    products_rows: CustomerRows = field(init=False, repr=False)
+    products_closed_rows: CustomerRows = field(init=False, repr=False)
+    transactions_rows: CustomerRows = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # Sorted by customer once here, so per-customer lookups are slices rather than full-column scans.
+        self.products, self.products_rows = CustomerRows.sort(self.products)
+        self.products_closed, self.products_closed_rows = CustomerRows.sort(self.products_closed)
+        self.transactions, self.transactions_rows = CustomerRows.sort(self.transactions)
 
     @classmethod
     def from_directory(cls, data_dir: Path) -> "DataStore":
@@ -216,10 +254,10 @@ class DataStore:
         self, customer_id: str, account_type: Optional[str] = None
     ) -> pd.DataFrame:
         self.ensure_customer_exists(customer_id)
-        df = self.products[self.products["customer_id"] == customer_id].copy()
+        df = self.products_rows.rows(self.products, customer_id)
         if df.empty:
             return df
-        df["account_type"] = df["product_type"].apply(self.infer_account_type)
+        df = df.assign(account_type=df["product_type"].apply(self.infer_account_type))
         df = df[~df["status"].str.lower().str.contains("closed")]
         if account_type:
             df = df[df["account_type"] == account_type]
@@ -228,14 +266,14 @@ class DataStore:
 
     def list_all_products(self, customer_id: str) -> pd.DataFrame:
         self.ensure_customer_exists(customer_id)
-        combined = pd.concat(
-            [self.products, self.products_closed],
+        filtered = pd.concat(
+            [
+                self.products_rows.rows(self.products, customer_id),
+                self.products_closed_rows.rows(self.products_closed, customer_id),
+            ],
             ignore_index=True,
         )
         columns = ["product_id", "product_type", "product_name", "status"]
-        if combined.empty:
-            return pd.DataFrame(columns=columns)
-        filtered = combined[combined["customer_id"] == customer_id]
         if filtered.empty:
             return pd.DataFrame(columns=columns)
         return (
@@ -275,7 +313,7 @@ class DataStore:
         min_amount: Optional[float],
     ) -> pd.DataFrame:
         self.ensure_customer_exists(customer_id)
-        df = self.transactions[self.transactions["customer_id"] == customer_id].copy()
+        df = self.transactions_rows.rows(self.transactions, customer_id)
         if merchant:
             pattern = merchant.lower()
             df = df[df["normalized_merchant"].str.contains(pattern)]
@@ -285,17 +323,17 @@ class DataStore:
             df = df[df["date"] <= date_to]
         if min_amount is not None:
             df = df[df["amount"].abs() >= min_amount]
-        df.sort_values("date", ascending=False, inplace=True)
+        df = df.sort_values("date", ascending=False)
         if n is not None:
             df = df.head(n)
         return df
 
     def list_card_products(self, customer_id: str) -> pd.DataFrame:
         self.ensure_customer_exists(customer_id)
-        df = self.products[self.products["customer_id"] == customer_id].copy()
-        df["is_card"] = df["product_type"].str.lower().apply(
+        df = self.products_rows.rows(self.products, customer_id)
+        df = df.assign(is_card=df["product_type"].str.lower().apply(
             lambda value: any(keyword in value for keyword in CARD_KEYWORDS)
-        )
+        ))
         return df[df["is_card"]]
 
     def get_customer_snapshot(self, customer_id: str) -> Dict[str, str]:
@@ -313,4 +351,4 @@ class DataStore:
 
 @lru_cache(maxsize=1)
 def get_data_store() -> DataStore:
-    return DataStore.from_directory(DATA_DIR)
\ No newline at end of file
+    return DataStore.from_directory(config.DATA_DIR)
\ No newline at end of file
@@ -0,0 +1,2 @@
+# app/backend/dialog/__init__.py
+# Marks the dialog directory as a Python subpackage
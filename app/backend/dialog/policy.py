@@ -0,0 +1,340 @@
+# app/backend/dialog/policy.py
+"""
+Deterministic slot filling for the transactional intents. Each intent maps to
+the request model of its /intent/* API (schemas.py); what the customer still
+has to provide is whatever that model (and the identity lookup that yields
+``customer_id``) fails to validate on. Values are pulled from each reply with
+local extractors, merged with any the LLM extracted in the same turn, and
+completeness is decided here: no extra model call per turn.
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from enum import Enum
+from typing import Dict, List, Optional, Tuple, Type, get_args
+
+from pydantic import BaseModel, ValidationError
+
+from ..intents import AUTH_QUESTIONS, detect_lang, fold
+from ..schemas import (
+    BalanceRequest,
+    CardUpdateRequest,
+    ContactUpdateRequest,
+    CustomerLookupRequest,
+    TransactionsFilterRequest,
+)
+
+# Slots the customer gives to identify; CustomerLookupRequest turns them into customer_id.
+IDENTITY = ("name", "birthdate")
+
+
+@dataclass(frozen=True)
+class IntentSpec:
+    api: str
+    request: Type[BaseModel]
+    needs_customer: bool = True
+    one_of: Tuple[str, ...] = ()         # at least one of these must be given
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return tuple(name for name in self.request.model_fields if name != "customer_id")
+
+    @property
+    def slots(self) -> Tuple[str, ...]:
+        return (IDENTITY if self.needs_customer else ()) + self.fields
+
+
+SPECS: Dict[str, IntentSpec] = {
+    "Query for their account balance": IntentSpec("/intent/balances.get", BalanceRequest),
+    "Update customer information": IntentSpec(
+        "/intent/contact.update", ContactUpdateRequest, one_of=("email", "phone", "address")
+    ),
+    "Query for details about their existing product": IntentSpec(
+        "/intent/customer.lookup", CustomerLookupRequest, needs_customer=False
+    ),
+    "Query for details about their transactions": IntentSpec("/intent/transactions.filter", TransactionsFilterRequest),
+    "Block or unblock or card": IntentSpec("/intent/card.update", CardUpdateRequest),
+}
+
+QUESTIONS: Dict[str, Dict[str, str]] = {
+    "identity": AUTH_QUESTIONS,
+    "name": {
+        "en": "What is your full name?",
+        "fr": "Quel est votre nom complet ?",
+        "nl": "Wat is uw volledige naam?",
+    },
+    "birthdate": {
+        "en": "What is your date of birth?",
+        "fr": "Quelle est votre date de naissance ?",
+        "nl": "Wat is uw geboortedatum?",
+    },
+    "action": {
+        "en": "Would you like to block or unblock your card?",
+        "fr": "Voulez-vous bloquer ou débloquer votre carte ?",
+        "nl": "Wilt u uw kaart blokkeren of deblokkeren?",
+    },
+    "contact": {
+        "en": "What would you like to update: your email address, phone number or address, and what is the new value?",
+        "fr": "Que souhaitez-vous modifier : votre adresse e-mail, votre numéro de téléphone ou votre adresse, et quelle est la nouvelle valeur ?",
+        "nl": "Wat wilt u wijzigen: uw e-mailadres, telefoonnummer of adres, en wat is de nieuwe waarde?",
+    },
+}
+
+
+# ---------------- Extraction ----------------
+MONTHS = {
+    name: number
+    for number, names in enumerate(
+        [
+            ("january", "janvier", "januari", "jan"),
+            ("february", "fevrier", "februari", "feb"),
+            ("march", "mars", "maart", "mar"),
+            ("april", "avril", "apr"),
+            ("may", "mai", "mei"),
+            ("june", "juin", "juni", "jun"),
+            ("july", "juillet", "juli", "jul"),
+            ("august", "aout", "augustus", "aug"),
+            ("september", "septembre", "sep", "sept"),
+            ("october", "octobre", "oktober", "oct", "okt"),
+            ("november", "novembre", "nov"),
+            ("december", "decembre", "dec"),
+        ],
+        start=1,
+    )
+    for name in names
+}
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+EU_DATE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})\b")
+TEXT_DATE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th|er|e)?\s+([^\W\d_]+)\.?\s+(\d{4})\b")
+EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE = re.compile(r"(?<![\w@])(?:\+|00)?\d[\d ./-]{6,}\d\b")
+NAME = re.compile(
+    r"\b(?:[Mm]y name is|[Ii] am|I'm|[Tt]his is|[Jj]e m'appelle|[Jj]e suis|[Mm]on nom est|[Mm]ijn naam is|[Ii]k ben|[Ii]k heet)"
+    r"\s+((?:[A-Z][\w'-]+\s+){1,3}[A-Z][\w'-]+)"
+)
+CAPITALISED = re.compile(r"^(?:[A-Z][\w'-]+\s+){1,3}[A-Z][\w'-]+$")
+ADDRESS = re.compile(
+    r"\b(?:(?:new )?address(?: is)?|I live at|I moved to|(?:nouvelle )?adresse(?: est)?|j'habite(?: au)?|"
+    r"(?:nieuwe )?adres(?: is)?|ik woon (?:in|op))\s*:?\s*(.+?)\s*[.!?]*$",
+    re.IGNORECASE,
+)
+UNBLOCK = re.compile(r"\b(unblock|unfreeze|reactivat\w*|found|debloqu\w*|reactiv\w*|retrouve\w*|deblokk\w*|teruggevonden|activeer)\b")
+BLOCK = re.compile(r"\b(block|freeze|stop|lost|stolen|bloqu\w*|perdu\w*|vole\w*|opposition|blokk\w*|kwijt|gestolen)\b")
+ACCOUNT_TYPES = {
+    "savings": re.compile(r"\b(savings?|epargne|livret|spaar\w*)\b"),
+    "current": re.compile(r"\b(current|checking|courant|a vue|zicht\w*)\b"),
+}
+LAST_N = re.compile(
+    r"\b(?:last|latest|dernieres?|derniers?|laatste)\s+(\d{1,3})\b|\b(\d{1,3})\s+(?:last|latest|dernieres?|derniers?|laatste)\b"
+)
+MIN_AMOUNT = re.compile(r"\b(?:above|over|more than|at least|plus de|au moins|meer dan|boven|minstens)\s+(?:eur|€)?\s*(\d+(?:[.,]\d+)?)")
+
+
+def _date(year: int, month: int, day: int) -> Optional[str]:
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def extract(text: str) -> Dict[str, object]:
+    """Every slot value the reply states; unrelated slots are filtered by the policy."""
+    out: Dict[str, object] = {}
+    folded = fold(text)
+    rest = text
+
+    email = EMAIL.search(text)
+    if email:
+        out["email"] = email.group(0)
+        rest = rest.replace(email.group(0), " ")
+
+    for pattern, order in ((ISO_DATE, "ymd"), (EU_DATE, "dmy")):
+        match = pattern.search(rest)
+        if match:
+            parts = dict(zip(order, map(int, match.groups())))
+            value = _date(parts["y"], parts["m"], parts["d"])
+            if value:
+                out["birthdate"] = value
+                rest = rest.replace(match.group(0), " ")
+                break
+    if "birthdate" not in out:
+        for match in TEXT_DATE.finditer(rest):
+            month = MONTHS.get(fold(match.group(2)))
+            value = _date(int(match.group(3)), month, int(match.group(1))) if month else None
+            if value:
+                out["birthdate"] = value
+                rest = rest.replace(match.group(0), " ")
+                break
+
+    phone = PHONE.search(rest)
+    if phone and sum(c.isdigit() for c in phone.group(0)) >= 8:
+        out["phone"] = re.sub(r"[ ./-]", "", phone.group(0))
+
+    address = ADDRESS.search(text)
+    # A street address has a house number; "my address has changed" doesn't.
+    if address and any(c.isdigit() for c in address.group(1)):
+        out["address"] = address.group(1)
+
+    name = NAME.search(text)
+    if name:
+        out["name"] = name.group(1)
+    else:
+        # A bare "Jan Peeters, 12/03/1985" answer to the identity question.
+        leftover = re.sub(r"[^\w' -]", " ", rest).strip()
+        leftover = re.sub(r"\s+", " ", leftover)
+        if CAPITALISED.match(leftover):
+            out["name"] = leftover
+
+    if UNBLOCK.search(folded):
+        out["action"] = "unblock"
+    elif BLOCK.search(folded):
+        out["action"] = "block"
+
+    for account_type, pattern in ACCOUNT_TYPES.items():
+        if pattern.search(folded):
+            out["account_type"] = account_type
+            break
+
+    last_n = LAST_N.search(folded)
+    if last_n:
+        out["n"] = int(last_n.group(1) or last_n.group(2))
+    amount = MIN_AMOUNT.search(folded)
+    if amount:
+        out["min_amount"] = float(amount.group(1).replace(",", "."))
+    return out
+
+
+# ---------------- Policy ----------------
+@dataclass
+class Decision:
+    complete: bool
+    missing: List[str] = field(default_factory=list)
+    question: str = ""
+    api: Optional[str] = None
+    payload: Dict[str, object] = field(default_factory=dict)
+    identity: Optional[CustomerLookupRequest] = None
+
+
+def _slot_type(annotation: object) -> str:
+    options = [arg for arg in get_args(annotation) if arg is not type(None)]
+    if len(options) == 1:  # Optional[X]
+        annotation = options[0]
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return "ENUM[" + ", ".join(json.dumps(member.value) for member in annotation) + "]"
+    if annotation is date:
+        return "DATE (YYYY-MM-DD)"
+    return {int: "INTEGER", float: "NUMBER"}.get(annotation, "STRING")
+
+
+def _missing(model: Type[BaseModel], values: Dict[str, object]) -> Tuple[List[str], List[str]]:
+    """(fields absent, fields present but invalid) for ``model`` built from ``values``."""
+    try:
+        model.model_validate(values)
+        return [], []
+    except ValidationError as exc:
+        absent, invalid = [], []
+        for error in exc.errors():
+            name = str(error["loc"][0]) if error["loc"] else ""
+            (absent if error["type"] == "missing" else invalid).append(name)
+        return absent, invalid
+
+
+class SlotFillingPolicy:
+    def __init__(self, specs: Dict[str, IntentSpec] = SPECS) -> None:
+        self.specs = specs
+
+    def slots_for(self, intent: Optional[str]) -> Tuple[str, ...]:
+        spec = self.specs.get(intent or "")
+        return spec.slots if spec else ()
+
+    def update(self, intent: Optional[str], slots: Dict[str, object], text: str,
+               extracted: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+        """Merge this turn's values into ``slots``: the LLM's first, local extractors win on conflicts."""
+        wanted = set(self.slots_for(intent))
+        for values in (extracted or {}, extract(text)):
+            for name, value in values.items():
+                if name in wanted and value not in (None, ""):
+                    slots[name] = value
+        return slots
+
+    def decide(self, intent: Optional[str], slots: Dict[str, object], lang: str = "en") -> Decision:
+        spec = self.specs.get(intent or "")
+        if spec is None:
+            return Decision(complete=True)
+        lang = lang if lang in AUTH_QUESTIONS else "en"
+
+        identity = None
+        missing: List[str] = []
+        if spec.needs_customer:
+            values = {name: slots[name] for name in IDENTITY if name in slots}
+            absent, invalid = _missing(CustomerLookupRequest, values)
+            for name in invalid:
+                slots.pop(name, None)
+            missing += absent + invalid
+            if not missing:
+                identity = CustomerLookupRequest.model_validate(values)
+
+        fields = {name: slots[name] for name in spec.fields if name in slots}
+        placeholder = {"customer_id": "pending"} if "customer_id" in spec.request.model_fields else {}
+        absent, invalid = _missing(spec.request, {**fields, **placeholder})
+        for name in invalid:
+            slots.pop(name, None)
+            fields.pop(name, None)
+        missing += absent + invalid
+        if spec.one_of and not any(name in fields for name in spec.one_of):
+            missing.append("contact")
+
+        if missing:
+            return Decision(False, missing, self.question(missing, lang), spec.api, fields, identity)
+        return Decision(True, [], "", spec.api, fields, identity)
+
+    def step(self, intent: Optional[str], slots: Dict[str, object], text: str,
+             extracted: Optional[Dict[str, object]] = None) -> Decision:
+        """One customer turn: extract, merge into ``slots`` and decide what is still missing."""
+        self.update(intent, slots, text, extracted)
+        return self.decide(intent, slots, detect_lang(text))
+
+    @staticmethod
+    def question(missing: List[str], lang: str) -> str:
+        if "name" in missing and "birthdate" in missing:
+            return QUESTIONS["identity"][lang]
+        for name in missing:
+            if name in QUESTIONS:
+                return QUESTIONS[name][lang]
+        return QUESTIONS["identity"][lang]
+
+    @staticmethod
+    def payload_prompt(spec: IntentSpec) -> str:
+        """What the customer has to provide for ``spec``, read off its request model, for the slot-filling prompt."""
+        fields = {**(CustomerLookupRequest.model_fields if spec.needs_customer else {}), **spec.request.model_fields}
+        lines = [
+            f'    "{name}": {_slot_type(fields[name].annotation)}'
+            + ("" if fields[name].is_required() or name in spec.one_of else " (optional)")
+            for name in spec.slots
+        ]
+        prompt = "{\n" + ",\n".join(lines) + "\n}"
+        if spec.one_of:
+            prompt += f"\nAt least one of {', '.join(spec.one_of)} is required."
+        return prompt
+
+    @staticmethod
+    def response_schema(spec: IntentSpec) -> Dict[str, object]:
+        """Gemini response schema: the reply to the customer plus every slot it heard, as strings."""
+        return {
+            "type": "OBJECT",
+            "properties": {
+                "reply": {"type": "STRING", "description": "Natural-language reply to the customer"},
+                "slots": {
+                    "type": "OBJECT",
+                    "description": "Values the customer has given so far; dates as YYYY-MM-DD",
+                    "properties": {name: {"type": "STRING"} for name in spec.slots},
+                },
+            },
+            "required": ["reply"],
+        }
+
+
+policy = SlotFillingPolicy()
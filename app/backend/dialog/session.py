@@ -0,0 +1,305 @@
+# app/backend/dialog/session.py
+"""
+Conversation state for ChatBot, keyed by session ID, so one process-wide bot
+(and one genai client) serves many callers at once.
+
+Each session keeps its turns under a token budget: the opening request is
+pinned, the newest turns are kept, and whatever falls out in between is folded
+into a short summary. The in-memory store evicts idle sessions (TTL) and the
+least recently used ones beyond ``max_sessions``; a persistence backend, if
+set, keeps sessions across evictions and restarts, and forgets them once they
+expire.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Protocol
+
+from ..config import CACHE_DIR
+
+HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", 2000))
+SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", 200))
+MAX_TURN_CHARS = int(os.getenv("SESSION_MAX_TURN_CHARS", 4000))
+SESSION_TTL_S = float(os.getenv("SESSION_TTL_SECONDS", 1800))
+MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 10000))
+# Every this many get() calls the whole store is swept for idle sessions; 0 only expires on access.
+SWEEP_EVERY = int(os.getenv("SESSION_SWEEP_EVERY", 1000))
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for Gemini on EN/FR/NL; close enough for a budget.
+    return len(text) // 4 + 1
+
+
+@dataclass
+class Turn:
+    role: str                      # "user" | "model"
+    text: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+Summarizer = Callable[[str, List["Turn"]], str]
+
+
+def extractive_summary(previous: str, dropped: List[Turn], max_tokens: int = SUMMARY_TOKENS) -> str:
+    """What the customer said in the dropped turns, newest kept when it doesn't fit."""
+    lines = ([previous] if previous else []) + [f"Customer: {turn.text}" for turn in dropped if turn.role == "user"]
+    summary = " ".join(lines)
+    max_chars = max_tokens * 4
+    return summary if len(summary) <= max_chars else "…" + summary[-max_chars:]
+
+
+@dataclass
+class Session:
+    session_id: str
+    turns: List[Turn] = field(default_factory=list)
+    summary: str = ""
+    intent: Optional[str] = None
+    intent_js: Dict[str, object] = field(default_factory=dict)
+    slots: Dict[str, object] = field(default_factory=dict)
+    end_convo: bool = False
+    # Timings of the turn that opened the conversation (ChatBot.start_convo).
+    timings: Dict[str, object] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    last_seen: float = field(default_factory=time.time)
+
+    def add(self, role: str, text: str) -> None:
+        self.turns.append(Turn(role, text[:MAX_TURN_CHARS]))
+
+    def reset(self) -> None:
+        self.turns, self.summary, self.intent, self.intent_js, self.slots, self.end_convo = [], "", None, {}, {}, False
+        self.timings = {}
+
+    def tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(turn.tokens for turn in self.turns)
+
+    def trim(self, budget: int = HISTORY_TOKENS, summarize: Summarizer = extractive_summary) -> int:
+        """
+        Fit the history in ``budget`` tokens: keep the first turn (the request
+        that set the intent) and the newest turns, summarise the ones between.
+        Returns how many turns were dropped.
+        """
+        if self.tokens() <= budget or len(self.turns) <= 2:
+            return 0
+        head, rest = self.turns[:1], self.turns[1:]
+        room = budget - head[0].tokens - SUMMARY_TOKENS
+        keep: List[Turn] = []
+        for turn in reversed(rest):
+            if keep and room - turn.tokens < 0:
+                break
+            room -= turn.tokens
+            keep.append(turn)
+        keep.reverse()
+        dropped = rest[: len(rest) - len(keep)]
+        if dropped:
+            self.summary = summarize(self.summary, dropped)
+            self.turns = head + keep
+        return len(dropped)
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "Session":
+        data = dict(data)
+        data["turns"] = [Turn(**turn) for turn in data.get("turns", [])]
+        return cls(**data)
+
+
+# ---------------- Persistence ----------------
+class SessionPersistence(Protocol):
+    def load(self, session_id: str) -> Optional[Dict[str, object]]:
+        ...
+
+    def save(self, session_id: str, data: Dict[str, object]) -> None:
+        ...
+
+    def delete(self, session_id: str) -> None:
+        ...
+
+
+class JsonFilePersistence:
+    """One JSON file per session; enough for a single instance or a shared volume."""
+
+    def __init__(self, directory: Path = CACHE_DIR / "sessions") -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, session_id: str) -> Path:
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in session_id)
+        return self.directory / f"{safe}.json"
+
+    def load(self, session_id: str) -> Optional[Dict[str, object]]:
+        try:
+            return json.loads(self._path(session_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def save(self, session_id: str, data: Dict[str, object]) -> None:
+        path = self._path(session_id)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def delete(self, session_id: str) -> None:
+        try:
+            self._path(session_id).unlink()
+        except FileNotFoundError:
+            pass
+
+
+PERSISTENCE: Dict[str, Callable[[], SessionPersistence]] = {"file": JsonFilePersistence}
+
+
+# ---------------- Store ----------------
+class SessionStore:
+    """Thread-safe LRU of sessions with idle expiry; ``open`` serialises turns of one session."""
+
+    def __init__(
+        self,
+        ttl_s: float = SESSION_TTL_S,
+        max_sessions: int = MAX_SESSIONS,
+        persistence: Optional[SessionPersistence] = None,
+        history_tokens: int = HISTORY_TOKENS,
+        summarize: Summarizer = extractive_summary,
+        sweep_every: int = SWEEP_EVERY,
+    ) -> None:
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self.persistence = persistence
+        self.history_tokens = history_tokens
+        self.summarize = summarize
+        self.sweep_every = sweep_every
+        self._gets = 0
+        # Dropped as expired, still to be deleted from persistence (outside the store lock).
+        self._expired_ids: List[str] = []
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        # Turn locks live as long as a turn holds or waits on them, whatever happens to the session.
+        self._locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {"created": 0, "loaded": 0, "expired": 0, "evicted": 0, "trimmed_turns": 0}
+
+    def _expired(self, session: Session, now: float) -> bool:
+        return now - session.last_seen > self.ttl_s
+
+    def _live(self, session_id: str, now: float) -> Optional[Session]:
+        # Caller holds self._lock.
+        session = self._sessions.get(session_id)
+        if session is not None and self._expired(session, now):
+            self._drop(session_id, "expired")
+            return None
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            session.last_seen = now
+        return session
+
+    def get(self, session_id: str) -> Session:
+        """The live session, reloaded from persistence or created if there is none."""
+        now = time.time()
+        with self._lock:
+            self._gets += 1
+            sweep = self.sweep_every > 0 and self._gets % self.sweep_every == 0
+            session = self._live(session_id, now)
+        if sweep:
+            self.evict_expired()
+        self._delete_expired()
+        if session is not None:
+            return session
+        # Disk (or remote) reads outside the store-wide lock, so other sessions don't wait on them.
+        data = self.persistence.load(session_id) if self.persistence else None
+        loaded = Session.from_dict(data) if data is not None else None
+        if loaded is not None and self._expired(loaded, now):
+            self.persistence.delete(session_id)
+            with self._lock:
+                self.counts["expired"] += 1
+            loaded = None
+        with self._lock:
+            # Another caller may have brought the session in meanwhile; theirs wins.
+            session = self._live(session_id, now)
+            if session is None:
+                session = loaded or Session(session_id)
+                self.counts["loaded" if loaded is not None else "created"] += 1
+                session.last_seen = now
+                self._sessions[session_id] = session
+                self._evict_lru()
+            return session
+
+    @contextmanager
+    def open(self, session_id: str) -> Iterator[Session]:
+        """The session for one turn: other turns of it wait; trimmed and persisted afterwards."""
+        with self._lock:
+            lock = self._locks.setdefault(session_id, threading.Lock())
+        with lock:
+            session = self.get(session_id)
+            yield session
+            dropped = session.trim(self.history_tokens, self.summarize)
+            with self._lock:
+                self.counts["trimmed_turns"] += dropped
+            if self.persistence is not None:
+                self.persistence.save(session_id, session.to_dict())
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        if self.persistence is not None:
+            self.persistence.delete(session_id)
+
+    def evict_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            stale = [sid for sid, session in self._sessions.items() if self._expired(session, now)]
+            for sid in stale:
+                self._drop(sid, "expired")
+        self._delete_expired()
+        return len(stale)
+
+    def _evict_lru(self) -> None:
+        while len(self._sessions) > self.max_sessions:
+            self._drop(next(iter(self._sessions)), "evicted")
+
+    def _drop(self, session_id: str, reason: str) -> None:
+        # Caller holds self._lock. An evicted session stays persisted and comes back on its
+        # next turn; an expired one is deleted from persistence too, by _delete_expired.
+        self._sessions.pop(session_id, None)
+        self.counts[reason] += 1
+        if reason == "expired" and self.persistence is not None:
+            self._expired_ids.append(session_id)
+
+    def _delete_expired(self) -> None:
+        if not self._expired_ids:
+            return
+        with self._lock:
+            # A session started again under the same id since it expired is not touched.
+            stale = [sid for sid in self._expired_ids if sid not in self._sessions]
+            self._expired_ids = []
+        for sid in stale:
+            self.persistence.delete(sid)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            out: Dict[str, float] = dict(self.counts)
+        out["sessions"] = len(sessions)
+        out["max_session_tokens"] = max((s.tokens() for s in sessions), default=0)
+        return out
+
+
+@lru_cache(maxsize=1)
+def get_session_store() -> SessionStore:
+    backend = os.getenv("SESSION_PERSISTENCE", "")
+    return SessionStore(persistence=PERSISTENCE[backend]() if backend else None)
@@ -0,0 +1,90 @@
+# app/backend/dialog/utils.py
+from __future__ import annotations
+
+import json
+from ast import literal_eval
+from typing import Dict, Optional
+
+
+class IncrementalJSONObject:
+    """
+    Parses a streamed JSON object member by member. ``feed`` takes the next
+    piece of text and returns the top-level members that closed in it, so a
+    caller can act on ``"intent"`` while the model is still writing
+    ``"summary"``. String values are emitted at their closing quote, other
+    values at the ``,`` or ``}`` that ends them.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.members: Dict[str, object] = {}
+        self.done = False
+        self._i = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._key: Optional[str] = None
+        self._value_start = -1          # index after the ":" of the current member
+
+    def feed(self, piece: str) -> Dict[str, object]:
+        self.text += piece
+        closed: Dict[str, object] = {}
+        text = self.text
+        for i in range(self._i, len(text)):
+            c = text[i]
+            if self.done:
+                break
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._close_string(self._string_start, i, closed)
+                continue
+            if c == '"':
+                self._in_string, self._string_start = True, i
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 1:
+                    self._close_value(i, closed)
+                    self.done = True
+                self._depth -= 1
+            elif self._depth == 1 and c == ":" and self._key is not None:
+                self._value_start = i + 1
+            elif self._depth == 1 and c == ",":
+                self._close_value(i, closed)
+        self._i = len(text)
+        self.members.update(closed)
+        return closed
+
+    def _close_string(self, start: int, end: int, closed: Dict[str, object]) -> None:
+        raw = self.text[start:end + 1]
+        if self._key is None:
+            self._key = json.loads(raw)
+        elif self._value_start >= 0 and not self.text[self._value_start:start].strip():
+            closed[self._key] = json.loads(raw)
+            self._key, self._value_start = None, -1
+
+    def _close_value(self, end: int, closed: Dict[str, object]) -> None:
+        if self._key is not None and self._value_start >= 0:
+            raw = self.text[self._value_start:end].strip()
+            try:
+                closed[self._key] = json.loads(raw)
+            except ValueError:
+                pass
+        self._key, self._value_start = None, -1
+
+    def value(self) -> Dict[str, object]:
+        """The whole object: the members parsed so far, or a lenient parse of text that wasn't valid JSON."""
+        if self.members:
+            return dict(self.members)
+        try:
+            parsed = literal_eval(self.text.strip())
+        except (ValueError, SyntaxError):
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
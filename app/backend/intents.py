@@ -0,0 +1,452 @@
+# app/backend/intents.py
+"""
+Local fast path for ChatBot.classify_intent. A linear model over TF-IDF word,
+bigram and character features plus a few high-precision keyword rules picks
+one of the eight intents for EN/FR/NL utterances in about 0.1 ms of CPU; its
+softmax is temperature-scaled on out-of-fold predictions so the confidence is
+calibrated, and only utterances below INTENT_LOCAL_THRESHOLD go to Gemini.
+
+    python -m app.backend.intents train
+    python -m app.backend.intents classify "blokkeer mijn kaart"
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import CACHE_DIR, PACKAGE_ROOT
+
+logger = logging.getLogger("uvicorn")
+
+# Keys used in the training data -> the labels of the classify_intent schema.
+INTENTS: Dict[str, str] = {
+    "update_info": "Update customer information",
+    "product_details": "Query for details about their existing product",
+    "balance": "Query for their account balance",
+    "transactions": "Query for details about their transactions",
+    "product_info": "Get more information about the bank's product",
+    "card": "Block or unblock or card",
+    "human": "Speak to a human or create appointment at the branch",
+    "other": "Something else",
+}
+# Intents that act on the customer's own data, so the customer has to identify first.
+AUTH_REQUIRED = {"update_info", "product_details", "balance", "transactions", "card"}
+AUTH_QUESTIONS = {
+    "en": "What is your full name and date of birth?",
+    "fr": "Quel est votre nom complet et votre date de naissance ?",
+    "nl": "Wat is uw volledige naam en geboortedatum?",
+}
+
+UTTERANCES_PATH = Path(os.getenv("INTENT_UTTERANCES", PACKAGE_ROOT.parent / "data" / "intents" / "utterances.tsv"))
+MODEL_PATH = Path(os.getenv("INTENT_MODEL_PATH", CACHE_DIR / "intents.json"))
+# Below this calibrated confidence classify_intent asks Gemini; above 1 disables the fast path.
+# 0.95: the held-out set has no wrong answer above it (at 0.8, one product_details question
+# went to product_info at 0.92, i.e. a generic answer instead of the customer's own data).
+THRESHOLD = float(os.getenv("INTENT_LOCAL_THRESHOLD", "0.95"))
+
+TOKEN_RE = re.compile(r"\b\w+\b")
+
+# Keyword rules on accent-folded text; each one that matches adds a "rule:<key>" feature.
+RULES: Dict[str, re.Pattern] = {
+    "card": re.compile(
+        r"\b(block|unblock|freeze|stop|bloqu\w*|debloqu\w*|blokk\w*|deblokk\w*|opposition|lost|stolen|perdu|volee?|kwijt|gestolen)\b"
+        r".*\b(cards?|cartes?|kaart\w*|visa|mastercard)\b"
+        r"|\b(cards?|cartes?|kaart\w*)\b.*\b(blocked|stolen|lost|bloquee|volee|perdue|geblokkeerd|gestolen|kwijt)\b"
+    ),
+    "balance": re.compile(r"\b(balance|solde|saldo)\b"),
+    "transactions": re.compile(
+        r"\b(transactions?|payments?|spen[dt]|debits?|paiements?|depense|debits|transacties|verrichtingen|betaling\w*|uitgegeven|afschrijvingen)\b"
+    ),
+    "update_info": re.compile(
+        r"\b(change|update|correct|edit|modifi\w*|changer|changez|corriger|jour|wijzig\w*|aanpass\w*|bijwerk\w*|corrigeren)\b"
+        r".*\b(address|adresse|adres|phone|number|telephone|numero|telefoonnummer|e-?mail\w*|contact\w*|coordonnees|gegevens|informations?)\b"
+        r"|\b(moved|demenage|verhuisd)\b"
+    ),
+    "human": re.compile(
+        r"\b(advisor|adviseur|human|humain|mens|person|personne|persoon|appointment|rendez|afspraak|branch|agence|kantoor|conseiller)\b"
+    ),
+    "product_info": re.compile(
+        r"\b(offer|fees|interest|cost|propose\w*|frais|interet|coute|rente|kosten|kost|bieden|aanbod)\b"
+    ),
+}
+
+STOPWORDS: Dict[str, frozenset] = {
+    "en": frozenset("the my is what how can i you me to of a please do have want on in with".split()),
+    "fr": frozenset("le la les mon ma mes est quel quelle je vous de du un une sur pour s il plait".split()),
+    "nl": frozenset("de het mijn is wat hoe ik u een van op met wil kan er alstublieft jullie".split()),
+}
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents, so "débloquer" and "debloquer" share features."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=1 << 16)
+def char_grams(token: str) -> Tuple[str, ...]:
+    """Character 4-grams of a folded token, word boundaries marked; shared with answer_cache."""
+    padded = f"<{token}>"
+    return tuple(f"#{padded[i:i + 4]}" for i in range(len(padded) - 3))
+
+
+def _features(folded: str, tokens: List[str]) -> Counter:
+    out = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    for token in tokens:
+        out += char_grams(token)
+    out += [f"rule:{key}" for key, rule in RULES.items() if rule.search(folded)]
+    return Counter(out)
+
+
+def features(text: str) -> Counter:
+    folded = fold(text)
+    return _features(folded, TOKEN_RE.findall(folded))
+
+
+def token_lang(tokens: List[str]) -> str:
+    """en/fr/nl by stop-word hits among folded tokens; en when none match."""
+    best, best_hits = "en", 0
+    for lang, words in STOPWORDS.items():
+        hits = sum(token in words for token in tokens)
+        if hits > best_hits:
+            best, best_hits = lang, hits
+    return best
+
+
+def detect_lang(text: str) -> str:
+    return token_lang(TOKEN_RE.findall(fold(text)))
+
+
+def load_utterances(path: Path = UTTERANCES_PATH) -> List[Tuple[str, str, str]]:
+    """(intent key, lang, text) rows of the labelled TSV."""
+    rows = []
+    with path.open(encoding="utf-8") as f:
+        next(f)
+        for line in f:
+            if line.strip():
+                key, lang, text = line.rstrip("\n").split("\t", 2)
+                rows.append((key, lang, text))
+    return rows
+
+
+@dataclass(frozen=True)
+class IntentPrediction:
+    key: str
+    confidence: float
+    lang: str
+
+    @property
+    def intent(self) -> str:
+        return INTENTS[self.key]
+
+    def intent_js(self, query: str) -> Dict[str, object]:
+        """The classify_intent JSON for this prediction."""
+        out: Dict[str, object] = {
+            "intent": self.intent,
+            "summary": query,
+            "auth_required": self.key in AUTH_REQUIRED,
+        }
+        if self.key in AUTH_REQUIRED:
+            out["questions"] = AUTH_QUESTIONS[self.lang]
+        return out
+
+
+class IntentClassifier:
+    """Multinomial logistic regression over sublinear TF-IDF features, softmax at ``temperature``."""
+
+    def __init__(
+        self,
+        labels: List[str],
+        vocab: Dict[str, int],
+        idf: np.ndarray,
+        weights: np.ndarray,
+        bias: np.ndarray,
+        temperature: float = 1.0,
+        held_out: Optional[np.ndarray] = None,
+    ) -> None:
+        self.labels = labels
+        self.vocab = vocab
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.temperature = temperature
+        # (confidence, correct) of every out-of-fold prediction made while training.
+        self.held_out = held_out if held_out is not None else np.zeros((0, 2), dtype=np.float32)
+
+    # ---------------- Inference ----------------
+    def _logits(self, counts: Counter) -> np.ndarray:
+        vocab = self.vocab
+        idx, tf = [], []
+        for feature, count in counts.items():
+            i = vocab.get(feature)
+            if i is not None:
+                idx.append(i)
+                tf.append(1.0 + math.log(count) if count > 1 else 1.0)
+        if not idx:
+            return self.bias.copy()
+        x = np.array(tf, dtype=np.float32) * self.idf[idx]
+        return self.bias + (x @ self.weights[idx]) / math.sqrt(float(x @ x))
+
+    def logits(self, text: str) -> np.ndarray:
+        return self._logits(features(text))
+
+    def probabilities(self, text: str) -> np.ndarray:
+        return _softmax(self.logits(text) / self.temperature)
+
+    def classify(self, text: str) -> IntentPrediction:
+        folded = fold(text)
+        tokens = TOKEN_RE.findall(folded)
+        probs = _softmax(self._logits(_features(folded, tokens)) / self.temperature)
+        best = int(np.argmax(probs))
+        return IntentPrediction(self.labels[best], float(probs[best]), token_lang(tokens))
+
+    # ---------------- Training ----------------
+    @classmethod
+    def train(
+        cls, texts: Sequence[str], keys: Sequence[str], l2: float = 1e-3, epochs: int = 300, folds: int = 5, seed: int = 0
+    ) -> "IntentClassifier":
+        model = cls._fit(texts, keys, l2, epochs)
+        # Temperature from out-of-fold logits, so the confidence reflects unseen utterances.
+        order = np.random.default_rng(seed).permutation(len(texts))
+        held_out: List[np.ndarray] = []
+        targets: List[int] = []
+        for fold_i in range(folds):
+            test = set(order[fold_i::folds].tolist())
+            sub = cls._fit(
+                [t for i, t in enumerate(texts) if i not in test], [k for i, k in enumerate(keys) if i not in test], l2, epochs
+            )
+            for i in sorted(test):
+                held_out.append(sub.logits(texts[i]))
+                targets.append(model.labels.index(keys[i]))
+        model.temperature = fit_temperature(np.stack(held_out), np.asarray(targets))
+        probs = _softmax(np.stack(held_out) / model.temperature)
+        model.held_out = np.stack(
+            [probs.max(axis=1), (probs.argmax(axis=1) == np.asarray(targets))], axis=1
+        ).astype(np.float32)
+        return model
+
+    def held_out_accuracy(self, threshold: float) -> Dict[str, Optional[float]]:
+        """Out-of-fold accuracy overall and of the predictions ``threshold`` would accept."""
+        if not len(self.held_out):
+            return {"accuracy": None, "local_rate": None, "local_accuracy": None}
+        confidence, correct = self.held_out[:, 0], self.held_out[:, 1]
+        accepted = confidence >= threshold
+        return {
+            "accuracy": round(float(correct.mean()), 4),
+            "local_rate": round(float(accepted.mean()), 4),
+            "local_accuracy": round(float(correct[accepted].mean()), 4) if accepted.any() else None,
+        }
+
+    @classmethod
+    def _fit(cls, texts: Sequence[str], keys: Sequence[str], l2: float, epochs: int) -> "IntentClassifier":
+        labels = [key for key in INTENTS if key in set(keys)]
+        docs = [features(text) for text in texts]
+        vocab: Dict[str, int] = {}
+        df: Counter = Counter()
+        for doc in docs:
+            df.update(doc.keys())
+            for feature in doc:
+                vocab.setdefault(feature, len(vocab))
+        idf = np.zeros(len(vocab), dtype=np.float32)
+        for feature, i in vocab.items():
+            idf[i] = math.log((1 + len(docs)) / (1 + df[feature])) + 1.0
+        x = np.zeros((len(docs), len(vocab)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for feature, count in doc.items():
+                i = vocab[feature]
+                x[row, i] = (1.0 + math.log(count)) * idf[i]
+        x /= np.linalg.norm(x, axis=1, keepdims=True)
+        y = np.zeros((len(docs), len(labels)), dtype=np.float32)
+        y[np.arange(len(docs)), [labels.index(k) for k in keys]] = 1.0
+
+        # Full-batch Adam on the L2-regularised cross-entropy.
+        w = np.zeros((len(vocab), len(labels)), dtype=np.float32)
+        b = np.zeros(len(labels), dtype=np.float32)
+        state = [np.zeros_like(w), np.zeros_like(w), np.zeros_like(b), np.zeros_like(b)]
+        lr, beta1, beta2 = 0.1, 0.9, 0.999
+        for step in range(1, epochs + 1):
+            grad = (_softmax(x @ w + b) - y) / len(docs)
+            gw, gb = x.T @ grad + l2 * w, grad.sum(axis=0)
+            for param, g, m, v in ((w, gw, state[0], state[1]), (b, gb, state[2], state[3])):
+                m *= beta1
+                m += (1 - beta1) * g
+                v *= beta2
+                v += (1 - beta2) * g * g
+                param -= lr * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + 1e-8)
+        return cls(labels, vocab, idf, w, b)
+
+    # ---------------- Persistence ----------------
+    def save(self, path: Path = MODEL_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps(
+                {
+                    "labels": self.labels,
+                    "features": sorted(self.vocab, key=self.vocab.get),
+                    "idf": self.idf.round(5).tolist(),
+                    "weights": self.weights.round(5).tolist(),
+                    "bias": self.bias.round(5).tolist(),
+                    "temperature": self.temperature,
+                    "held_out": self.held_out.round(4).tolist(),
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path = MODEL_PATH) -> "IntentClassifier":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(
+            data["labels"],
+            {feature: i for i, feature in enumerate(data["features"])},
+            np.asarray(data["idf"], dtype=np.float32),
+            np.asarray(data["weights"], dtype=np.float32),
+            np.asarray(data["bias"], dtype=np.float32),
+            data["temperature"],
+            np.asarray(data["held_out"], dtype=np.float32).reshape(-1, 2) if "held_out" in data else None,
+        )
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    z = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return z / z.sum(axis=-1, keepdims=True)
+
+
+def fit_temperature(logits: np.ndarray, targets: np.ndarray) -> float:
+    """Temperature minimising the negative log-likelihood of ``targets``."""
+    best, best_nll = 1.0, float("inf")
+    for t in np.exp(np.linspace(math.log(0.05), math.log(5.0), 81)):
+        probs = _softmax(logits / t)
+        nll = -float(np.mean(np.log(probs[np.arange(len(targets)), targets] + 1e-12)))
+        if nll < best_nll:
+            best, best_nll = float(t), nll
+    return best
+
+
+def train_from_utterances(path: Path = UTTERANCES_PATH) -> IntentClassifier:
+    rows = load_utterances(path)
+    return IntentClassifier.train([text for _, _, text in rows], [key for key, _, _ in rows])
+
+
+@lru_cache(maxsize=1)
+def get_classifier() -> IntentClassifier:
+    """The persisted model; without one, trains (about a second or two) and persists it."""
+    if MODEL_PATH.exists():
+        return IntentClassifier.load(MODEL_PATH)
+    started = time.perf_counter()
+    model = train_from_utterances()
+    logger.info(f"INTENTS: no model at {MODEL_PATH}, trained one in {time.perf_counter() - started:.2f}s")
+    try:
+        model.save(MODEL_PATH)
+    except OSError as exc:
+        logger.warning(f"INTENTS: could not persist the model to {MODEL_PATH}: {exc}")
+    return model
+
+
+def ready_classifier() -> Optional[IntentClassifier]:
+    """
+    The classifier if it is loaded or can be loaded from MODEL_PATH, else None.
+    Never trains: that is the warm-up's job (main.warm_up), not a request's.
+    """
+    if get_classifier.cache_info().currsize or MODEL_PATH.exists():
+        return get_classifier()
+    return None
+
+
+class IntentStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.local = 0
+        self.llm = 0
+
+    def add(self, local: bool) -> None:
+        with self._lock:
+            if local:
+                self.local += 1
+            else:
+                self.llm += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.local + self.llm
+            return {
+                "local": self.local,
+                "llm": self.llm,
+                "local_rate": round(self.local / total, 4) if total else 0.0,
+                "threshold": THRESHOLD,
+            }
+
+
+intent_stats = IntentStats()
+
+
+def classifier_stats() -> Dict[str, object]:
+    """Local vs LLM counts of this process plus the model's out-of-fold accuracy at THRESHOLD."""
+    model = get_classifier() if get_classifier.cache_info().currsize else None
+    return {
+        **intent_stats.snapshot(),
+        "ready": model is not None,
+        "held_out": model.held_out_accuracy(THRESHOLD) if model is not None else None,
+    }
+
+
+def classify_local(query: str, threshold: Optional[float] = None) -> Optional[IntentPrediction]:
+    """The local prediction if it clears ``threshold`` (default THRESHOLD), else None (ask the LLM)."""
+    threshold = THRESHOLD if threshold is None else threshold
+    if threshold > 1.0:
+        return None
+    model = ready_classifier()
+    if model is None:
+        intent_stats.add(False)
+        return None
+    prediction = model.classify(query)
+    accepted = prediction.confidence >= threshold
+    intent_stats.add(accepted)
+    return prediction if accepted else None
+
+
+def _main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train or query the local intent classifier.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="Fit the model on the labelled utterances and persist it.")
+    train.add_argument("--data", type=Path, default=UTTERANCES_PATH)
+    train.add_argument("--out", type=Path, default=MODEL_PATH)
+    classify = sub.add_parser("classify", help="Print the prediction for each utterance.")
+    classify.add_argument("texts", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        started = time.perf_counter()
+        model = train_from_utterances(args.data)
+        model.save(args.out)
+        print(
+            f"trained on {len(load_utterances(args.data))} utterances, {len(model.vocab)} features, "
+            f"temperature {model.temperature:.2f} in {time.perf_counter() - started:.2f}s -> {args.out}"
+        )
+
+    if args.command == "classify":
+        model = get_classifier()
+        for text in args.texts:
+            prediction = model.classify(text)
+            print(f"{prediction.confidence:.3f}  {prediction.lang}  {prediction.intent}  <- {text}")
+
+
+if __name__ == "__main__":
+    _main()
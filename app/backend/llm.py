@@ -0,0 +1,158 @@
+# app/backend/llm.py
+"""
+Reply generation for /assist behind one small interface, so the handlers can
+await a whole reply or consume it token by token, and benches can swap in a
+local stand-in. LLM_BACKEND picks the backend; without it ENABLE_VERTEX=1
+means Gemini and anything else the echo fallback. Both are read once, at import.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Optional, Protocol
+
+logger = logging.getLogger("uvicorn")
+
+DEFAULT_SYSTEM_PROMPT = "You are a concise banking voice assistant. Answer briefly and helpfully."
+
+
+def echo_reply(user_text: str) -> str:
+    return f"You said: {user_text}. How can I help next?"
+
+
+def build_prompt(user_text: str, lang: str, context: Optional[str]) -> str:
+    return f"{context or DEFAULT_SYSTEM_PROMPT}\n\nUser ({lang}): {user_text}"
+
+
+class ReplyBackend(Protocol):
+    async def generate(self, user_text: str, lang: str, context: Optional[str]) -> str:
+        ...
+
+    def stream(self, user_text: str, lang: str, context: Optional[str]) -> AsyncIterator[str]:
+        ...
+
+
+class EchoReplyBackend:
+    """What /assist answers when Vertex is disabled."""
+
+    async def generate(self, user_text: str, lang: str, context: Optional[str]) -> str:
+        logger.info("ASSIST: using FALLBACK (ENABLE_VERTEX=0)")
+        return echo_reply(user_text)
+
+    async def stream(self, user_text: str, lang: str, context: Optional[str]) -> AsyncIterator[str]:
+        yield await self.generate(user_text, lang, context)
+
+
+class VertexReplyBackend:
+    """
+    Gemini on Vertex. vertexai.init, the GenerativeModel (and with it the
+    prediction client and its channel) and the safety settings are created
+    once per process, on warm-up or on the first request, behind a lock.
+    """
+
+    MODEL = "gemini-1.5-flash"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._model = None
+        self._safety_settings: Optional[list] = None
+        self.init_ms = 0.0
+        self.requests = 0
+        self.setup_ms = 0.0
+
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    started = time.perf_counter()
+                    from vertexai import init as vertex_init
+                    from vertexai.generative_models import GenerativeModel, SafetySetting
+
+                    vertex_init(project=os.getenv("GCP_PROJECT"), location=os.getenv("VERTEX_LOCATION", "europe-west1"))
+                    self._safety_settings = [
+                        SafetySetting(
+                            category=SafetySetting.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+                            threshold=SafetySetting.HarmBlockThreshold.BLOCK_ONLY_HIGH,
+                        ),
+                    ]
+                    self._model = GenerativeModel(self.MODEL)
+                    self.init_ms = (time.perf_counter() - started) * 1000
+                    logger.info(f"ASSIST: GEMINI model={self.MODEL} ready in {self.init_ms:.0f} ms")
+        return self._model
+
+    def warm(self) -> None:
+        self.model()
+
+    def _setup(self):
+        started = time.perf_counter()
+        model = self.model()
+        self.requests += 1
+        self.setup_ms += (time.perf_counter() - started) * 1000
+        return model
+
+    async def generate(self, user_text: str, lang: str, context: Optional[str]) -> str:
+        resp = await self._setup().generate_content_async(
+            build_prompt(user_text, lang, context), safety_settings=self._safety_settings
+        )
+        return resp.text or ""
+
+    async def stream(self, user_text: str, lang: str, context: Optional[str]) -> AsyncIterator[str]:
+        responses = await self._setup().generate_content_async(
+            build_prompt(user_text, lang, context), safety_settings=self._safety_settings, stream=True
+        )
+        async for chunk in responses:
+            if chunk.candidates and chunk.candidates[0].content.parts:
+                yield chunk.text
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "model": self.MODEL,
+            "init_ms": round(self.init_ms, 2),
+            "requests": self.requests,
+            "mean_setup_ms": round(self.setup_ms / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+class LocalReplyBackend:
+    """Offline stand-in: a fixed multi-sentence reply, streamed word by word with latency."""
+
+    REPLY = (
+        "Your current account balance is 1.234,50 euro. "
+        "The last transaction was a card payment of 42 euro at the supermarket yesterday. "
+        "Would you like me to send you a statement, or is there anything else I can help with?"
+    )
+
+    def __init__(self, first_token_s: float = 0.4, token_s: float = 0.02, reply: str = REPLY) -> None:
+        self.first_token_s = first_token_s
+        self.token_s = token_s
+        self.reply = reply
+
+    async def generate(self, user_text: str, lang: str, context: Optional[str]) -> str:
+        return "".join([token async for token in self.stream(user_text, lang, context)])
+
+    async def stream(self, user_text: str, lang: str, context: Optional[str]) -> AsyncIterator[str]:
+        await asyncio.sleep(self.first_token_s)
+        words = self.reply.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_s)
+            yield word if i == len(words) - 1 else word + " "
+
+
+BACKENDS = {"echo": EchoReplyBackend, "vertex": VertexReplyBackend, "local": LocalReplyBackend}
+
+
+LLM_BACKEND = os.getenv("LLM_BACKEND") or ("vertex" if os.getenv("ENABLE_VERTEX", "0") == "1" else "echo")
+
+
+@lru_cache(maxsize=None)
+def reply_backend(name: str) -> ReplyBackend:
+    return BACKENDS[name]()
+
+
+def get_reply_backend() -> ReplyBackend:
+    return reply_backend(LLM_BACKEND)
@@ -1,18 +1,90 @@
 # app/backend/main.py
 import os
+import asyncio
 import base64
-from typing import Optional
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import quote
 
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-# Google Cloud clients
-from google.cloud import texttospeech
-from google.cloud import speech
-from google.cloud import aiplatform
+from . import clients, intents, llm, rag, schemas
+from .answer_cache import get_answer_cache
+from .dialog.session import get_session_store
+from .telemetry import llm_telemetry
+from .voice import pipeline as voice_pipeline
+from .voice import templates as voice_templates
+from .voice import streaming as stt_streaming
+from .voice import stt as stt_voice
+from .voice import tts as tts_voice
+
+logger = logging.getLogger("uvicorn")  # already configured by Uvicorn
 
-app = FastAPI(title="ING Voice API", version="1.0.0")
+# Google SDKs (speech, texttospeech, vertexai) are imported by the modules that
+# use them, on warm-up or first use, so the port opens without waiting on them.
+# "background" warms up after the port is open, "blocking" before it, "off" not at all.
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background")
+startup = {"ready": False, "warm_up_ms": 0.0}
+
+
+async def warm_up(registry: clients.ClientRegistry) -> None:
+    started = time.perf_counter()
+    # Load (or build once) the chunk index so the first request doesn't pay for it.
+    await asyncio.to_thread(rag.get_index)
+    # Same for the intent model; until it is there, classify_intent goes to Gemini.
+    await asyncio.to_thread(intents.get_classifier)
+    # vertexai.init + GenerativeModel once per process, not once per /assist.
+    reply_backend = llm.get_reply_backend()
+    if hasattr(reply_backend, "warm"):
+        try:
+            await asyncio.to_thread(reply_backend.warm)
+        except Exception as e:
+            logger.warning(f"ASSIST: LLM warm-up failed, will retry on first request: {e}")
+    # Credentials, channels and TLS once per process instead of once per request.
+    # Blocking pools (and with them the SDK imports) off the loop; grpc.aio
+    # channels bind to the running loop, so the async ones are started on it.
+    try:
+        await asyncio.to_thread(registry.start, [name for name in registry.factories if not name.endswith("_async")])
+        registry.start()
+    except Exception as e:
+        # No credentials locally: pools are retried on first use instead.
+        logger.warning(f"CLIENTS: startup failed, will retry lazily: {e}")
+    # Static template segments into the TTS cache, so spoken confirmations only synthesise slot values.
+    synthesizer = tts_voice.get_synthesizer()
+    if synthesizer.cache is not None:
+        try:
+            segments = await voice_templates.warm_templates(synthesizer)
+            logger.info(f"TTS: {segments} template segments cached")
+        except Exception as e:
+            logger.warning(f"TTS: template warm-up failed, segments are synthesised on first use: {e}")
+    startup["ready"] = True
+    startup["warm_up_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"STARTUP: warm-up done in {startup['warm_up_ms']:.0f} ms")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    registry = clients.get_registry()
+    clients.limits.reset()
+    startup.update(ready=False, warm_up_ms=0.0)
+    warming = None
+    if STARTUP_WARMUP == "blocking":
+        await warm_up(registry)
+    elif STARTUP_WARMUP == "background":
+        warming = asyncio.create_task(warm_up(registry))
+    yield
+    if warming is not None:
+        warming.cancel()
+    await registry.aclose()
+
+
+app = FastAPI(title="ING Voice API", version="1.0.0", lifespan=lifespan)
 
 # ---------------- CORS ----------------
 app.add_middleware(
@@ -25,6 +97,7 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Transcript", "X-Reply-Text"],
 )
 
 # Safety: never 404 on preflight; middleware will inject ACAO headers.
@@ -56,6 +129,31 @@ class AssistOut(BaseModel):
     text: str
     audio: str                 # base64 MP3
 
+class IntentSpokenOut(BaseModel):
+    result: dict               # the handler response
+    text: str                  # spoken confirmation ("" when the response has no template)
+    audio: str                 # base64 MP3
+
+# ---------------- Binary audio bodies ----------------
+# /stt/audio, /tts/audio and /assist/audio take raw audio (or multipart with an
+# "audio" file part) and answer with audio/mpeg bytes: no base64 either way.
+async def _request_audio(request: Request) -> Tuple[bytes, Dict[str, str]]:
+    """Audio bytes and any text form fields from a raw or multipart/form-data body."""
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("audio")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="multipart body needs an 'audio' file part")
+        return await upload.read(), {k: v for k, v in form.items() if isinstance(v, str)}
+    audio = await request.body()
+    if not audio:
+        raise HTTPException(status_code=400, detail="empty audio body")
+    return audio, {}
+
+def _header_text(text: str) -> str:
+    # Header values are latin-1; percent-encode so any language survives (decodeURIComponent).
+    return quote(text, safe=" .,?!'")
+
 # ---------------- Health ----------------
 @app.get("/healthz", tags=["Health"])
 def healthz():
@@ -63,174 +161,218 @@ def healthz():
         "status": "ok",
         "project": os.getenv("GCP_PROJECT", ""),
         "location": os.getenv("VERTEX_LOCATION", ""),
+        "warm": startup["ready"],
     }
 
-# ---------------- TTS ----------------
-_VOICE_MAP = {
-    "en-GB": ("en-GB", "en-GB-Neural2-C"),
-    "nl-BE": ("nl-BE", "nl-BE-Standard-A"),
-    "fr-BE": ("fr-BE", "fr-BE-Standard-A"),
-}
+@app.get("/stats", tags=["Health"])
+def stats():
+    tts_cache = tts_voice.get_synthesizer().cache
+    reply_backend = llm.get_reply_backend()
+    return {
+        "retrieval": rag.retrieval_stats(),
+        "retrieval_cache": rag.query_cache.snapshot(),
+        "tts_cache": tts_cache.snapshot() if tts_cache else None,
+        "clients": clients.get_registry().snapshot(),
+        "backend_limits": clients.limits.snapshot(),
+        "stt_formats": stt_voice.detection_stats.snapshot(),
+        "stt_streaming": stt_streaming.stream_stats.snapshot(),
+        "llm": reply_backend.snapshot() if hasattr(reply_backend, "snapshot") else None,
+        "nlu_llm": llm_telemetry.snapshot(),
+        "intents": intents.classifier_stats(),
+        "sessions": get_session_store().snapshot(),
+        "answer_cache": get_answer_cache().snapshot(),
+        "startup": dict(startup),
+    }
 
-def _tts_text_to_b64mp3(text: str, lang: str) -> str:
-    language_code, voice_name = _VOICE_MAP.get(lang, ("en-GB", "en-GB-Neural2-C"))
-    tts_client = texttospeech.TextToSpeechClient()
-    resp = tts_client.synthesize_speech(
-        input=texttospeech.SynthesisInput(text=text),
-        voice=texttospeech.VoiceSelectionParams(language_code=language_code, name=voice_name),
-        audio_config=texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3),
-    )
-    return base64.b64encode(resp.audio_content).decode("utf-8")
+@app.get("/metrics", tags=["Health"], response_class=Response)
+def metrics():
+    return Response(llm_telemetry.prometheus(), media_type="text/plain; version=0.0.4")
+
+# ---------------- TTS ----------------
+async def _tts_text_to_b64mp3(text: str, lang: str) -> str:
+    audio = await tts_voice.get_synthesizer().asynthesize(text, lang)
+    return base64.b64encode(audio).decode("utf-8")
 
 @app.post("/tts", response_model=TTSOut, tags=["Voice"])
-def tts(body: TTSIn):
-    if body.lang not in _VOICE_MAP:
+async def tts(body: TTSIn):
+    if body.lang not in tts_voice.VOICE_MAP:
         raise HTTPException(status_code=400, detail=f"Unsupported lang '{body.lang}'")
-    return TTSOut(audio=_tts_text_to_b64mp3(body.text, body.lang))
+    return TTSOut(audio=await _tts_text_to_b64mp3(body.text, body.lang))
 
-# ---------------- STT ----------------
-def _stt_bytes_to_text(audio_bytes: bytes, lang: str) -> str:
-    """Robust STT: try WEBM_OPUS (browser), then auto, then MP3 44.1k."""
-    client = speech.SpeechClient()
-    audio = speech.RecognitionAudio(content=audio_bytes)
+@app.post("/tts/audio", tags=["Voice"], response_class=Response)
+async def tts_audio(body: TTSIn):
+    if body.lang not in tts_voice.VOICE_MAP:
+        raise HTTPException(status_code=400, detail=f"Unsupported lang '{body.lang}'")
+    audio = await tts_voice.get_synthesizer().asynthesize(body.text, body.lang)
+    return Response(content=audio, media_type="audio/mpeg")
 
-    # 1) Browser MediaRecorder (webm/opus)
-    try:
-        cfg = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
-            language_code=lang,
-            enable_automatic_punctuation=True,
-            model="latest_short",
-        )
-        resp = client.recognize(config=cfg, audio=audio)
-    except Exception:
-        # 2) Auto-detect
-        try:
-            cfg = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.ENCODING_UNSPECIFIED,
-                language_code=lang,
-                enable_automatic_punctuation=True,
-                model="latest_short",
-            )
-            resp = client.recognize(config=cfg, audio=audio)
-        except Exception:
-            # 3) MP3 fallback
-            cfg = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.MP3,
-                sample_rate_hertz=44100,
-                language_code=lang,
-                enable_automatic_punctuation=True,
-                model="latest_short",
-            )
-            try:
-                resp = client.recognize(config=cfg, audio=audio)
-            except Exception:
-                return ""
-
-    return " ".join(
-        r.alternatives[0].transcript for r in resp.results if r.alternatives
-    ).strip()
+# ---------------- STT ----------------
+async def _stt_bytes_to_text(audio_bytes: bytes, lang: str) -> str:
+    """One recognize call, configured from the sniffed container (see voice/stt.py)."""
+    # The speech slot keeps the async pool below its cap, so acquire() never blocks the loop.
+    async with clients.limits.slot("speech"):
+        with clients.get_registry().acquire("speech_async", timeout=0) as client:
+            return await stt_voice.transcribe(client, audio_bytes, lang)
 
 @app.post("/stt", response_model=STTOut, tags=["Voice"])
-def stt(body: STTIn):
+async def stt(body: STTIn):
     lang = body.lang or "en-GB"
-    text = _stt_bytes_to_text(base64.b64decode(body.audio), lang)
+    text = await _stt_bytes_to_text(base64.b64decode(body.audio), lang)
     return STTOut(text=text)
 
-# ---------------- ASSIST (STT -> reply -> TTS) ----------------
-# --- Vertex AI Gemini integration + tiny RAG from local chunks ---
-
-import glob
-import re
-from collections import Counter
+@app.post("/stt/audio", response_model=STTOut, tags=["Voice"])
+async def stt_audio(request: Request, lang: Optional[str] = None):
+    audio, fields = await _request_audio(request)
+    text = await _stt_bytes_to_text(audio, lang or fields.get("lang") or "en-GB")
+    return STTOut(text=text)
 
-USE_VERTEX = os.getenv("ENABLE_VERTEX", "0") == "1"
-CHUNKS_ROOT = os.getenv("CHUNKS_ROOT", "/app/data/chunks")
+@app.websocket("/ws/stt")
+async def stt_stream(websocket: WebSocket, lang: str = "en-GB"):
+    """Audio frames in, interim/final transcripts out (protocol in voice/streaming.py)."""
+    await stt_streaming.run_session(websocket, stt_streaming.get_streaming_recognizer(), lang)
+
+# ---------------- Intent APIs with spoken confirmations ----------------
+# Request model and handler (handlers.py) per intent API; see voice/templates.py for the replies.
+INTENT_APIS = {
+    "balances.get": (schemas.BalanceRequest, "handle_balances"),
+    "appointment.create": (schemas.AppointmentCreateRequest, "handle_appointment_create"),
+    "contact.update": (schemas.ContactUpdateRequest, "handle_contact_update"),
+}
 
-def _read_text_file(path: str, limit_chars: int = 2000) -> str:
+@app.post("/intent/{api}/spoken", response_model=IntentSpokenOut, tags=["Intent"])
+async def intent_spoken(api: str, request: Request, lang: str = "en-GB"):
+    """
+    Run one intent handler and speak its confirmation: the template's static
+    segments come from the TTS cache, only the slot values are synthesised.
+    """
+    if api not in INTENT_APIS:
+        raise HTTPException(status_code=404, detail=f"Unknown intent API '{api}'")
+    if lang not in tts_voice.VOICE_MAP:
+        raise HTTPException(status_code=400, detail=f"Unsupported lang '{lang}'")
+    # pandas and the CSV data store load on first use, not at startup.
+    from . import data, handlers
+
+    model, handler_name = INTENT_APIS[api]
     try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            return f.read()[:limit_chars]
-    except Exception:
-        return ""
-
-def _retrieve_context(query: str, max_docs: int = 5, max_chars: int = 6000) -> str:
-    """Naive keyword scorer over *.txt in CHUNKS_ROOT."""
-    if not query:
-        query = ""
-    q_tokens = [t for t in re.findall(r"\b\w+\b", query.lower()) if len(t) > 2]
-    q_counts = Counter(q_tokens)
-    scored = []
-    for path in glob.glob(os.path.join(CHUNKS_ROOT, "**", "*.txt"), recursive=True):
-        text = _read_text_file(path, limit_chars=2000)
-        if not text:
-            continue
-        t_tokens = re.findall(r"\b\w+\b", text.lower())
-        score = sum(q_counts[t] for t in t_tokens)
-        if score == 0 and not q_tokens:
-            score = 1  # allow some context when query empty
-        scored.append((score, path, text))
-    scored.sort(reverse=True, key=lambda x: x[0])
-    buf, total = [], 0
-    for _, path, text in scored[:max_docs]:
-        if total >= max_chars:
-            break
-        block = f"\n\n[DOC: {os.path.basename(path)}]\n{text}"
-        buf.append(block)
-        total += len(block)
-    return "".join(buf).strip()
-
-import logging
+        body = model.model_validate(await request.json())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    result = await asyncio.to_thread(getattr(handlers, handler_name), body, data.get_data_store())
+    text, audio = await voice_templates.render_replies(
+        tts_voice.get_synthesizer(), voice_templates.handler_replies(result), lang
+    )
+    return IntentSpokenOut(
+        result=result.model_dump(mode="json"), text=text, audio=base64.b64encode(audio).decode("utf-8")
+    )
 
-logger = logging.getLogger("uvicorn")  # already configured by Uvicorn
+# ---------------- ASSIST (STT -> reply -> TTS) ----------------
+# --- Vertex AI Gemini integration (llm.py) + tiny RAG from local chunks ---
 
-def _assistant_reply(user_text: str, lang: str, context: Optional[str]) -> str:
-    if not user_text:
-        return "I didn’t catch that. Please try again."
+def _retrieve_context(
+    query: str, lang: Optional[str] = None, max_docs: int = 5, max_chars: int = 6000
+) -> str:
+    """BM25 lookup in the prebuilt chunk index of the request language (see rag.py)."""
+    return rag.retrieve_context(query, lang=lang, max_docs=max_docs, max_chars=max_chars)
 
-    USE_VERTEX = os.getenv("ENABLE_VERTEX", "0") == "1"
+NO_INPUT_REPLY = "I didn’t catch that. Please try again."
 
-    if not USE_VERTEX:
-        logger.info("ASSIST: using FALLBACK (ENABLE_VERTEX=0)")
-        return f"You said: {user_text}. How can I help next?"
+async def _assistant_reply(user_text: str, lang: str, context: Optional[str]) -> str:
+    if not user_text:
+        return NO_INPUT_REPLY
 
-    # --- Vertex AI Gemini call ---
+    # (optional) build compact context from your chunks
+    # doc_context = _retrieve_context(user_text, lang, max_docs=6, max_chars=6000)
     try:
-        from vertexai import init as vertex_init
-        from vertexai.generative_models import GenerativeModel, SafetySetting
-
-        project = os.getenv("GCP_PROJECT")
-        location = os.getenv("VERTEX_LOCATION", "europe-west1")
-        vertex_init(project=project, location=location)
-        model = GenerativeModel("gemini-1.5-flash")
-
-        # (optional) build compact context from your chunks
-        # doc_context = _retrieve_context(user_text, max_docs=6, max_chars=6000)
-
-        sys_prompt = context or "You are a concise banking voice assistant. Answer briefly and helpfully."
-        prompt = f"{sys_prompt}\n\nUser ({lang}): {user_text}"
-
-        logger.info(f"ASSIST: using GEMINI model=gemini-1.5-flash region={location}")
-        resp = model.generate_content(prompt, safety_settings=[
-            SafetySetting(category=SafetySetting.HARM_CATEGORY_HATE_SPEECH, threshold=SafetySetting.HarmBlockThreshold.BLOCK_ONLY_HIGH),
-        ])
-        text = (resp.text or "").strip() or "I’m here."
-        return text
+        async with clients.limits.slot("llm"):
+            text = await llm.get_reply_backend().generate(user_text, lang, context)
+        return text.strip() or "I’m here."
     except Exception as e:
         logger.exception(f"ASSIST: Gemini error, falling back: {e}")
-        return f"You said: {user_text}. How can I help next?"
+        return llm.echo_reply(user_text)
+
+async def _assistant_reply_stream(user_text: str, lang: str, context: Optional[str]) -> AsyncIterator[str]:
+    """_assistant_reply as a token stream; falls back to the echo only if nothing was generated yet."""
+    if not user_text:
+        yield NO_INPUT_REPLY
+        return
+    produced = False
+    try:
+        async with clients.limits.slot("llm"):
+            async for token in llm.get_reply_backend().stream(user_text, lang, context):
+                produced = produced or bool(token.strip())
+                yield token
+    except Exception as e:
+        logger.exception(f"ASSIST: Gemini stream error: {e}")
+        if not produced:
+            yield llm.echo_reply(user_text)
+            return
+    if not produced:
+        yield "I’m here."
 
 
 @app.post("/assist", response_model=AssistOut, tags=["Assistant"])
-def assist(body: AssistIn):
+async def assist(body: AssistIn):
     lang = body.lang or "en-GB"
     # 1) STT
     try:
-        user_text = _stt_bytes_to_text(base64.b64decode(body.audio), lang)
+        user_text = await _stt_bytes_to_text(base64.b64decode(body.audio), lang)
     except Exception:
         user_text = ""
     # 2) Reply
-    reply_text = _assistant_reply(user_text, lang, body.context)
+    reply_text = await _assistant_reply(user_text, lang, body.context)
     # 3) TTS
-    reply_audio_b64 = _tts_text_to_b64mp3(reply_text, lang)
-    return AssistOut(text=reply_text, audio=reply_audio_b64)
\ No newline at end of file
+    reply_audio_b64 = await _tts_text_to_b64mp3(reply_text, lang)
+    return AssistOut(text=reply_text, audio=reply_audio_b64)
+
+
+@app.post("/assist/audio", tags=["Assistant"], response_class=Response)
+async def assist_audio(request: Request, lang: Optional[str] = None, context: Optional[str] = None):
+    """/assist with binary bodies: the reply MP3 is the response body, texts are in X-Transcript / X-Reply-Text."""
+    audio, fields = await _request_audio(request)
+    lang = lang or fields.get("lang") or "en-GB"
+    try:
+        user_text = await _stt_bytes_to_text(audio, lang)
+    except Exception:
+        user_text = ""
+    reply_text = await _assistant_reply(user_text, lang, context or fields.get("context"))
+    reply_audio = await tts_voice.get_synthesizer().asynthesize(reply_text, lang)
+    return Response(
+        content=reply_audio,
+        media_type="audio/mpeg",
+        headers={"X-Transcript": _header_text(user_text), "X-Reply-Text": _header_text(reply_text)},
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _assist_events(audio_bytes: bytes, lang: str, context: Optional[str]) -> AsyncIterator[str]:
+    try:
+        user_text = await _stt_bytes_to_text(audio_bytes, lang)
+    except Exception:
+        user_text = ""
+    yield _sse("transcript", {"text": user_text})
+    spoken = []
+    try:
+        sentences = voice_pipeline.sentences(_assistant_reply_stream(user_text, lang, context))
+        async for text, audio in voice_pipeline.speak(sentences, tts_voice.get_synthesizer(), lang):
+            yield _sse("audio", {"index": len(spoken), "text": text, "audio": base64.b64encode(audio).decode("utf-8")})
+            spoken.append(text)
+    except Exception as e:
+        logger.exception(f"ASSIST: stream failed after {len(spoken)} sentences: {e}")
+        yield _sse("error", {"detail": "reply interrupted"})
+    yield _sse("done", {"text": " ".join(spoken)})
+
+@app.post("/assist/stream", tags=["Assistant"])
+async def assist_stream(body: AssistIn):
+    """
+    Server-sent events: `transcript`, then one `audio` event per sentence
+    (base64 MP3, synthesised while later sentences are still generating),
+    then `done` with the full reply text.
+    """
+    lang = body.lang or "en-GB"
+    return StreamingResponse(
+        _assist_events(base64.b64decode(body.audio), lang, body.context),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
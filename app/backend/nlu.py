@@ -1,13 +1,194 @@
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from ast import literal_eval
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import json
+import logging
+import math
+import os
+import threading
+import time
+
+from . import intents
+from .answer_cache import SemanticAnswerCache, get_answer_cache
+from .dialog.policy import policy
+from .dialog.session import Session, SessionStore, get_session_store
+from .dialog.utils import IncrementalJSONObject
+from .telemetry import BUDGETS, observe_stream
+
+logger = logging.getLogger("uvicorn")
+
+# Intents answered from the grounded search result; the others only need it to
+# build the reply when they ask the customer to authenticate first.
+INFORMATIONAL_INTENTS = (
+    "Get more information about the bank's product",
+    "Speak to a human or create appointment at the branch",
+)
+
+
+@lru_cache(maxsize=1)
+def get_executor() -> ThreadPoolExecutor:
+    """Process-wide pool for the Gemini calls of a turn that run side by side."""
+    return ThreadPoolExecutor(max_workers=int(os.getenv("NLU_WORKERS", 16)), thread_name_prefix="nlu")
+
+
+def is_routable(intent_js: dict) -> bool:
+    """Enough of the streamed intent has closed to pick the branch of start_convo."""
+    intent = intent_js.get("intent")
+    return intent is not None and (intent == "Something else" or "auth_required" in intent_js)
+
+
+def needs_full_intent(intent_js: dict) -> bool:
+    # Only the branches that reply with the grounded answer use "questions"/"summary".
+    return bool(intent_js.get("auth_required")) or intent_js.get("intent") in INFORMATIONAL_INTENTS
+
+
+def needs_grounding(intent_js: dict) -> bool:
+    intent = intent_js.get("intent")
+    if intent is None or intent == "Something else":
+        return False
+    return intent in INFORMATIONAL_INTENTS or bool(intent_js.get("auth_required"))
+
+
+def budget_config(stage: str) -> dict:
+    """The GenerateContentConfig fields set by the stage's budget (telemetry.BUDGETS)."""
+    budget = BUDGETS[stage]
+    fields = {
+        "max_output_tokens": budget.max_output_tokens,
+        "http_options": types.HttpOptions(timeout=int(budget.timeout_s * 1000)),
+    }
+    if budget.thinking_budget is not None:
+        fields["thinking_config"] = types.ThinkingConfig(thinking_budget=budget.thinking_budget)
+    return fields
+
+
+def retryable(exc: BaseException) -> bool:
+    # Rate limits, server errors and dropped connections; a bad request fails the same way again.
+    if isinstance(exc, errors.APIError):
+        return exc.code == 429 or exc.code >= 500
+    return isinstance(exc, ConnectionError)
+
+
+# ---------------- Static prompts ----------------
+# The same every turn, so they (and the configs built from them) are made once.
+GROUNDING_INSTRUCTION = """You are a helpful banking assistant with a wealth of knowledge about ING's products and processes.
+Help to retrieve relevant information to support this customer's request.
+If they are asking for help with something that requires more information, ask them for their full name and date of birth.
+Assume that you are deployed by ING and customers who speak to you have given consent for you to access their personal information."""
+
+INTENT_SCHEMA = {
+    "description": "Schema for classifying the user's core intent.",
+    "type": "OBJECT",
+    "properties": {
+        "intent": {
+        "description": "The primary intent or category of the user's request.",
+        "type": "STRING",
+        "enum": [
+            "Update customer information", #
+            "Query for details about their existing product", #
+            "Query for their account balance",
+            "Query for details about their transactions", #
+            "Get more information about the bank's product", #infomational
+            "Block or unblock or card", #
+            "Speak to a human or create appointment at the branch",  #infomational
+            "Something else"  #infomational
+        ]
+        },
+        "summary": {
+        "description": "Summary of the customer's request",
+        "type": "STRING"
+        },
+        "auth_required": {
+        "type": "BOOLEAN"
+        },
+        "questions": {
+        "description": "Questions to ask the customer",
+        "type": "STRING"
+        }
+    },
+    "required": [
+        "intent",
+        "summary",
+        "auth_required"
+    ],
+    # Routing fields first, so start_convo can act before the free text is written.
+    "propertyOrdering": [
+        "intent",
+        "auth_required",
+        "summary",
+        "questions"
+    ]
+}
+
+INTENT_INSTRUCTION = """You are a helpful banking assistant. Here more information about the SQL database you have access to and the fields available in each table:
+1. Customers table
+customer_id	STRING	REQUIRED
+name	STRING	NULLABLE
+birthdate	STRING	NULLABLE	(DD-MM-YYYY)
+email	STRING	NULLABLE
+phone	STRING	NULLABLE
+address	STRING	NULLABLE
+segment_code	STRING	NULLABLE	(ADULT,CHILD,PROSPECT)
+
+2. Products table
+product_id	STRING	REQUIRED
+customer_id	STRING	REQUIRED
+product_type	STRING	REQUIRED
+product_name	STRING	REQUIRED
+opened_date	STRING	REQUIRED	(DD-MM-YYYY)
+status	STRING	REQUIRED
+
+3. Transactions table
+transaction_id	STRING	REQUIRED
+product_id	STRING	REQUIRED
+date	STRING	REQUIRED
+amount	FLOAT	REQUIRED
+currency	 STRING	REQUIRED
+description	STRING	NULLABLE
+transaction_type STRING REQUIRED (Credit,Debit)
+
+Classify the intention of this customer, choose only one option. Summarise their question retaining all information that is useful to help us generate a API request to complete their task. List questions to ask the customer for information we do not yet have but we require to help them perform the task."""
+
+SAFETY_SETTINGS = [types.SafetySetting(
+    category="HARM_CATEGORY_HATE_SPEECH",
+    threshold="OFF"
+    ),types.SafetySetting(
+    category="HARM_CATEGORY_DANGEROUS_CONTENT",
+    threshold="OFF"
+    ),types.SafetySetting(
+    category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
+    threshold="OFF"
+    ),types.SafetySetting(
+    category="HARM_CATEGORY_HARASSMENT",
+    threshold="OFF"
+    )]
+
+# With NLU_CONTEXT_CACHE=1 the static instruction (and tools) of the grounding and
+# intent calls are registered as a Vertex context cache, renewed before it expires,
+# so turns don't send them as fresh input tokens. The backend refuses prompts below
+# the model's minimum cacheable size; those stay inline.
+CONTEXT_CACHE = os.getenv("NLU_CONTEXT_CACHE", "0") == "1"
+CONTEXT_CACHE_TTL_S = int(os.getenv("NLU_CONTEXT_CACHE_TTL_S", 3600))
+
+
+# Callers that don't pass a session_id share this one, as with the old per-instance history.
+DEFAULT_SESSION = "default"
+
+
+@lru_cache(maxsize=1)
+def get_chatbot() -> "ChatBot":
+    """One bot (and one genai client) per process; conversations are kept apart by session_id."""
+    return ChatBot(project_id=os.getenv("GCP_PROJECT", "ing-voice-team35"),
+                   location=os.getenv("VERTEX_LOCATION", "europe-west1"))
 
 class ChatBot(genai.Client):
 
     def __init__(self, 
                 project_id:str="ing-voice-team35",
-                location:str="europe-west1"):
+                location:str="europe-west1",
+                sessions:SessionStore=None,
+                answer_cache:SemanticAnswerCache=None):
         try:
             self._api_client = genai.Client(
                 vertexai=True,
@@ -16,19 +197,7 @@ class ChatBot(genai.Client):
             )
             self.MODEL = "gemini-2.5-flash"
             self.DATASTORE_ID = "projects/307966155885/locations/global/collections/default_collection/dataStores/ing-website-chunks_1761746102597"
-            self.SAFETY_SETTINGS = [types.SafetySetting(
-                category="HARM_CATEGORY_HATE_SPEECH",
-                threshold="OFF"
-                ),types.SafetySetting(
-                category="HARM_CATEGORY_DANGEROUS_CONTENT",
-                threshold="OFF"
-                ),types.SafetySetting(
-                category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                threshold="OFF"
-                ),types.SafetySetting(
-                category="HARM_CATEGORY_HARASSMENT",
-                threshold="OFF"
-                )]
+            self.SAFETY_SETTINGS = SAFETY_SETTINGS
             self.payload_mapping = payload_mapping = {
                 "Query for their account balance": {
                     "api": "/intent/balances.get",
@@ -37,13 +206,6 @@ class ChatBot(genai.Client):
                         "account_type":STRING
                     }'''
                     },
-                "Update customer information": {
-                    "api": "/intent/card.update",
-                    "payload": '''{
-                        "customer_id":STRING,
-                        "action":ENUM["block", "unblock"]
-                    }'''
-                }, #
                 "Query for details about their existing product":{
                     "api": "/intent/customer.lookup",
                     "payload": '''{
@@ -69,8 +231,12 @@ class ChatBot(genai.Client):
                     }'''
                 }, #
             }
-            self.chat_history = []
-            self.end_convo = False
+            # Both define __len__, so an empty store passed in is falsy: compare with None.
+            self.sessions = sessions if sessions is not None else get_session_store()
+            self.answer_cache = answer_cache if answer_cache is not None else get_answer_cache()
+            self._configs = {}
+            self._slot_configs = {}
+            self._config_lock = threading.Lock()
         except:
             raise
 
@@ -84,7 +250,103 @@ class ChatBot(genai.Client):
                 print("error parsing json")
                 return {}
 
-    def retrieve_grounded_info(self, query:str):
+    def _generate(self, stage:str, contents, config):
+        """generate_content_stream with the stage's timeout and retries, recorded in telemetry."""
+        return observe_stream(
+            stage,
+            lambda: self._api_client.models.generate_content_stream(
+                model = self.MODEL,
+                contents = contents,
+                config = config,
+            ),
+            retryable = retryable,
+        )
+
+    def _static_config(self, stage:str):
+        """The GenerateContentConfig of the grounding or intent call, built on first use."""
+        entry = self._configs.get(stage)
+        if entry is None or time.time() > entry[1]:
+            with self._config_lock:
+                entry = self._configs.get(stage)
+                if entry is None or time.time() > entry[1]:
+                    entry = self._configs[stage] = self._build_config(stage)
+        return entry[0]
+
+    def _build_config(self, stage:str):
+        if stage == "grounding":
+            fields = dict(
+                temperature = 1,
+                top_p = 0.95,
+                seed = 0,
+                tools = [
+                    types.Tool(retrieval=types.Retrieval(vertex_ai_search=types.VertexAISearch(
+                        datastore=self.DATASTORE_ID))),
+                ],
+                system_instruction = [types.Part.from_text(text=GROUNDING_INSTRUCTION)],
+            )
+        else:
+            fields = dict(
+                temperature = 1,
+                top_p = 1,
+                seed = 0,
+                response_mime_type = "application/json",
+                response_schema = INTENT_SCHEMA,
+                system_instruction = [types.Part.from_text(text=INTENT_INSTRUCTION)],
+            )
+        expires_at = math.inf
+        cache = self._create_context_cache(stage, fields) if CONTEXT_CACHE else None
+        if cache is not None:
+            # The cache carries the instruction and tools; requests only name it.
+            fields.pop("system_instruction")
+            fields.pop("tools", None)
+            fields["cached_content"] = cache.name
+            expires_at = time.time() + CONTEXT_CACHE_TTL_S * 0.9
+        config = types.GenerateContentConfig(safety_settings = self.SAFETY_SETTINGS, **fields, **budget_config(stage))
+        return config, expires_at
+
+    def _create_context_cache(self, stage:str, fields:dict):
+        try:
+            return self._api_client.caches.create(
+                model = self.MODEL,
+                config = types.CreateCachedContentConfig(
+                    display_name = f"nlu-{stage}",
+                    system_instruction = fields["system_instruction"],
+                    tools = fields.get("tools"),
+                    ttl = f"{CONTEXT_CACHE_TTL_S}s",
+                ),
+            )
+        except Exception as exc:
+            logger.info(f"NLU: no context cache for {stage} ({type(exc).__name__}: {exc}); sending the prompt inline")
+            return None
+
+    def _slot_config(self, intent):
+        config = self._slot_configs.get(intent)
+        if config is not None:
+            return config
+        sys_instruct = f"""You are a helpful banking assistant. Given that the customer wants to do {intent},
+        {self._create_payload_prompt(intent)}. Only reply the customer with natural language."""
+        spec = policy.specs.get(intent)
+        config = types.GenerateContentConfig(
+            temperature = 1,
+            top_p = 1,
+            seed = 0,
+            safety_settings = self.SAFETY_SETTINGS,
+            response_mime_type = "application/json",
+            # The same call returns the slot values it heard, so nothing else needs the LLM this turn.
+            response_schema = policy.response_schema(spec) if spec else None,
+            system_instruction=[types.Part.from_text(text=sys_instruct)],
+            **budget_config("slot_filling"),
+        )
+        # Only the known intents are kept, so arbitrary intent strings can't grow the dict.
+        if spec is not None:
+            self._slot_configs[intent] = config
+        return config
+
+    def retrieve_grounded_info(self, query:str, cancel:threading.Event=None):
+        # A paraphrase of a recently answered question gets the same grounded answer.
+        hit = self.answer_cache.get(query)
+        if hit is not None:
+            return hit.answer, hit.context
 
         msg1_text1 = types.Part.from_text(text=query)
         contents = [
@@ -95,38 +357,19 @@ class ChatBot(genai.Client):
             ]
             ),
         ]
-        tools = [
-            types.Tool(retrieval=types.Retrieval(vertex_ai_search=types.VertexAISearch(
-                datastore=self.DATASTORE_ID))),
-        ]
-
-        generate_content_config = types.GenerateContentConfig(
-            temperature = 1,
-            top_p = 0.95,
-            seed = 0,
-            max_output_tokens = 65535,
-            safety_settings = self.SAFETY_SETTINGS,
-            tools = tools,
-            system_instruction=[types.Part.from_text(
-                text="""You are a helpful banking assistant with a wealth of knowledge about ING's products and processes. 
-                Help to retrieve relevant information to support this customer's request. 
-                If they are asking for help with something that requires more information, ask them for their full name and date of birth.
-                Assume that you are deployed by ING and customers who speak to you have given consent for you to access their personal information."""
-                )],
-            thinking_config=types.ThinkingConfig(
-            thinking_budget=-1,
-            ),
-        )
-
         response = []
-        for chunk in self._api_client.models.generate_content_stream(
-            model = self.MODEL,
-            contents = contents,
-            config = generate_content_config,
-            ):
-            if not chunk.candidates or not chunk.candidates[0].content or not chunk.candidates[0].content.parts:
-                continue
-            response.append(chunk)
+        stream = self._generate("grounding", contents, self._static_config("grounding"))
+        try:
+            for chunk in stream:
+                # Set by start_convo once the intent shows the answer won't be used.
+                if cancel is not None and cancel.is_set():
+                    return "", ""
+                if not chunk.candidates or not chunk.candidates[0].content or not chunk.candidates[0].content.parts:
+                    continue
+                response.append(chunk)
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
 
         relevant_docs = []
         for r in response:
@@ -137,94 +380,30 @@ class ChatBot(genai.Client):
         relevant_context = "\n\n".join( [doc.retrieved_context.text for doc in relevant_docs] )
         
         full_text = "\n".join([chunk.text for chunk in response])
+        self.answer_cache.put(query, full_text, relevant_context)
         return full_text, relevant_context
     
     def classify_intent(self, query:str):
+        intent_js = {}
+        for members in self.classify_intent_stream(query):
+            intent_js.update(members)
+        return json.dumps(intent_js)
 
-        intent_schema = {
-        "description": "Schema for classifying the user's core intent.",
-        "type": "OBJECT",
-        "properties": {
-            "intent": {
-            "description": "The primary intent or category of the user's request.",
-            "type": "STRING",
-            "enum": [
-                "Update customer information", #
-                "Query for details about their existing product", #
-                "Query for their account balance",
-                "Query for details about their transactions", #
-                "Get more information about the bank's product", #infomational
-                "Block or unblock or card", #
-                "Speak to a human or create appointment at the branch",  #infomational
-                "Something else"  #infomational
-            ]
-            },
-            "summary": {
-            "description": "Summary of the customer's request",
-            "type": "STRING"
-            },
-            "auth_required": {
-            "type": "BOOLEAN"
-            },
-            "questions": {
-            "description": "Questions to ask the customer",
-            "type": "STRING"
-            }
-        },
-        "required": [
-            "intent",
-            "summary",
-            "auth_required"
-        ]
-        }
+    def classify_intent_stream(self, query:str):
+        """Yields the members of the intent JSON as each one closes in the stream."""
+        return self._intent_stream(query, intents.classify_local(query))
 
-        sys_instruct = """You are a helpful banking assistant. Here more information about the SQL database you have access to and the fields available in each table:
-        1. Customers table
-        customer_id	STRING	REQUIRED	
-        name	STRING	NULLABLE	
-        birthdate	STRING	NULLABLE	(DD-MM-YYYY)
-        email	STRING	NULLABLE	
-        phone	STRING	NULLABLE	
-        address	STRING	NULLABLE	
-        segment_code	STRING	NULLABLE	(ADULT,CHILD,PROSPECT)
-
-        2. Products table
-        product_id	STRING	REQUIRED
-        customer_id	STRING	REQUIRED
-        product_type	STRING	REQUIRED
-        product_name	STRING	REQUIRED
-        opened_date	STRING	REQUIRED	(DD-MM-YYYY)
-        status	STRING	REQUIRED
-
-        3. Transactions table
-        transaction_id	STRING	REQUIRED
-        product_id	STRING	REQUIRED
-        date	STRING	REQUIRED
-        amount	FLOAT	REQUIRED
-        currency	 STRING	REQUIRED
-        description	STRING	NULLABLE
-        transaction_type STRING REQUIRED (Credit,Debit)
-
-        Classify the intention of this customer, choose only one option. Summarise their question retaining all information that is useful to help us generate a API request to complete their task. List questions to ask the customer for information we do not yet have but we require to help them perform the task."""
-        
-        generate_content_config = types.GenerateContentConfig(
-            temperature = 1,
-            top_p = 1,
-            seed = 0,
-            max_output_tokens = 65535,
-            safety_settings = self.SAFETY_SETTINGS,
-            response_mime_type = "application/json",
-            response_schema = intent_schema,
-            system_instruction=[types.Part.from_text(text=sys_instruct)],
-            thinking_config=types.ThinkingConfig(
-            thinking_budget=-1,
-            ),
-        )
+    def _intent_stream(self, query:str, local:intents.IntentPrediction=None):
+        # Unambiguous utterances ("block my card") are classified locally; Gemini
+        # only sees the ones the local model isn't confident about.
+        if local is not None:
+            yield local.intent_js(query)
+            return
 
-        response = []
-        for chunk in self._api_client.models.generate_content_stream(
-            model = self.MODEL,
-            contents = [
+        parser = IncrementalJSONObject()
+        stream = self._generate(
+            "intent",
+            [
                 types.Content(
                 role="user",
                 parts=[
@@ -232,13 +411,21 @@ class ChatBot(genai.Client):
                 ]
                 ),
             ],
-            config = generate_content_config,
-            ):
-            if not chunk.candidates or not chunk.candidates[0].content or not chunk.candidates[0].content.parts:
-                continue
-            response.append(chunk.text)
-        
-        return " ".join(response)
+            self._static_config("intent"),
+            )
+        try:
+            for chunk in stream:
+                if not chunk.candidates or not chunk.candidates[0].content or not chunk.candidates[0].content.parts:
+                    continue
+                members = parser.feed(chunk.text or "")
+                if members:
+                    yield members
+        finally:
+            # Also runs when the caller stops reading early.
+            if hasattr(stream, "close"):
+                stream.close()
+        if not parser.members:
+            yield parser.value()
 
     # def auth_dummy_prompt(self): ### Change to Dutch
     #     return "Please authenticate yourself by logging into your banking app."
@@ -247,26 +434,81 @@ class ChatBot(genai.Client):
     #     return "Thank you, you have been successfully authenticated."
     
     def _create_payload_prompt(self, intent):
+        # From the request model the policy validates against, so the prompt can't drift from the API.
+        spec = policy.specs.get(intent)
+        payload = policy.payload_prompt(spec) if spec else ""
         prompt = f"""Formulate questions to ask the customer for details you need to fill in this payload:
-        {self.payload_mapping.get(intent).get("payload")}
+        {payload}
         """
         return prompt
 
-    def start_convo(self, query):
-        info, relevant_docs = self.retrieve_grounded_info(query)
-        intent_js = self._parse_json( self.classify_intent(query) )
+    def _history(self, session:Session):
+        contents = []
+        if session.summary:
+            contents.append(types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=f"Earlier in this conversation: {session.summary}")]
+            ))
+        for turn in session.turns:
+            contents.append(types.Content(role=turn.role, parts=[types.Part.from_text(text=turn.text)]))
+        return contents
+
+    def start_convo(self, query, session_id:str=DEFAULT_SESSION):
+        # Grounding and intent classification are independent: run them side by
+        # side and drop the grounded answer if the intent doesn't need it.
+        started = time.perf_counter()
+        # A confident local prediction is known before any call: the grounded
+        # search is only started when that intent replies with its answer.
+        local = intents.classify_local(query)
+        cancel = threading.Event()
+        grounding = None
+        if local is None or needs_grounding(local.intent_js(query)):
+            grounding = get_executor().submit(self.retrieve_grounded_info, query, cancel)
+        # Route as soon as "intent" and "auth_required" close; keep reading only
+        # if the branch replies with the rest of the JSON.
+        intent_js, route_ms = {}, None
+        intent_stream = self._intent_stream(query, local)
+        try:
+            for members in intent_stream:
+                intent_js.update(members)
+                if route_ms is None and is_routable(intent_js):
+                    route_ms = (time.perf_counter() - started) * 1000
+                    if grounding is not None and not needs_grounding(intent_js):
+                        cancel.set()
+                        grounding.cancel()
+                    if not needs_full_intent(intent_js):
+                        break
+        except Exception:
+            cancel.set()
+            raise
+        finally:
+            intent_stream.close()
+        intent_ms = (time.perf_counter() - started) * 1000
+        if grounding is not None and needs_grounding(intent_js):
+            info, relevant_docs = grounding.result()
+        else:
+            cancel.set()
+            if grounding is not None:
+                grounding.cancel()
+            info, relevant_docs = "", ""
+        timings = {
+            "route_ms": round(route_ms if route_ms is not None else intent_ms, 1),
+            "intent_ms": round(intent_ms, 1),
+            "turn_ms": round((time.perf_counter() - started) * 1000, 1),
+            "grounding_started": grounding is not None,
+            "grounding_cancelled": grounding is not None and cancel.is_set(),
+        }
         reply = f"""{info}
         {'I need more information from you: '+intent_js.get('questions') if intent_js.get('questions') is not None else ''}"""
-        self.chat_history = [
-            types.Content(
-            role="user",
-            parts=[types.Part.from_text(text=query)]
-            ),
-            types.Content(
-            role="model",
-            parts=[types.Part.from_text(text=reply)]
-            )
-        ]
+        with self.sessions.open(session_id) as session:
+            session.reset()
+            session.add("user", query)
+            session.add("model", reply)
+            session.intent = intent_js.get("intent")
+            session.intent_js = intent_js
+            session.timings = timings
+            # "Block my card" already fills the action slot.
+            policy.update(session.intent, session.slots, query)
         if (intent_js.get("intent", None) == "Something else") or (intent_js.get("intent", None) is None):
             reply = "Please try again so that I can help you."
             return reply, None, intent_js
@@ -274,82 +516,43 @@ class ChatBot(genai.Client):
         elif intent_js.get('auth_required'):
             return reply,relevant_docs,intent_js
         
-        elif intent_js.get('intent') in ["Get more information about the bank's product", "Speak to a human or create appointment at the branch"]: 
+        elif intent_js.get('intent') in INFORMATIONAL_INTENTS:
             #### TO-DO just reply with information and end convo
             return reply,relevant_docs,intent_js
         
         else:
             return None,None,None
 
-    def continue_convo_auth(self, user_reply, intent):
+    def continue_convo_auth(self, user_reply, intent, session_id:str=DEFAULT_SESSION):
         
-        sys_instruct = f"""You are a helpful banking assistant. Given that the customer wants to do {intent},
-        {self._create_payload_prompt(intent)}. Only reply the customer with natural language."""
-        generate_content_config = types.GenerateContentConfig(
-            temperature = 1,
-            top_p = 1,
-            seed = 0,
-            max_output_tokens = 65535,
-            safety_settings = self.SAFETY_SETTINGS,
-            response_mime_type = "application/json",
-            system_instruction=[types.Part.from_text(text=sys_instruct)],
-        )
-
-        content = self.chat_history.copy()
-        content.append(
-            types.Content(
-            role="user",
-            parts=[
-                types.Part.from_text(text=user_reply)
-            ])
-        )
-
-        for chunk in self._api_client.models.generate_content_stream(
-            model = self.MODEL,
-            contents = content,
-            config = generate_content_config,
-            ):
-            reply = chunk.text
-            self.chat_history = content
-
-        if self.evaluate_chat_history(intent) in ['True', 'true']:
-            self.end_convo = True
-            return "Thank you for you cooperation. I have all the information I need. I will proceed with your request"
-        else:
-            return "I still need more information frorm you"
-    
-    def evaluate_chat_history(self, intent):
-        all_history = "\n".join([pt.text for pt in [utter.parts[0] for utter in self.chat_history]])
+        spec = policy.specs.get(intent)
+        generate_content_config = self._slot_config(intent)
 
-        generate_content_config = types.GenerateContentConfig(
-            temperature = 1,
-            top_p = 1,
-            seed = 0,
-            max_output_tokens = 65535,
-            safety_settings = self.SAFETY_SETTINGS,
-            response_mime_type = "application/json",
-            system_instruction=[types.Part.from_text(text=f"""You are an expert in writing API requests. Given the above conversation, evaluate if we have sufficient details to proceed with writing the API request with this payload:
-                                                     {self.payload_mapping.get(intent)}. Return your result in boolean format.""")],
-            thinking_config=types.ThinkingConfig(
-            thinking_budget=-1,
-            ),
-        )
-
-        response = []
-        for chunk in self._api_client.models.generate_content_stream(
-            model = self.MODEL,
-            contents = [
+        # Turns of one session run one at a time; other sessions aren't held up.
+        with self.sessions.open(session_id) as session:
+            content = self._history(session)
+            content.append(
                 types.Content(
                 role="user",
                 parts=[
-                    types.Part.from_text(text=all_history)
-                ]
-                ),
-            ],
-            config = generate_content_config,
-            ):
-            if not chunk.candidates or not chunk.candidates[0].content or not chunk.candidates[0].content.parts:
-                continue
-            response.append(chunk.text)
-        
-        return "\n".join(response)
+                    types.Part.from_text(text=user_reply)
+                ])
+            )
+
+            response = []
+            for chunk in self._generate("slot_filling", content, generate_content_config):
+                if chunk.text:
+                    response.append(chunk.text)
+            response_js = self._parse_json("".join(response)) if spec else {}
+            if not isinstance(response_js, dict):
+                response_js = {}
+            session.add("user", user_reply)
+            session.add("model", response_js.get("reply") or "".join(response))
+
+            # Completeness is checked against the API's request model, not by another Gemini call.
+            decision = policy.step(intent, session.slots, user_reply, response_js.get("slots"))
+            if decision.complete:
+                session.end_convo = True
+                return "Thank you for you cooperation. I have all the information I need. I will proceed with your request"
+            else:
+                return f"I still need more information from you. {decision.question}"
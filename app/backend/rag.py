@@ -0,0 +1,1238 @@
+# app/backend/rag.py
+from __future__ import annotations
+
+import argparse
+import hashlib
+import heapq
+import importlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+import numpy as np
+from cachetools import TTLCache
+
+from .config import CACHE_DIR, default_chunks_directory
+
+logger = logging.getLogger("uvicorn")
+
+TOKEN_RE = re.compile(r"\b\w+\b")
+
+# Only the head of each chunk is handed to the LLM as context.
+SNIPPET_CHARS = 2000
+INDEX_DIR = Path(os.getenv("RAG_INDEX_DIR", CACHE_DIR / "bm25"))
+LANG_PRIORITY = [
+    p.strip().lower() for p in os.getenv("CHUNKS_LANG_PRIORITY", "nl,fr,en").split(",") if p.strip()
+]
+# Fewer primary-language hits than this triggers the cross-language fallback.
+MIN_HITS = int(os.getenv("RAG_MIN_HITS", "3"))
+# How often get_index stats the manifest for a build/update by another process.
+INDEX_CHECK_S = float(os.getenv("RAG_INDEX_CHECK_S", "5"))
+# Chunks whose estimated shingle Jaccard similarity reaches this are one passage.
+DEDUP = os.getenv("RAG_DEDUP", "1") == "1"
+DEDUP_THRESHOLD = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.8"))
+SHINGLE_BASE = np.uint64(0x100000001B3)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def query_terms(query: str) -> List[str]:
+    """Query tokens worth looking up; very short words are mostly stop words."""
+    return [t for t in tokenize(query or "") if len(t) > 2]
+
+
+def read_chunk(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8", errors="ignore")
+    except OSError:
+        return ""
+
+
+def iter_chunk_files(root: Path, base: Optional[Path] = None) -> Iterable[Tuple[str, Path]]:
+    """Yield (doc_id, path) for every chunk, doc_id being the path relative to base (or root)."""
+    base = base or root
+    for path in sorted(root.rglob("*.txt")):
+        yield path.relative_to(base).as_posix(), path
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Document:
+    doc_id: str
+    text: str
+    length: int
+    content_hash: str = ""
+    # Every chunk file carrying this passage; doc_id is the first one.
+    sources: List[str] = field(default_factory=list)
+    signature: Optional[np.ndarray] = None
+
+    def __post_init__(self) -> None:
+        if not self.sources:
+            self.sources = [self.doc_id]
+
+
+@dataclass
+class SearchHit:
+    score: float
+    doc: Document
+
+
+class Deduplicator:
+    """
+    Exact (content hash) plus near-duplicate detection for chunk texts:
+    MinHash signatures over word shingles, bucketed with banded LSH so a
+    lookup only compares against plausible candidates.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEDUP_THRESHOLD,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle: int = 5,
+        seed: int = 1,
+    ) -> None:
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self.shingle = shingle
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Multiply-shift hash family; uint64 arithmetic wraps on purpose.
+        self._mul = rng.integers(1, 2**63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._add = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self._exact: Dict[str, int] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._signatures: Dict[int, np.ndarray] = {}
+        self._token_hashes: Dict[str, int] = {}
+
+    def _hash_tokens(self, tokens: List[str]) -> np.ndarray:
+        cache = self._token_hashes
+        for token in set(tokens).difference(cache):
+            cache[token] = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        return np.fromiter(map(cache.__getitem__, tokens), dtype=np.uint64, count=len(tokens))
+
+    def signature(self, text: str, tokens: Optional[List[str]] = None) -> np.ndarray:
+        tokens = self._hash_tokens(tokenize(text) if tokens is None else tokens)
+        # Shingle hashes as a polynomial over the token hashes, one numpy pass per shingle position.
+        width = min(self.shingle, len(tokens))
+        count = len(tokens) - width + 1
+        hashes = np.zeros(count, dtype=np.uint64)
+        for j in range(width):
+            hashes = hashes * SHINGLE_BASE + tokens[j : j + count]
+        hashes = np.unique(hashes)
+        mixed = (hashes[:, None] * self._mul[None, :] + self._add[None, :]) >> np.uint64(32)
+        return mixed.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the shingle sets."""
+        return float(np.mean(a == b))
+
+    def _band_keys(self, signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows : (band + 1) * self.rows].tobytes()
+
+    def add(self, key: int, digest: str, signature: Optional[np.ndarray]) -> None:
+        self._exact.setdefault(digest, key)
+        if signature is None:
+            return
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def match(self, digest: str, signature: np.ndarray) -> Optional[int]:
+        if digest in self._exact:
+            return self._exact[digest]
+        best, best_sim = None, self.threshold
+        for band_key in self._band_keys(signature):
+            for key in self._buckets.get(band_key, ()):
+                sim = self.similarity(signature, self._signatures[key])
+                if sim >= best_sim:
+                    best, best_sim = key, sim
+        return best
+
+
+def same_passage(a: Document, b: Document, threshold: float = DEDUP_THRESHOLD) -> bool:
+    if a.content_hash and a.content_hash == b.content_hash:
+        return True
+    if a.signature is None or b.signature is None:
+        return False
+    return Deduplicator.similarity(a.signature, b.signature) >= threshold
+
+
+def collapse_hits(hits: List[SearchHit]) -> List[SearchHit]:
+    """Keep the best-ranked hit of every passage so near-copies don't fill the slots."""
+    kept: List[SearchHit] = []
+    for hit in hits:
+        if not any(same_passage(hit.doc, other.doc) for other in kept):
+            kept.append(hit)
+    return kept
+
+
+class BM25Index:
+    """
+    Inverted index over the website chunks with Okapi BM25 scoring.
+    Postings are stored as term -> [doc, tf, doc, tf, ...] so the index
+    round-trips through JSON without per-posting objects. With dedup on,
+    a chunk that is an exact or near copy of an indexed passage is only
+    recorded as another source of that passage; the MinHash signatures
+    that takes are kept in a binary sidecar (``<name>.minhash.npy``), not
+    in the JSON the search path loads.
+    """
+
+    def __init__(
+        self,
+        docs: List[Document],
+        postings: Dict[str, List[int]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        version: str = "",
+        dedup: bool = DEDUP,
+    ) -> None:
+        self.docs = docs
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self.version = version
+        self.dedup_enabled = dedup
+        self._rebuild_dedup()
+        self._refresh_stats()
+
+    def _refresh_stats(self) -> None:
+        n_docs = len(self.docs)
+        avgdl = (sum(d.length for d in self.docs) / n_docs) if n_docs else 0.0
+        self.avgdl = avgdl or 1.0
+        # Per-document length normalisation, precomputed so scoring is a lookup.
+        self._norm = [
+            self.k1 * (1 - self.b + self.b * d.length / self.avgdl) for d in self.docs
+        ]
+
+    def _rebuild_dedup(self) -> None:
+        self.dedup = Deduplicator() if self.dedup_enabled else None
+        if self.dedup is None:
+            return
+        for idx, doc in enumerate(self.docs):
+            self.dedup.add(idx, doc.content_hash, doc.signature)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    @property
+    def source_count(self) -> int:
+        return sum(len(doc.sources) for doc in self.docs)
+
+    @classmethod
+    def build(
+        cls,
+        documents: Iterable[Tuple[str, str]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        dedup: bool = DEDUP,
+    ) -> "BM25Index":
+        index = cls([], {}, k1=k1, b=b, dedup=dedup)
+        for doc_id, text in documents:
+            index._add(doc_id, text)
+        index._finish()
+        return index
+
+    def _add(self, doc_id: str, text: str) -> bool:
+        """Index one chunk; False when it was empty or folded into an existing passage."""
+        if not text:
+            return False
+        digest = content_hash(text)
+        tokens = tokenize(text)
+        signature = None
+        if self.dedup is not None:
+            signature = self.dedup.signature(text, tokens)
+            match = self.dedup.match(digest, signature)
+            if match is not None:
+                self.docs[match].sources.append(doc_id)
+                return False
+        doc_idx = len(self.docs)
+        self.docs.append(
+            Document(
+                doc_id=doc_id,
+                text=text[:SNIPPET_CHARS],
+                length=len(tokens),
+                content_hash=digest,
+                signature=signature,
+            )
+        )
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, []).extend((doc_idx, tf))
+        if self.dedup is not None:
+            self.dedup.add(doc_idx, digest, signature)
+        return True
+
+    def _finish(self) -> None:
+        digest = hashlib.sha1()
+        for doc in sorted(self.docs, key=lambda d: d.doc_id):
+            digest.update(
+                f"{doc.doc_id}\0{doc.content_hash}\0{','.join(doc.sources)}\n".encode("utf-8")
+            )
+        self.version = digest.hexdigest()[:16]
+        self._refresh_stats()
+
+    def patch(
+        self, removed: Iterable[str], added: Iterable[Tuple[str, str]]
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Drop and (re)insert chunk files in place. Surviving postings are only
+        renumbered, so the cost is proportional to the changed chunks plus a
+        linear pass over the postings, never a re-tokenization of the corpus.
+        Returns the passage ids that disappeared and the ones that were
+        (re)inserted, so derived indexes can follow.
+        """
+        added = list(added)
+        owner = {source: i for i, doc in enumerate(self.docs) for source in doc.sources}
+        drop = set()
+        dropped: List[str] = []
+        inserted: List[str] = []
+        for source in list(removed) + [doc_id for doc_id, _ in added]:
+            i = owner.pop(source, None)
+            if i is None:
+                continue
+            doc = self.docs[i]
+            doc.sources.remove(source)
+            if not doc.sources:
+                drop.add(i)
+                dropped.append(doc.doc_id)
+            elif doc.doc_id == source:
+                # Another copy of the passage survives; it becomes the representative.
+                dropped.append(doc.doc_id)
+                doc.doc_id = doc.sources[0]
+                inserted.append(doc.doc_id)
+        if drop:
+            remap: Dict[int, int] = {}
+            docs: List[Document] = []
+            for i, doc in enumerate(self.docs):
+                if i not in drop:
+                    remap[i] = len(docs)
+                    docs.append(doc)
+            postings: Dict[str, List[int]] = {}
+            for term, plist in self.postings.items():
+                kept: List[int] = []
+                for j in range(0, len(plist), 2):
+                    new_idx = remap.get(plist[j])
+                    if new_idx is not None:
+                        kept.extend((new_idx, plist[j + 1]))
+                if kept:
+                    postings[term] = kept
+            self.docs, self.postings = docs, postings
+            self._rebuild_dedup()
+        for doc_id, text in added:
+            if self._add(doc_id, text):
+                inserted.append(doc_id)
+        self._finish()
+
+        live = {doc.doc_id for doc in self.docs}
+        return (
+            sorted({d for d in dropped if d not in live}),
+            [d for d in dict.fromkeys(inserted) if d in live],
+        )
+
+    @classmethod
+    def from_directory(
+        cls, root: Path, base: Optional[Path] = None, dedup: bool = DEDUP
+    ) -> "BM25Index":
+        return cls.build(
+            ((doc_id, read_chunk(path)) for doc_id, path in iter_chunk_files(root, base)),
+            dedup=dedup,
+        )
+
+    def idf(self, term: str) -> float:
+        plist = self.postings.get(term)
+        if not plist:
+            return 0.0
+        df = len(plist) // 2
+        return math.log(1 + (len(self.docs) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 5) -> List[SearchHit]:
+        terms = Counter(query_terms(query))
+        if not terms:
+            # Keep some context flowing when the query has nothing to match on.
+            return [SearchHit(0.0, doc) for doc in self.docs[:k]]
+
+        k1_plus_1 = self.k1 + 1
+        norm = self._norm
+        scores: Dict[int, float] = {}
+        for term, qtf in terms.items():
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            weight = self.idf(term) * qtf
+            for i in range(0, len(plist), 2):
+                doc_idx, tf = plist[i], plist[i + 1]
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + weight * tf * k1_plus_1 / (
+                    tf + norm[doc_idx]
+                )
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [SearchHit(score, self.docs[doc_idx]) for doc_idx, score in top]
+
+    @staticmethod
+    def signatures_path(path: Path) -> Path:
+        return path.with_suffix(".minhash.npy")
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        dedup = self.dedup_enabled and all(d.signature is not None for d in self.docs)
+        if dedup:
+            sidecar = self.signatures_path(path)
+            tmp_sidecar = sidecar.with_name(sidecar.name + ".tmp")
+            with tmp_sidecar.open("wb") as f:
+                np.save(f, np.stack([d.signature for d in self.docs]) if self.docs else np.zeros((0, 0), np.uint32))
+            os.replace(tmp_sidecar, sidecar)
+        payload = {
+            "version": self.version,
+            "k1": self.k1,
+            "b": self.b,
+            "dedup": dedup,
+            "docs": [[d.doc_id, d.length, d.text, d.content_hash, d.sources] for d in self.docs],
+            "postings": self.postings,
+        }
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with path.open("r", encoding="utf-8") as f:
+            payload = json.load(f)
+        docs = [
+            Document(
+                doc_id=d[0],
+                length=d[1],
+                text=d[2],
+                content_hash=d[3],
+                sources=d[4],
+            )
+            for d in payload["docs"]
+        ]
+        if payload.get("dedup"):
+            cls._load_signatures(path, docs)
+        return cls(
+            docs,
+            payload["postings"],
+            k1=payload["k1"],
+            b=payload["b"],
+            version=payload["version"],
+            dedup=payload.get("dedup", False),
+        )
+
+    @classmethod
+    def _load_signatures(cls, path: Path, docs: List[Document]) -> None:
+        sidecar = cls.signatures_path(path)
+        try:
+            signatures = np.load(sidecar)
+        except (OSError, ValueError) as exc:
+            # Exact-hash dedup still works; near copies of these passages go unnoticed until a rebuild.
+            logger.warning(f"RAG: no MinHash signatures for {path.name} ({exc}), near-duplicate checks off for its passages")
+            return
+        if len(signatures) != len(docs):
+            logger.warning(f"RAG: {sidecar.name} does not match {path.name}, near-duplicate checks off for its passages")
+            return
+        for doc, signature in zip(docs, signatures):
+            doc.signature = signature
+
+
+def load_or_build(root: Path, path: Path) -> BM25Index:
+    """Load the persisted index of one partition folder, building (and persisting) it on first use."""
+    if path.exists() and path.stat().st_size > 0:
+        try:
+            return BM25Index.load(path)
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning(f"RAG: could not load index {path}, rebuilding: {exc}")
+    started = time.perf_counter()
+    index = BM25Index.from_directory(root, root.parent)
+    try:
+        index.save(path)
+    except OSError as exc:
+        logger.warning(f"RAG: could not persist index to {path}: {exc}")
+    logger.info(
+        f"RAG: built index over {len(index)} chunks of {root.name} "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return index
+
+
+def passage_texts(index: BM25Index, root: Path) -> Iterable[Tuple[str, str]]:
+    """Full text of every unique passage, for indexes derived from the lexical one."""
+    for doc in index.docs:
+        yield doc.doc_id, read_chunk(root / doc.doc_id)
+
+
+def partition_for(lang: Optional[str]) -> str:
+    """Map a request locale ("nl-BE", "fr-BE", "en-GB") to its chunk folder."""
+    return (lang or "").split("-")[0].strip().lower()
+
+
+class PartitionStats:
+    """Per-partition latency and fallback counters; cheap enough to keep always on."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._searches: Counter = Counter()
+        self._search_ms: Dict[str, float] = {}
+        self._primary: Counter = Counter()
+        self._fallbacks: Counter = Counter()
+
+    def record_search(self, partition: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self._searches[partition] += 1
+            self._search_ms[partition] = self._search_ms.get(partition, 0.0) + elapsed_ms
+
+    def record_query(self, primary: str, fell_back: bool) -> None:
+        with self._lock:
+            self._primary[primary] += 1
+            if fell_back:
+                self._fallbacks[primary] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            out = {}
+            for partition in sorted(set(self._searches) | set(self._primary)):
+                searches = self._searches[partition]
+                primary = self._primary[partition]
+                out[partition] = {
+                    "searches": searches,
+                    "mean_search_ms": round(self._search_ms.get(partition, 0.0) / searches, 4)
+                    if searches
+                    else 0.0,
+                    "primary_queries": primary,
+                    "fallbacks": self._fallbacks[partition],
+                    "fallback_rate": round(self._fallbacks[partition] / primary, 4) if primary else 0.0,
+                }
+            return out
+
+
+class PartitionedIndex:
+    """
+    One BM25 index per chunk language folder. A query is scored against the
+    partition of its language only; the remaining partitions are tried in
+    CHUNKS_LANG_PRIORITY order when that returns fewer than min_hits results.
+    """
+
+    def __init__(self, partitions: Dict[str, BM25Index], priority: List[str]) -> None:
+        self.partitions = partitions
+        self.priority = [p for p in priority if p in partitions] + sorted(
+            p for p in partitions if p not in priority
+        )
+        self.stats = PartitionStats()
+        # Partitions are replaced, never mutated, while serving; see reload_index.
+        self._version = ",".join(f"{name}:{partitions[name].version}" for name in self.priority)
+
+    def __len__(self) -> int:
+        return sum(len(index) for index in self.partitions.values())
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    @classmethod
+    def load_or_build(cls, root: Path, index_dir: Path, priority: List[str]) -> "PartitionedIndex":
+        partitions = {
+            folder.name: load_or_build(folder, index_dir / f"{folder.name}.json")
+            for folder in sorted(root.iterdir())
+            if folder.is_dir()
+        } if root.is_dir() else {}
+        return cls(partitions, priority)
+
+    def search(
+        self, query: str, lang: Optional[str] = None, k: int = 5, min_hits: Optional[int] = None
+    ) -> List[SearchHit]:
+        if not self.priority:
+            return []
+        primary = partition_for(lang)
+        if primary not in self.partitions:
+            primary = self.priority[0]
+        min_hits = min(k, MIN_HITS if min_hits is None else min_hits)
+
+        hits = self._search_partition(primary, query, k)
+        fell_back = len(hits) < min_hits
+        if fell_back:
+            # Primary results keep their place; other languages only top up.
+            for name in self.priority:
+                if len(hits) >= k:
+                    break
+                if name != primary:
+                    hits = collapse_hits(hits + self._search_partition(name, query, k))[:k]
+        self.stats.record_query(primary, fell_back)
+        return hits
+
+    def _search_partition(self, name: str, query: str, k: int) -> List[SearchHit]:
+        started = time.perf_counter()
+        hits = self.partitions[name].search(query, k)
+        self.stats.record_search(name, (time.perf_counter() - started) * 1000)
+        return hits
+
+
+_index: Optional[PartitionedIndex] = None
+_index_stamp: Optional[Tuple[int, int, int]] = None
+_index_checked = 0.0
+_index_lock = threading.Lock()
+
+
+def _manifest_stamp(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def get_index() -> PartitionedIndex:
+    """
+    The loaded indexes. Build and update write the manifest last, so at most
+    every INDEX_CHECK_S it is stat'ed and a changed stamp reloads the indexes;
+    other callers keep the loaded ones until the new ones are in.
+    """
+    global _index_checked
+    index = _index
+    if index is None:
+        return reload_index()
+    if time.monotonic() - _index_checked < INDEX_CHECK_S:
+        return index
+    with _index_lock:
+        if time.monotonic() - _index_checked < INDEX_CHECK_S:
+            return _index
+        _index_checked = time.monotonic()
+        changed = _manifest_stamp(MANIFEST_PATH) != _index_stamp
+    if changed:
+        logger.info(f"RAG: {MANIFEST_PATH.name} changed, reloading the indexes")
+        return reload_index()
+    return index
+
+
+def retrieve(query: str, lang: Optional[str] = None, k: int = 5) -> List[SearchHit]:
+    return get_index().search(query, lang=lang, k=k)
+
+
+class QueryCache:
+    """
+    LRU + TTL cache of formatted retrieval context. Keys ignore word order,
+    case and short words, so paraphrases with the same token bag share an
+    entry. Entries are dropped wholesale when the index version changes.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0) -> None:
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(query: str, lang: Optional[str], k: int, max_chars: int) -> Tuple:
+        bag = tuple(sorted(Counter(query_terms(query)).items()))
+        return partition_for(lang), bag, k, max_chars
+
+    def get(self, key: Tuple, version: str) -> Optional[str]:
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self.invalidations += 1
+                self._cache.clear()
+                self._version = version
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: Tuple, version: str, value: str) -> None:
+        with self._lock:
+            if version == self._version:
+                self._cache[key] = value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl_s": self._cache.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+query_cache = QueryCache(
+    maxsize=int(os.getenv("RAG_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RAG_CACHE_TTL", "600")),
+)
+
+
+def format_context(hits: Iterable[SearchHit], max_chars: int) -> str:
+    buf, total = [], 0
+    for hit in hits:
+        if total >= max_chars:
+            break
+        block = f"\n\n[DOC: {os.path.basename(hit.doc.doc_id)}]\n{hit.doc.text}"
+        buf.append(block)
+        total += len(block)
+    return "".join(buf).strip()
+
+
+def retrieve_context(
+    query: str, lang: Optional[str] = None, max_docs: int = 5, max_chars: int = 6000
+) -> str:
+    """Context block for the LLM prompt, served from query_cache when possible."""
+    index = get_index()
+    key = query_cache.key(query, lang, max_docs, max_chars)
+    cached = query_cache.get(key, index.version)
+    if cached is not None:
+        return cached
+    context = format_context(index.search(query, lang=lang, k=max_docs), max_chars)
+    query_cache.put(key, index.version, context)
+    return context
+
+
+def reload_index() -> PartitionedIndex:
+    """Pick up indexes rewritten by build/update; cached results go stale with the old version."""
+    global _index, _index_stamp, _index_checked
+    # Stamped before loading: an update that lands meanwhile is picked up by the next check.
+    stamp = _manifest_stamp(MANIFEST_PATH)
+    index = PartitionedIndex.load_or_build(default_chunks_directory(), INDEX_DIR, LANG_PRIORITY)
+    with _index_lock:
+        _index, _index_stamp, _index_checked = index, stamp, time.monotonic()
+        get_vector_index.cache_clear()
+    return index
+
+
+def retrieval_stats() -> Dict[str, Dict[str, float]]:
+    return get_index().stats.snapshot()
+
+
+# ---------------- Dense vectors ----------------
+VECTOR_DIR = Path(os.getenv("RAG_VECTOR_DIR", CACHE_DIR / "faiss"))
+DEFAULT_EMBEDDER = os.getenv("RAG_EMBEDDER", "hashing")
+NPROBE = int(os.getenv("RAG_NPROBE", "8"))
+LOAD_ATTEMPTS = 3
+
+
+class Embedder(Protocol):
+    name: str
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return one L2-normalised float32 row per text."""
+        ...
+
+
+@lru_cache(maxsize=1 << 16)
+def hash_feature(feature: str, dim: int) -> Tuple[int, float]:
+    """Bucket in [0, dim) and sign of a feature for signed feature hashing; stable across processes."""
+    value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return value % dim, (1.0 if value >> 63 else -1.0)
+
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of word unigrams and bigrams. Deterministic across
+    processes and machines, so the index can be built offline without a model.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 256) -> None:
+        self.dim = dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = Counter(tokens)
+            features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+            for feature, count in features.items():
+                bucket, sign = hash_feature(feature, self.dim)
+                out[row, bucket] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+EMBEDDERS: Dict[str, Callable[[int], Embedder]] = {"hashing": HashingEmbedder}
+
+
+def load_embedder(spec: str, dim: int = 256) -> Embedder:
+    """Resolve a registered embedder name or a "package.module:factory" path."""
+    if spec in EMBEDDERS:
+        return EMBEDDERS[spec](dim)
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Unknown embedder '{spec}'")
+    return getattr(importlib.import_module(module_name), attr)(dim)
+
+
+def _top_k(sims: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top-k of a (queries, candidates) score matrix, best first."""
+    k = min(k, sims.shape[1])
+    if k == 0:
+        empty = np.empty((sims.shape[0], 0))
+        return empty.astype(np.float32), empty.astype(np.int64)
+    idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(sims, idx, axis=1)
+    order = np.argsort(-top, axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(idx, order, axis=1)
+
+
+def _kmeans(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Spherical k-means; good enough to partition normalised embeddings for IVF."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        filled = norms[:, 0] > 0
+        centroids[filled] = sums[filled] / norms[filled]
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+class VectorIndex:
+    """
+    Dense chunk vectors for one language. The matrix lives in a .npy file
+    opened with mmap_mode="r", so loading is O(1) and workers share the page
+    cache. Optional IVF: rows are grouped by coarse centroid and a query only
+    scans the nprobe closest lists.
+
+    Each save writes the matrix and centroids under a new version; the
+    .meta.jsonl sidecar names that version and is replaced last, so a reader
+    sees either the previous index or the new one, never a mix.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        doc_ids: List[str],
+        embedder: Embedder,
+        centroids: Optional[np.ndarray] = None,
+        list_offsets: Optional[np.ndarray] = None,
+        nprobe: int = NPROBE,
+    ) -> None:
+        self.vectors = vectors
+        self.doc_ids = doc_ids
+        self.embedder = embedder
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.nprobe = nprobe
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @staticmethod
+    def paths(directory: Path, partition: str, version: str = "") -> Tuple[Path, Path, Path]:
+        stem = f"{partition}.{version}" if version else partition
+        return (
+            directory / f"{stem}.index",
+            directory / f"{partition}.meta.jsonl",
+            directory / f"{stem}.ivf.npy",
+        )
+
+    @classmethod
+    def build(
+        cls,
+        documents: Iterable[Tuple[str, str]],
+        embedder: Embedder,
+        nlist: int = 0,
+        batch_size: int = 256,
+    ) -> "VectorIndex":
+        doc_ids: List[str] = []
+        batches: List[np.ndarray] = []
+        pending_ids: List[str] = []
+        pending_texts: List[str] = []
+        for doc_id, text in documents:
+            if not text:
+                continue
+            pending_ids.append(doc_id)
+            pending_texts.append(text)
+            if len(pending_texts) >= batch_size:
+                batches.append(embedder.embed(pending_texts))
+                doc_ids.extend(pending_ids)
+                pending_ids, pending_texts = [], []
+        if pending_texts:
+            batches.append(embedder.embed(pending_texts))
+            doc_ids.extend(pending_ids)
+        vectors = (
+            np.vstack(batches).astype(np.float32)
+            if batches
+            else np.zeros((0, embedder.dim), dtype=np.float32)
+        )
+        return cls.from_vectors(vectors, doc_ids, embedder, nlist)
+
+    @classmethod
+    def from_vectors(
+        cls, vectors: np.ndarray, doc_ids: List[str], embedder: Embedder, nlist: int = 0
+    ) -> "VectorIndex":
+        if not nlist or len(doc_ids) < nlist * 4:
+            return cls(vectors, doc_ids, embedder)
+        centroids, assign = _kmeans(vectors, nlist)
+        return cls._grouped(vectors, doc_ids, embedder, centroids.astype(np.float32), assign)
+
+    @classmethod
+    def _grouped(
+        cls,
+        vectors: np.ndarray,
+        doc_ids: List[str],
+        embedder: Embedder,
+        centroids: np.ndarray,
+        assign: np.ndarray,
+    ) -> "VectorIndex":
+        order = np.argsort(assign, kind="stable")
+        offsets = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+        return cls(
+            np.ascontiguousarray(vectors[order]),
+            [doc_ids[i] for i in order],
+            embedder,
+            centroids=centroids,
+            list_offsets=offsets,
+        )
+
+    def patch(self, removed: Iterable[str], added: Sequence[Tuple[str, str]]) -> "VectorIndex":
+        """
+        Return a copy without the removed/re-added chunks plus fresh rows for
+        the added ones. Only the added texts are embedded; IVF keeps its
+        centroids and new rows go to their nearest list.
+        """
+        drop = set(removed) | {doc_id for doc_id, _ in added}
+        keep = np.asarray([i for i, doc_id in enumerate(self.doc_ids) if doc_id not in drop], dtype=np.int64)
+        new_vectors = (
+            self.embedder.embed([text for _, text in added]).astype(np.float32)
+            if added
+            else np.zeros((0, self.vectors.shape[1]), dtype=np.float32)
+        )
+        vectors = np.vstack([np.asarray(self.vectors[keep]), new_vectors])
+        doc_ids = [self.doc_ids[i] for i in keep] + [doc_id for doc_id, _ in added]
+        if self.centroids is None:
+            return VectorIndex(vectors, doc_ids, self.embedder, nprobe=self.nprobe)
+        lists = np.searchsorted(self.list_offsets, np.arange(len(self)), side="right") - 1
+        assign = np.concatenate(
+            [lists[keep], np.argmax(new_vectors @ self.centroids.T, axis=1)]
+        ) if len(new_vectors) else lists[keep]
+        return self._grouped(vectors, doc_ids, self.embedder, self.centroids, assign)
+
+    def save(self, directory: Path, partition: str) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        version = uuid.uuid4().hex[:12]
+        index_path, meta_path, ivf_path = self.paths(directory, partition, version)
+        header = {
+            "version": version,
+            "embedder": self.embedder.name,
+            "dim": self.embedder.dim,
+            "count": len(self),
+            "kind": "ivf" if self.centroids is not None else "flat",
+        }
+        if self.centroids is not None:
+            header["list_offsets"] = [int(x) for x in self.list_offsets]
+            with open(ivf_path, "wb") as f:
+                np.save(f, self.centroids)
+        with open(index_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32))
+        with open(meta_path.with_suffix(".tmp"), "w", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+            for row, doc_id in enumerate(self.doc_ids):
+                f.write(json.dumps({"row": row, "doc_id": doc_id}, ensure_ascii=False) + "\n")
+        # Sidecar last: until it is replaced, readers still resolve the previous version's files.
+        os.replace(meta_path.with_suffix(".tmp"), meta_path)
+        # Readers that already mapped an older matrix keep it; one that read the old sidecar
+        # but not the files yet gets FileNotFoundError, and load() retries with the new sidecar.
+        for path in directory.glob(f"{partition}.*"):
+            if path.name.endswith((".index", ".ivf.npy")) and path not in (index_path, ivf_path):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, directory: Path, partition: str) -> Optional["VectorIndex"]:
+        """Memory-map a built index; None when it has not been built yet."""
+        for attempt in range(LOAD_ATTEMPTS):
+            try:
+                return cls._load(directory, partition)
+            except FileNotFoundError:
+                # A concurrent save() replaced the sidecar and removed the version it named.
+                if attempt == LOAD_ATTEMPTS - 1:
+                    raise
+                time.sleep(0.05)
+        return None
+
+    @classmethod
+    def _load(cls, directory: Path, partition: str) -> Optional["VectorIndex"]:
+        meta_path = cls.paths(directory, partition)[1]
+        if not meta_path.exists():
+            return None
+        with meta_path.open("r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            doc_ids = [json.loads(line)["doc_id"] for line in f if line.strip()]
+        index_path, _, ivf_path = cls.paths(directory, partition, header.get("version", ""))
+        vectors = np.load(index_path, mmap_mode="r")
+        if vectors.shape[0] != len(doc_ids):
+            raise ValueError(f"{index_path} has {vectors.shape[0]} rows, sidecar has {len(doc_ids)}")
+        embedder = load_embedder(header["embedder"], header["dim"])
+        if header.get("kind") == "ivf":
+            return cls(
+                vectors,
+                doc_ids,
+                embedder,
+                centroids=np.load(ivf_path),
+                list_offsets=np.asarray(header["list_offsets"]),
+            )
+        return cls(vectors, doc_ids, embedder)
+
+    def search(self, queries: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Batched inner-product search: (scores, rows), each shaped (len(queries), k)."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.centroids is None:
+            return _top_k(queries @ self.vectors.T, k)
+
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        _, probes = _top_k(queries @ self.centroids.T, self.nprobe)
+        for qi, lists in enumerate(probes):
+            candidates = np.concatenate(
+                [np.arange(self.list_offsets[j], self.list_offsets[j + 1]) for j in lists]
+            )
+            if not len(candidates):
+                continue
+            top_scores, top_idx = _top_k(queries[qi : qi + 1] @ self.vectors[candidates].T, k)
+            found = top_idx.shape[1]
+            scores[qi, :found] = top_scores[0]
+            rows[qi, :found] = candidates[top_idx[0]]
+        return scores, rows
+
+    def search_text(self, query: str, k: int = 5) -> List[Tuple[float, str]]:
+        scores, rows = self.search(self.embedder.embed([query]), k)
+        return [
+            (float(score), self.doc_ids[row]) for score, row in zip(scores[0], rows[0]) if row >= 0
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_vector_index(partition: str) -> Optional[VectorIndex]:
+    return VectorIndex.load(VECTOR_DIR, partition)
+
+
+def dense_retrieve(query: str, lang: Optional[str] = None, k: int = 5) -> List[Tuple[float, str]]:
+    """Nearest chunks by embedding; empty when the vector index hasn't been built."""
+    index = get_vector_index(partition_for(lang) or LANG_PRIORITY[0])
+    return index.search_text(query, k) if index is not None else []
+
+
+# ---------------- Manifest / incremental updates ----------------
+MANIFEST_PATH = Path(os.getenv("RAG_MANIFEST_PATH", CACHE_DIR / "manifest.json"))
+
+
+def partition_of(doc_id: str) -> str:
+    return doc_id.split("/", 1)[0]
+
+
+@dataclass
+class ManifestEntry:
+    path: str
+    mtime: float
+    size: int
+    sha256: str
+
+
+@dataclass
+class ManifestDiff:
+    added: List[str]
+    changed: List[str]
+    deleted: List[str]
+    manifest: "Manifest"
+    # Text of every added/changed chunk, read once while diffing.
+    texts: Dict[str, str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.deleted)
+
+    def partitions(self) -> List[str]:
+        return sorted({partition_of(d) for d in self.added + self.changed + self.deleted})
+
+    def for_partition(self, partition: str) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """(removed doc ids, (doc id, text) to insert) restricted to one partition."""
+        removed = [d for d in self.deleted if partition_of(d) == partition]
+        upserts = [
+            (d, self.texts[d]) for d in self.added + self.changed if partition_of(d) == partition
+        ]
+        return removed, upserts
+
+
+class Manifest:
+    """Path, mtime, size and content hash of every chunk the indexes were built from."""
+
+    def __init__(self, entries: Optional[Dict[str, ManifestEntry]] = None) -> None:
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["Manifest"]:
+        if not path.exists():
+            return None
+        with path.open("r", encoding="utf-8") as f:
+            payload = json.load(f)
+        return cls({doc_id: ManifestEntry(**entry) for doc_id, entry in payload["files"].items()})
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"files": {doc_id: vars(entry) for doc_id, entry in sorted(self.entries.items())}}
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=0)
+        os.replace(tmp_path, path)
+
+    def diff(self, root: Path) -> ManifestDiff:
+        """Compare against the chunk directory. Files whose mtime and size match are not read."""
+        added: List[str] = []
+        changed: List[str] = []
+        texts: Dict[str, str] = {}
+        entries: Dict[str, ManifestEntry] = {}
+        for doc_id, path in iter_chunk_files(root):
+            stat = path.stat()
+            previous = self.entries.get(doc_id)
+            if previous and previous.mtime == stat.st_mtime and previous.size == stat.st_size:
+                entries[doc_id] = previous
+                continue
+            text = read_chunk(path)
+            digest = content_hash(text)
+            entries[doc_id] = ManifestEntry(doc_id, stat.st_mtime, stat.st_size, digest)
+            if previous is None:
+                added.append(doc_id)
+            elif previous.sha256 != digest:
+                changed.append(doc_id)
+            else:
+                continue  # touched but identical: refresh mtime only
+            texts[doc_id] = text
+        deleted = sorted(set(self.entries) - set(entries))
+        return ManifestDiff(added, changed, deleted, Manifest(entries), texts)
+
+
+def build_indexes(root: Path, index_dir: Path = INDEX_DIR, manifest_path: Path = MANIFEST_PATH) -> ManifestDiff:
+    """Full rebuild of every lexical partition; also records a fresh manifest."""
+    diff = Manifest().diff(root)
+    for partition in diff.partitions():
+        _, upserts = diff.for_partition(partition)
+        BM25Index.build(upserts).save(index_dir / f"{partition}.json")
+    diff.manifest.save(manifest_path)
+    return diff
+
+
+def update_indexes(
+    root: Path,
+    index_dir: Path = INDEX_DIR,
+    vector_dir: Path = VECTOR_DIR,
+    manifest_path: Path = MANIFEST_PATH,
+) -> ManifestDiff:
+    """
+    Re-tokenize / re-embed only the chunks that were added, changed or
+    deleted since the manifest was written, and patch the persisted indexes.
+    Without a manifest there is nothing to diff against, so this rebuilds.
+    """
+    manifest = Manifest.load(manifest_path)
+    if manifest is None:
+        logger.info(f"RAG: no manifest at {manifest_path}, doing a full build")
+        return build_indexes(root, index_dir, manifest_path)
+
+    diff = manifest.diff(root)
+    for partition in diff.partitions():
+        removed, upserts = diff.for_partition(partition)
+        path = index_dir / f"{partition}.json"
+        vectors = VectorIndex.load(vector_dir, partition)
+        if path.exists() and path.stat().st_size > 0:
+            index = BM25Index.load(path)
+            dropped, inserted = index.patch(removed, upserts)
+        else:
+            index = BM25Index.from_directory(root / partition, root)
+            dropped = vectors.doc_ids if vectors is not None else []
+            inserted = [doc.doc_id for doc in index.docs]
+        index.save(path)
+
+        if vectors is not None:
+            texts = dict(upserts)
+            vectors.patch(
+                dropped, [(d, texts[d] if d in texts else read_chunk(root / d)) for d in inserted]
+            ).save(vector_dir, partition)
+    # Manifest last, so an interrupted update is simply redone next time.
+    diff.manifest.save(manifest_path)
+    return diff
+
+
+def _main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the chunk retrieval indexes.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Tokenize all chunks and persist one BM25 index per language.")
+    build.add_argument("--chunks", type=Path, default=default_chunks_directory())
+    build.add_argument("--out", type=Path, default=INDEX_DIR)
+    vectors = sub.add_parser(
+        "build-vectors", help="Embed all chunks and write one dense index per language."
+    )
+    vectors.add_argument("--chunks", type=Path, default=default_chunks_directory())
+    vectors.add_argument("--out", type=Path, default=VECTOR_DIR)
+    vectors.add_argument(
+        "--embedder", default=DEFAULT_EMBEDDER, help="registered name or package.module:factory"
+    )
+    vectors.add_argument("--dim", type=int, default=256)
+    vectors.add_argument("--nlist", type=int, default=0, help="IVF lists; 0 writes a flat index")
+    update = sub.add_parser(
+        "update", help="Patch the persisted indexes with chunks changed since the last build."
+    )
+    update.add_argument("--chunks", type=Path, default=default_chunks_directory())
+    args = parser.parse_args(argv)
+
+    if args.command == "update":
+        started = time.perf_counter()
+        diff = update_indexes(args.chunks)
+        print(
+            f"added {len(diff.added)}, changed {len(diff.changed)}, deleted {len(diff.deleted)} "
+            f"chunks in {', '.join(diff.partitions()) or 'no partitions'} "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    if args.command == "build-vectors":
+        embedder = load_embedder(args.embedder, args.dim)
+        for folder in sorted(p for p in args.chunks.iterdir() if p.is_dir()):
+            started = time.perf_counter()
+            passages = load_or_build(folder, INDEX_DIR / f"{folder.name}.json")
+            index = VectorIndex.build(passage_texts(passages, args.chunks), embedder, nlist=args.nlist)
+            index.save(args.out, folder.name)
+            print(
+                f"{folder.name}: embedded {len(index)} passages ({embedder.name}, dim={embedder.dim}) "
+                f"in {time.perf_counter() - started:.2f}s -> {args.out}"
+            )
+
+    if args.command == "build":
+        started = time.perf_counter()
+        diff = build_indexes(args.chunks, args.out)
+        print(
+            f"indexed {len(diff.added)} chunks in {', '.join(diff.partitions())} "
+            f"in {time.perf_counter() - started:.2f}s -> {args.out}"
+        )
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,274 @@
+# app/backend/telemetry.py
+"""
+Per-call telemetry and per-stage budgets for the Gemini calls of nlu.ChatBot.
+
+Every call goes through ``observe_stream``, which records the stage, time to
+first chunk, total latency, input/output/thinking/cached token counts from
+the usage metadata, retries and the outcome (ok, error, timeout, cancelled).
+Records are aggregated per stage for ``/stats`` and ``/metrics`` (Prometheus
+text format) and, unless LLM_TELEMETRY_LOG=0, logged as one JSON line each.
+
+Budgets are per stage and read from the environment once, at import:
+
+    NLU_<STAGE>_THINKING_BUDGET    -1 dynamic, 0 off, empty: model default
+    NLU_<STAGE>_MAX_OUTPUT_TOKENS
+    NLU_<STAGE>_TIMEOUT_S          per attempt, also sent as the HTTP timeout
+    NLU_<STAGE>_RETRIES            retries before the first chunk arrives
+
+with STAGE one of GROUNDING, INTENT, SLOT_FILLING.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import asdict, dataclass
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("uvicorn")
+
+LOG_CALLS = os.getenv("LLM_TELEMETRY_LOG", "1") == "1"
+
+
+# ---------------- Budgets ----------------
+@dataclass(frozen=True)
+class StageBudget:
+    thinking_budget: Optional[int]      # None leaves the model default
+    max_output_tokens: int
+    timeout_s: float
+    retries: int
+
+
+# What the calls used before budgets were configurable, plus a timeout and one retry.
+DEFAULT_BUDGETS: Dict[str, StageBudget] = {
+    "grounding": StageBudget(-1, 65535, 60.0, 1),
+    "intent": StageBudget(-1, 65535, 30.0, 1),
+    "slot_filling": StageBudget(None, 65535, 30.0, 1),
+}
+
+
+def budget_from_env(stage: str, default: StageBudget) -> StageBudget:
+    prefix = f"NLU_{stage.upper()}_"
+    thinking = os.getenv(prefix + "THINKING_BUDGET")
+    return StageBudget(
+        thinking_budget=default.thinking_budget if thinking is None else (int(thinking) if thinking.strip() else None),
+        max_output_tokens=int(os.getenv(prefix + "MAX_OUTPUT_TOKENS", default.max_output_tokens)),
+        timeout_s=float(os.getenv(prefix + "TIMEOUT_S", default.timeout_s)),
+        retries=int(os.getenv(prefix + "RETRIES", default.retries)),
+    )
+
+
+BUDGETS: Dict[str, StageBudget] = {stage: budget_from_env(stage, b) for stage, b in DEFAULT_BUDGETS.items()}
+RETRY_BACKOFF_S = 0.25
+
+
+# ---------------- Records ----------------
+@dataclass
+class LLMCall:
+    stage: str
+    outcome: str = "ok"                 # ok | error | timeout | cancelled
+    error: str = ""
+    ttfc_ms: Optional[float] = None
+    latency_ms: float = 0.0
+    chunks: int = 0
+    retries: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    thinking_tokens: int = 0
+    cached_tokens: int = 0
+
+    def add_usage(self, usage) -> None:
+        self.input_tokens = getattr(usage, "prompt_token_count", None) or 0
+        self.output_tokens = getattr(usage, "candidates_token_count", None) or 0
+        self.thinking_tokens = getattr(usage, "thoughts_token_count", None) or 0
+        self.cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+
+
+BUCKETS_S = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+TOKEN_KINDS = ("input", "output", "thinking", "cached")
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS_S) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, edge in enumerate(self.buckets):
+            if value <= edge:
+                self.counts[i] += 1
+                break
+
+    def lines(self, name: str, labels: str) -> List[str]:
+        out, cumulative = [], 0
+        for edge, n in zip(self.buckets, self.counts):
+            cumulative += n
+            out.append(f'{name}_bucket{{{labels},le="{edge:g}"}} {cumulative}')
+        out.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+        return out
+
+
+class StageStats:
+    def __init__(self) -> None:
+        self.outcomes: Counter = Counter()
+        self.retries = 0
+        self.tokens: Counter = Counter()
+        self.with_usage = 0             # calls that got far enough to report token counts
+        self.ttfc = Histogram()
+        self.latency = Histogram()
+        self.recent_ttfc: Deque[float] = deque(maxlen=1000)
+        self.recent_latency: Deque[float] = deque(maxlen=1000)
+
+    def add(self, call: LLMCall) -> None:
+        self.outcomes[call.outcome] += 1
+        self.retries += call.retries
+        if call.input_tokens or call.output_tokens:
+            self.with_usage += 1
+        for kind in TOKEN_KINDS:
+            self.tokens[kind] += getattr(call, f"{kind}_tokens")
+        if call.ttfc_ms is not None:
+            self.ttfc.observe(call.ttfc_ms / 1000)
+            self.recent_ttfc.append(call.ttfc_ms)
+        self.latency.observe(call.latency_ms / 1000)
+        self.recent_latency.append(call.latency_ms)
+
+
+def _percentile(values: Iterable[float], q: float) -> Optional[float]:
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 1)
+
+
+class LLMTelemetry:
+    def __init__(self, log: bool = LOG_CALLS) -> None:
+        self.log = log
+        self._lock = threading.Lock()
+        self.stages: Dict[str, StageStats] = {}
+
+    def record(self, call: LLMCall) -> None:
+        with self._lock:
+            self.stages.setdefault(call.stage, StageStats()).add(call)
+        if self.log:
+            logger.info(json.dumps({"event": "llm_call", **asdict(call)}))
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            out: Dict[str, Dict[str, object]] = {}
+            for stage, stats in sorted(self.stages.items()):
+                calls = sum(stats.outcomes.values())
+                out[stage] = {
+                    "calls": calls,
+                    **{outcome: stats.outcomes[outcome] for outcome in ("ok", "error", "timeout", "cancelled")},
+                    "retries": stats.retries,
+                    "ttfc_p50_ms": _percentile(stats.recent_ttfc, 0.5),
+                    "ttfc_p95_ms": _percentile(stats.recent_ttfc, 0.95),
+                    "latency_p50_ms": _percentile(stats.recent_latency, 0.5),
+                    "latency_p95_ms": _percentile(stats.recent_latency, 0.95),
+                    **{
+                        f"mean_{kind}_tokens": round(stats.tokens[kind] / stats.with_usage, 1) if stats.with_usage else 0.0
+                        for kind in TOKEN_KINDS
+                    },
+                    "budget": asdict(BUDGETS[stage]) if stage in BUDGETS else None,
+                }
+            return out
+
+    def prometheus(self) -> str:
+        """The aggregates in the Prometheus text exposition format."""
+        lines = [
+            "# HELP nlu_llm_calls_total Gemini calls made by ChatBot, by stage and outcome.",
+            "# TYPE nlu_llm_calls_total counter",
+        ]
+        with self._lock:
+            stages = sorted(self.stages.items())
+            for stage, stats in stages:
+                for outcome, n in sorted(stats.outcomes.items()):
+                    lines.append(f'nlu_llm_calls_total{{stage="{stage}",outcome="{outcome}"}} {n}')
+            lines += ["# HELP nlu_llm_retries_total Attempts repeated before the first chunk.",
+                      "# TYPE nlu_llm_retries_total counter"]
+            lines += [f'nlu_llm_retries_total{{stage="{stage}"}} {stats.retries}' for stage, stats in stages]
+            lines += ["# HELP nlu_llm_tokens_total Tokens reported in the usage metadata, by kind.",
+                      "# TYPE nlu_llm_tokens_total counter"]
+            for stage, stats in stages:
+                for kind in TOKEN_KINDS:
+                    lines.append(f'nlu_llm_tokens_total{{stage="{stage}",kind="{kind}"}} {stats.tokens[kind]}')
+            lines += ["# HELP nlu_llm_ttfc_seconds Time to the first streamed chunk.",
+                      "# TYPE nlu_llm_ttfc_seconds histogram"]
+            for stage, stats in stages:
+                lines += stats.ttfc.lines("nlu_llm_ttfc_seconds", f'stage="{stage}"')
+            lines += ["# HELP nlu_llm_latency_seconds Time until the stream ended, failed or was dropped.",
+                      "# TYPE nlu_llm_latency_seconds histogram"]
+            for stage, stats in stages:
+                lines += stats.latency.lines("nlu_llm_latency_seconds", f'stage="{stage}"')
+        return "\n".join(lines) + "\n"
+
+
+llm_telemetry = LLMTelemetry()
+
+
+# ---------------- Instrumented stream ----------------
+def observe_stream(
+    stage: str,
+    start: Callable[[], Iterable],
+    budget: Optional[StageBudget] = None,
+    retryable: Callable[[BaseException], bool] = lambda exc: False,
+    telemetry: Optional[LLMTelemetry] = None,
+) -> Iterator:
+    """
+    The chunks of ``start()``, recorded as one call of ``stage``. Failures
+    ``retryable`` accepts are retried while nothing has been yielded yet; an
+    attempt running past the budget's timeout raises TimeoutError. Closing the
+    generator early (the caller stopped reading) records the call as cancelled.
+    """
+    budget = budget or BUDGETS[stage]
+    telemetry = telemetry or llm_telemetry
+    call = LLMCall(stage)
+    started = time.perf_counter()
+    usage = None
+    try:
+        while True:
+            deadline = time.perf_counter() + budget.timeout_s
+            stream = start()
+            try:
+                for chunk in stream:
+                    now = time.perf_counter()
+                    if call.chunks == 0:
+                        call.ttfc_ms = round((now - started) * 1000, 1)
+                    call.chunks += 1
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    if now > deadline:
+                        raise TimeoutError(f"{stage} stream ran past {budget.timeout_s:g}s")
+                    yield chunk
+                break
+            except GeneratorExit:
+                raise
+            except Exception as exc:
+                if call.chunks or call.retries >= budget.retries or not retryable(exc):
+                    raise
+                call.retries += 1
+                logger.warning(f"NLU: {stage} call failed ({type(exc).__name__}), retry {call.retries}/{budget.retries}")
+                time.sleep(RETRY_BACKOFF_S * call.retries)
+            finally:
+                if hasattr(stream, "close"):
+                    stream.close()
+    except GeneratorExit:
+        call.outcome = "cancelled"
+        raise
+    except Exception as exc:
+        call.outcome = "timeout" if isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__ else "error"
+        call.error = type(exc).__name__
+        raise
+    finally:
+        call.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        if usage is not None:
+            call.add_usage(usage)
+        telemetry.record(call)
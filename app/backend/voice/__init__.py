@@ -0,0 +1,2 @@
+# app/backend/voice/__init__.py
+# Marks the voice directory as a Python subpackage
\ No newline at end of file
@@ -0,0 +1,77 @@
+# app/backend/voice/pipeline.py
+"""
+Token stream -> sentences -> audio, overlapped: a sentence goes to TTS as
+soon as it is complete while the LLM is still generating the next ones, and
+audio comes out in sentence order.
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import AsyncIterator, Optional, Tuple
+
+from .tts import Synthesizer
+
+# End of sentence: terminal punctuation, optional closing quotes/brackets, then whitespace.
+SENTENCE_END = re.compile(r"[.!?…]+[\"'»)\]]*\s+")
+MIN_SENTENCE_CHARS = 24
+LOOKAHEAD = 3
+
+
+async def sentences(tokens: AsyncIterator[str], min_chars: int = MIN_SENTENCE_CHARS) -> AsyncIterator[str]:
+    """
+    Re-chunk a token stream into sentences. Pieces shorter than ``min_chars``
+    ("Mr.", "e.g.", "Yes.") are held and joined with what follows, which also
+    keeps TTS requests from getting too small to be worth a round trip.
+    """
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        start = 0
+        for match in SENTENCE_END.finditer(buffer):
+            if match.end() - start >= min_chars:
+                yield buffer[start:match.end()].strip()
+                start = match.end()
+        buffer = buffer[start:]
+    if buffer.strip():
+        yield buffer.strip()
+
+
+async def speak(
+    texts: AsyncIterator[str], synthesizer: Synthesizer, lang: str, lookahead: int = LOOKAHEAD
+) -> AsyncIterator[Tuple[str, bytes]]:
+    """
+    (sentence, audio) in order. Up to ``lookahead`` sentences are synthesised
+    ahead of the one being yielded; errors from either stage surface here.
+    """
+    queue: "asyncio.Queue[Optional[Tuple[str, asyncio.Future]]]" = asyncio.Queue(maxsize=lookahead)
+
+    async def produce() -> None:
+        try:
+            async for text in texts:
+                await queue.put((text, asyncio.ensure_future(synthesizer.asynthesize(text, lang))))
+        except Exception:
+            # Let the consumer finish what is queued; `await producer` re-raises.
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    pending = []
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            text, audio = item
+            pending.append(audio)
+            yield text, await audio
+        await producer
+    finally:
+        producer.cancel()
+        for audio in pending:
+            audio.cancel()
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                item[1].cancel()
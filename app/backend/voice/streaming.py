@@ -0,0 +1,225 @@
+# app/backend/voice/streaming.py
+"""
+Streaming speech-to-text over a WebSocket, one utterance per connection.
+
+Protocol (``/ws/stt?lang=nl-BE``):
+  client -> server  binary messages with audio as it is captured (the first
+                    one carries the container header, e.g. MediaRecorder's
+                    first WebM chunk), then optionally {"type": "end"}
+  server -> client  {"type": "interim", "text", "stability"}
+                    {"type": "final", "text"}
+                    {"type": "endpoint"}        recognizer heard the end of speech
+                    {"type": "end", "text"}     full transcript, then the socket closes
+
+Frames go through a bounded queue; when the recognizer falls behind, the
+receiver stops reading the socket, so TCP pushes back on the client instead
+of the server buffering audio without limit.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Protocol
+
+from fastapi import WebSocket
+from starlette.websockets import WebSocketDisconnect
+
+from ..clients import get_registry, limits
+from .stt import AudioFormat, recognition_config, sniff
+
+logger = logging.getLogger("uvicorn")
+
+QUEUE_FRAMES = int(os.getenv("STT_STREAM_QUEUE_FRAMES", 64))
+MAX_UTTERANCE_S = float(os.getenv("STT_STREAM_MAX_SECONDS", 60))
+
+
+@dataclass(frozen=True)
+class StreamEvent:
+    type: str                      # "interim" | "final" | "endpoint"
+    text: str = ""
+    stability: float = 0.0
+
+
+class StreamingRecognizer(Protocol):
+    def stream(self, fmt: AudioFormat, lang: str, audio: AsyncIterator[bytes]) -> AsyncIterator[StreamEvent]:
+        ...
+
+
+# ---------------- Recognizers ----------------
+class GoogleStreamingRecognizer:
+    """Speech streaming_recognize with interim results and single-utterance endpointing."""
+
+    async def stream(self, fmt: AudioFormat, lang: str, audio: AsyncIterator[bytes]) -> AsyncIterator[StreamEvent]:
+        from google.cloud import speech
+
+        streaming_config = speech.StreamingRecognitionConfig(
+            config=recognition_config(fmt, lang), interim_results=True, single_utterance=True
+        )
+
+        async def requests():
+            yield speech.StreamingRecognizeRequest(streaming_config=streaming_config)
+            async for chunk in audio:
+                yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+        end_of_utterance = speech.StreamingRecognizeResponse.SpeechEventType.END_OF_SINGLE_UTTERANCE
+        async with limits.slot("speech_stream"):
+            with get_registry().acquire("speech_async", timeout=0) as client:
+                responses = await client.streaming_recognize(requests=requests())
+                async for resp in responses:
+                    if resp.speech_event_type == end_of_utterance:
+                        yield StreamEvent("endpoint")
+                    for result in resp.results:
+                        if result.alternatives:
+                            yield StreamEvent(
+                                "final" if result.is_final else "interim",
+                                result.alternatives[0].transcript,
+                                result.stability,
+                            )
+
+
+class LocalStreamingRecognizer:
+    """
+    Offline stand-in: every ``frames_per_word`` non-silent frames add a word to
+    the interim transcript; ``silence_frames`` all-zero frames after speech
+    end the utterance. ``frame_latency_s`` makes it a slow consumer.
+    """
+
+    VOCABULARY = ["what", "is", "the", "balance", "of", "my", "current", "account"]
+
+    def __init__(self, frames_per_word: int = 5, silence_frames: int = 10, frame_latency_s: float = 0.0) -> None:
+        self.frames_per_word = frames_per_word
+        self.silence_frames = silence_frames
+        self.frame_latency_s = frame_latency_s
+
+    async def stream(self, fmt: AudioFormat, lang: str, audio: AsyncIterator[bytes]) -> AsyncIterator[StreamEvent]:
+        words: List[str] = []
+        voiced = silent = 0
+        async for chunk in audio:
+            if self.frame_latency_s:
+                await asyncio.sleep(self.frame_latency_s)
+            if any(chunk):
+                voiced += 1
+                silent = 0
+                if voiced % self.frames_per_word == 0:
+                    words.append(self.VOCABULARY[len(words) % len(self.VOCABULARY)])
+                    yield StreamEvent("interim", " ".join(words), 0.8)
+            else:
+                silent += 1
+                if voiced and silent >= self.silence_frames:
+                    yield StreamEvent("endpoint")
+                    break
+        yield StreamEvent("final", " ".join(words), 1.0)
+
+
+BACKENDS = {"google": GoogleStreamingRecognizer, "local": LocalStreamingRecognizer}
+
+
+@lru_cache(maxsize=1)
+def get_streaming_recognizer() -> StreamingRecognizer:
+    return BACKENDS[os.getenv("STT_STREAMING_BACKEND", "google")]()
+
+
+# ---------------- Session ----------------
+class StreamStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {
+            "sessions": 0, "frames": 0, "bytes": 0, "backpressure_waits": 0,
+            "endpoints": 0, "timeouts": 0, "errors": 0,
+        }
+
+    def add(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[key] += n
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+stream_stats = StreamStats()
+
+
+async def _receive_frames(ws: WebSocket, queue: "asyncio.Queue[Optional[bytes]]", deadline: float) -> None:
+    """Socket -> queue until the client ends the utterance, disconnects or runs out of time."""
+    try:
+        while True:
+            if time.monotonic() > deadline:
+                stream_stats.add("timeouts")
+                break
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            chunk = message.get("bytes")
+            if chunk:
+                stream_stats.add("frames")
+                stream_stats.add("bytes", len(chunk))
+                if queue.full():
+                    stream_stats.add("backpressure_waits")
+                await queue.put(chunk)
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    continue
+                if control.get("type") == "end":
+                    break
+    finally:
+        # The sentinel goes behind every queued frame, so the recognizer gets all of the utterance.
+        # On a full queue this waits for it to drain; run_session cancels the wait once it is done.
+        await queue.put(None)
+
+
+async def _frames(first: bytes, queue: "asyncio.Queue[Optional[bytes]]") -> AsyncIterator[bytes]:
+    yield first
+    while True:
+        chunk = await queue.get()
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def run_session(ws: WebSocket, recognizer: StreamingRecognizer, lang: str) -> None:
+    await ws.accept()
+    stream_stats.add("sessions")
+    try:
+        first = await ws.receive_bytes()
+    except (WebSocketDisconnect, KeyError, RuntimeError):
+        return
+    stream_stats.add("frames")
+    stream_stats.add("bytes", len(first))
+
+    queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=QUEUE_FRAMES)
+    receiver = asyncio.create_task(_receive_frames(ws, queue, time.monotonic() + MAX_UTTERANCE_S))
+    finals: List[str] = []
+    try:
+        async for event in recognizer.stream(sniff(first), lang, _frames(first, queue)):
+            if event.type == "endpoint":
+                stream_stats.add("endpoints")
+                # Stop reading audio; the receiver ends the queue and the recognizer flushes its final result.
+                receiver.cancel()
+                await ws.send_json({"type": "endpoint"})
+            elif event.type == "final":
+                finals.append(event.text)
+                await ws.send_json({"type": "final", "text": event.text})
+            else:
+                await ws.send_json({"type": "interim", "text": event.text, "stability": round(event.stability, 3)})
+        await ws.send_json({"type": "end", "text": " ".join(t for t in finals if t).strip()})
+        await ws.close()
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    except Exception as e:
+        stream_stats.add("errors")
+        logger.exception(f"STT stream failed: {e}")
+        try:
+            await ws.close(code=1011)
+        except RuntimeError:
+            pass
+    finally:
+        receiver.cancel()
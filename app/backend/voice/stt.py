@@ -0,0 +1,206 @@
+# app/backend/voice/stt.py
+from __future__ import annotations
+
+import logging
+import struct
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("uvicorn")
+
+RECOGNIZER_MODEL = "latest_short"
+# Opus always decodes at 48 kHz; Speech accepts these rates for (WEBM|OGG)_OPUS.
+OPUS_RATES = {8000, 12000, 16000, 24000, 48000}
+SNIFF_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    container: str                      # "webm", "ogg", "wav", "flac", "mp3", "amr", "unknown"
+    encoding: str                       # speech.RecognitionConfig.AudioEncoding member name
+    sample_rate_hertz: Optional[int] = None
+    channels: Optional[int] = None
+
+
+UNKNOWN = AudioFormat("unknown", "ENCODING_UNSPECIFIED")
+
+
+# ---------------- Container parsers ----------------
+def _opus_head(data: bytes) -> Optional[AudioFormat]:
+    """OpusHead: magic(8) version(1) channels(1) pre_skip(2) input_rate(4, LE)."""
+    at = data.find(b"OpusHead")
+    if at < 0 or len(data) < at + 16:
+        return None
+    channels = data[at + 9]
+    input_rate = struct.unpack_from("<I", data, at + 12)[0]
+    return AudioFormat("", "", input_rate if input_rate in OPUS_RATES else 48000, channels or None)
+
+
+def _sniff_webm(data: bytes) -> AudioFormat:
+    opus = _opus_head(data)
+    if b"A_OPUS" not in data and opus is None:
+        # WebM/Vorbis etc.: Speech has no matching encoding, let it sniff.
+        return AudioFormat("webm", "ENCODING_UNSPECIFIED")
+    rate, channels = (opus.sample_rate_hertz, opus.channels) if opus else (48000, None)
+    # EBML SamplingFrequency (0xB5, 4- or 8-byte float) and Channels (0x9F, 1 byte) in the track entry.
+    at = data.find(b"\xb5\x88")
+    if at >= 0 and len(data) >= at + 10:
+        rate = int(struct.unpack_from(">d", data, at + 2)[0])
+    else:
+        at = data.find(b"\xb5\x84")
+        if at >= 0 and len(data) >= at + 6:
+            rate = int(struct.unpack_from(">f", data, at + 2)[0])
+    at = data.find(b"\x9f\x81")
+    if at >= 0 and len(data) > at + 2:
+        channels = data[at + 2]
+    return AudioFormat("webm", "WEBM_OPUS", rate if rate in OPUS_RATES else 48000, channels)
+
+
+def _sniff_ogg(data: bytes) -> AudioFormat:
+    opus = _opus_head(data)
+    if opus is not None:
+        return AudioFormat("ogg", "OGG_OPUS", opus.sample_rate_hertz, opus.channels)
+    at = data.find(b"\x7fFLAC")
+    if at >= 0:
+        flac = _sniff_flac(data[at + 13:])  # \x7fFLAC, version(2), header count(2), fLaC
+        return AudioFormat("ogg", "FLAC", flac.sample_rate_hertz, flac.channels)
+    return AudioFormat("ogg", "ENCODING_UNSPECIFIED")
+
+
+def _sniff_wav(data: bytes) -> AudioFormat:
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id, size = data[pos:pos + 4], struct.unpack_from("<I", data, pos + 4)[0]
+        if chunk_id == b"fmt " and pos + 24 <= len(data):
+            fmt_tag, channels, rate = struct.unpack_from("<HHI", data, pos + 8)
+            bits = struct.unpack_from("<H", data, pos + 22)[0]
+            if fmt_tag == 0xFFFE and pos + 34 <= len(data):
+                fmt_tag = struct.unpack_from("<H", data, pos + 32)[0]  # WAVE_FORMAT_EXTENSIBLE sub-format
+            if fmt_tag == 1 and bits == 16:
+                return AudioFormat("wav", "LINEAR16", rate, channels)
+            if fmt_tag == 7:
+                return AudioFormat("wav", "MULAW", rate, channels)
+            # Other WAV payloads: Speech reads the header itself.
+            return AudioFormat("wav", "ENCODING_UNSPECIFIED", rate, channels)
+        pos += 8 + size + (size & 1)
+    return AudioFormat("wav", "ENCODING_UNSPECIFIED")
+
+
+def _sniff_flac(data: bytes) -> AudioFormat:
+    """STREAMINFO follows the 4-byte block header: rate is 20 bits, channels-1 the next 3, at byte 10."""
+    if len(data) < 4 + 18:
+        return AudioFormat("flac", "FLAC")
+    info = data[4:4 + 18]
+    packed = int.from_bytes(info[10:13], "big")
+    return AudioFormat("flac", "FLAC", packed >> 4, ((packed >> 1) & 0x7) + 1)
+
+
+_MPEG_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _mpeg_frame(data: bytes, pos: int) -> Optional[AudioFormat]:
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 0x3
+    layer = (data[pos + 1] >> 1) & 0x3
+    bitrate = data[pos + 2] >> 4
+    rate_index = (data[pos + 2] >> 2) & 0x3
+    if version == 1 or layer != 1 or bitrate in (0, 15) or rate_index == 3:
+        return None
+    mono = (data[pos + 3] >> 6) == 3
+    return AudioFormat("mp3", "MP3", _MPEG_RATES[version][rate_index], 1 if mono else 2)
+
+
+def _sniff_mp3(data: bytes) -> Optional[AudioFormat]:
+    pos = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + size + (10 if data[5] & 0x10 else 0)
+        # Padding after the tag: scan a little for the first frame sync.
+        limit = min(len(data) - 4, pos + 4096)
+        while pos < limit and _mpeg_frame(data, pos) is None:
+            pos += 1
+        return _mpeg_frame(data, pos) or AudioFormat("mp3", "MP3", 44100)
+    return _mpeg_frame(data, 0)
+
+
+def sniff(audio: bytes) -> AudioFormat:
+    """Container, Speech encoding, sample rate and channel count from the first bytes."""
+    data = audio[:SNIFF_BYTES]
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return _sniff_webm(data)
+    if data[:4] == b"OggS":
+        return _sniff_ogg(data)
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return _sniff_wav(data)
+    if data[:4] == b"fLaC":
+        return _sniff_flac(data[4:])
+    if data[:9] == b"#!AMR-WB\n":
+        return AudioFormat("amr", "AMR_WB", 16000, 1)
+    if data[:6] == b"#!AMR\n":
+        return AudioFormat("amr", "AMR", 8000, 1)
+    return _sniff_mp3(data) or UNKNOWN
+
+
+# ---------------- Outcomes ----------------
+class DetectionStats:
+    """How uploads were classified and how the single recognize call went."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.formats: Counter = Counter()
+        self.outcomes: Counter = Counter()
+
+    def record(self, fmt: AudioFormat, outcome: str) -> None:
+        with self._lock:
+            self.formats[f"{fmt.container}/{fmt.encoding}"] += 1
+            self.outcomes[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {"formats": dict(self.formats), "outcomes": dict(self.outcomes)}
+
+
+detection_stats = DetectionStats()
+
+
+# ---------------- Recognize ----------------
+def recognition_config(fmt: AudioFormat, lang: str) -> Any:
+    from google.cloud import speech
+
+    kwargs: Dict[str, Any] = {}
+    if fmt.sample_rate_hertz:
+        kwargs["sample_rate_hertz"] = fmt.sample_rate_hertz
+    if fmt.channels and fmt.channels > 1:
+        kwargs["audio_channel_count"] = fmt.channels
+    return speech.RecognitionConfig(
+        encoding=speech.RecognitionConfig.AudioEncoding[fmt.encoding],
+        language_code=lang,
+        enable_automatic_punctuation=True,
+        model=RECOGNIZER_MODEL,
+        **kwargs,
+    )
+
+
+def transcript(resp: Any) -> str:
+    return " ".join(r.alternatives[0].transcript for r in resp.results if r.alternatives).strip()
+
+
+async def transcribe(client: Any, audio_bytes: bytes, lang: str) -> str:
+    """One recognize call, configured from the sniffed container; "" on failure."""
+    from google.cloud import speech
+
+    fmt = sniff(audio_bytes)
+    try:
+        resp = await client.recognize(
+            config=recognition_config(fmt, lang), audio=speech.RecognitionAudio(content=audio_bytes)
+        )
+    except Exception as e:
+        detection_stats.record(fmt, "error")
+        logger.warning(f"STT: recognize failed for {fmt}: {e}")
+        return ""
+    text = transcript(resp)
+    detection_stats.record(fmt, "ok" if text else "empty")
+    return text
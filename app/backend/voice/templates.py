@@ -0,0 +1,199 @@
+# app/backend/voice/templates.py
+from __future__ import annotations
+
+import asyncio
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from string import Formatter
+from typing import Dict, Iterable, List, Tuple, Union
+
+from ..schemas import AppointmentCreateResponse, BalanceResponse, ContactUpdateResponse
+from .tts import VOICE_MAP, Synthesizer
+
+SlotValue = Union[str, float, int, datetime]
+
+# Static wording per template and language; {slots} are the only parts that vary per reply.
+TEMPLATES: Dict[str, Dict[str, str]] = {
+    "balance": {
+        "en-GB": "The balance of your {account} is {amount}.",
+        "nl-BE": "Het saldo van uw {account} is {amount}.",
+        "fr-BE": "Le solde de votre {account} est de {amount}.",
+    },
+    "appointment_offer": {
+        "en-GB": "The first available appointment is on {slot}. Shall I book it for you?",
+        "nl-BE": "De eerste beschikbare afspraak is op {slot}. Zal ik die voor u boeken?",
+        "fr-BE": "Le premier rendez-vous disponible est le {slot}. Voulez-vous que je le réserve?",
+    },
+    "appointment_confirmed": {
+        "en-GB": "Your appointment is confirmed for {slot}.",
+        "nl-BE": "Uw afspraak is bevestigd voor {slot}.",
+        "fr-BE": "Votre rendez-vous est confirmé pour le {slot}.",
+    },
+    "contact_update": {
+        "en-GB": "We have registered your request. Your ticket number is {ticket_id}.",
+        "nl-BE": "We hebben uw aanvraag geregistreerd. Uw ticketnummer is {ticket_id}.",
+        "fr-BE": "Nous avons enregistré votre demande. Votre numéro de ticket est le {ticket_id}.",
+    },
+}
+
+_WEEKDAYS = {
+    "en-GB": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"],
+    "nl-BE": ["maandag", "dinsdag", "woensdag", "donderdag", "vrijdag", "zaterdag", "zondag"],
+    "fr-BE": ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"],
+}
+_MONTHS = {
+    "en-GB": ["January", "February", "March", "April", "May", "June", "July",
+              "August", "September", "October", "November", "December"],
+    "nl-BE": ["januari", "februari", "maart", "april", "mei", "juni", "juli",
+              "augustus", "september", "oktober", "november", "december"],
+    "fr-BE": ["janvier", "février", "mars", "avril", "mai", "juin", "juillet",
+              "août", "septembre", "octobre", "novembre", "décembre"],
+}
+_AT = {"en-GB": "at", "nl-BE": "om", "fr-BE": "à"}
+
+
+_LEADING_PUNCTUATION = re.compile(r"^\s*([^\w\s]*)")
+
+
+@dataclass(frozen=True)
+class Segment:
+    text: str
+    is_slot: bool
+    suffix: str = ""                    # punctuation spoken with a slot fragment, e.g. "."
+
+
+def parse_template(template: str) -> List[Segment]:
+    """
+    Literal and slot segments of a template. Punctuation right after a slot
+    ("{amount}." or "{slot}. Shall I") is spoken with that slot's fragment,
+    so no TTS request is ever just ".".
+    """
+    segments: List[Segment] = []
+    for literal, field_name, _, _ in Formatter().parse(template):
+        if segments and segments[-1].is_slot:
+            punctuation = _LEADING_PUNCTUATION.match(literal).group(1)
+            if punctuation:
+                segments[-1] = Segment(segments[-1].text, True, segments[-1].suffix + punctuation)
+                literal = literal.lstrip()[len(punctuation):]
+        literal = literal.strip()
+        # What is left without a word in it (punctuation opening a template) is not spoken at all.
+        if re.search(r"\w", literal):
+            segments.append(Segment(literal, False))
+        if field_name:
+            segments.append(Segment(field_name, True))
+    return segments
+
+
+def speak_value(value: SlotValue, lang: str) -> str:
+    """Render a slot value the way it should be read out in the given language."""
+    if isinstance(value, datetime):
+        weekday = _WEEKDAYS.get(lang, _WEEKDAYS["en-GB"])[value.weekday()]
+        month = _MONTHS.get(lang, _MONTHS["en-GB"])[value.month - 1]
+        return f"{weekday} {value.day} {month} {_AT.get(lang, 'at')} {value:%H:%M}"
+    if isinstance(value, float):
+        amount = f"{value:,.2f}"
+        if lang != "en-GB":
+            amount = amount.replace(",", " ").replace(".", ",").replace(" ", ".")
+        return f"{amount} euro"
+    return str(value)
+
+
+def render_text(template_id: str, lang: str, **slots: SlotValue) -> str:
+    template = TEMPLATES[template_id].get(lang, TEMPLATES[template_id]["en-GB"])
+    return template.format(**{name: speak_value(value, lang) for name, value in slots.items()})
+
+
+def strip_mp3_tags(audio: bytes) -> bytes:
+    """Drop ID3v2 (leading) and ID3v1 (trailing) tags so MPEG frames can be concatenated."""
+    if audio[:3] == b"ID3" and len(audio) >= 10:
+        size = (audio[6] << 21) | (audio[7] << 14) | (audio[8] << 7) | audio[9]
+        footer = 10 if audio[5] & 0x10 else 0
+        audio = audio[10 + size + footer :]
+    if len(audio) >= 128 and audio[-128:-125] == b"TAG":
+        audio = audio[:-128]
+    return audio
+
+
+def join_mp3(parts: Iterable[bytes]) -> bytes:
+    """One MP3 stream out of independently synthesised pieces (same voice and encoding)."""
+    return b"".join(strip_mp3_tags(part) for part in parts if part)
+
+
+def segment_texts(template_id: str, lang: str, **slots: SlotValue) -> List[str]:
+    """What goes to TTS for one reply: the static segments plus the spoken slot values."""
+    template = TEMPLATES[template_id].get(lang, TEMPLATES[template_id]["en-GB"])
+    return [
+        speak_value(slots[segment.text], lang) + segment.suffix if segment.is_slot else segment.text
+        for segment in parse_template(template)
+    ]
+
+
+async def render_audio(
+    synthesizer: Synthesizer, template_id: str, lang: str, **slots: SlotValue
+) -> Tuple[str, bytes]:
+    """
+    Full reply text plus audio stitched from per-segment TTS. Static segments
+    are the same for every reply, so after warm_templates they always come
+    from the TTS cache; only the slot fragments can reach the backend.
+    """
+    parts = await asyncio.gather(
+        *(synthesizer.asynthesize(text, lang) for text in segment_texts(template_id, lang, **slots))
+    )
+    return render_text(template_id, lang, **slots), join_mp3(parts)
+
+
+async def render_replies(
+    synthesizer: Synthesizer, replies: Iterable[Tuple[str, Dict[str, SlotValue]]], lang: str
+) -> Tuple[str, bytes]:
+    rendered = await asyncio.gather(
+        *(render_audio(synthesizer, template_id, lang, **slots) for template_id, slots in replies)
+    )
+    return " ".join(text for text, _ in rendered), join_mp3(mp3 for _, mp3 in rendered)
+
+
+async def warm_templates(synthesizer: Synthesizer) -> int:
+    """Synthesise every static segment once per voice in VOICE_MAP; returns the segment count."""
+    texts = {
+        (segment.text, lang)
+        for lang in VOICE_MAP
+        for variants in TEMPLATES.values()
+        for segment in parse_template(variants.get(lang, variants["en-GB"]))
+        if not segment.is_slot
+    }
+    await asyncio.gather(*(synthesizer.asynthesize(text, lang) for text, lang in texts))
+    return len(texts)
+
+
+# ---------------- Handler responses -> template slots ----------------
+def balance_replies(response: BalanceResponse) -> List[Tuple[str, Dict[str, SlotValue]]]:
+    return [
+        ("balance", {"account": account.name, "amount": float(account.balance)})
+        for account in response.accounts
+    ]
+
+
+def appointment_replies(response: AppointmentCreateResponse) -> List[Tuple[str, Dict[str, SlotValue]]]:
+    if response.confirmed:
+        return [("appointment_confirmed", {"slot": datetime.fromisoformat(response.confirmed)})]
+    if response.slots:
+        return [("appointment_offer", {"slot": datetime.fromisoformat(response.slots[0])})]
+    return []
+
+
+def contact_update_replies(response: ContactUpdateResponse) -> List[Tuple[str, Dict[str, SlotValue]]]:
+    # Spell the ticket suffix out character by character; TTS would otherwise read it as a word.
+    return [("contact_update", {"ticket_id": " ".join(response.ticket_id.rsplit("-", 1)[-1])})]
+
+
+REPLIES = {
+    BalanceResponse: balance_replies,
+    AppointmentCreateResponse: appointment_replies,
+    ContactUpdateResponse: contact_update_replies,
+}
+
+
+def handler_replies(response: object) -> List[Tuple[str, Dict[str, SlotValue]]]:
+    """Template replies for a handler response; empty for responses without a template."""
+    replies = REPLIES.get(type(response))
+    return replies(response) if replies else []
@@ -0,0 +1,277 @@
+# app/backend/voice/tts.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Protocol, Tuple
+
+from cachetools import LRUCache
+
+from ..clients import get_registry, limits
+from ..config import CACHE_DIR
+
+VOICE_MAP: Dict[str, Tuple[str, str]] = {
+    "en-GB": ("en-GB", "en-GB-Neural2-C"),
+    "nl-BE": ("nl-BE", "nl-BE-Standard-A"),
+    "fr-BE": ("fr-BE", "fr-BE-Standard-A"),
+}
+DEFAULT_VOICE = VOICE_MAP["en-GB"]
+AUDIO_ENCODING = "MP3"
+
+
+class TTSBackend(Protocol):
+    def synthesize(self, text: str, language_code: str, voice_name: str, audio_encoding: str) -> bytes:
+        ...
+
+
+class GoogleTTSBackend:
+    """Google Cloud Text-to-Speech over the shared client pool (see clients.py)."""
+
+    def synthesize(self, text: str, language_code: str, voice_name: str, audio_encoding: str) -> bytes:
+        from google.cloud import texttospeech
+
+        with get_registry().acquire("tts") as client:
+            resp = client.synthesize_speech(
+                input=texttospeech.SynthesisInput(text=text),
+                voice=texttospeech.VoiceSelectionParams(language_code=language_code, name=voice_name),
+                audio_config=texttospeech.AudioConfig(
+                    audio_encoding=texttospeech.AudioEncoding[audio_encoding]
+                ),
+            )
+        return resp.audio_content
+
+    async def asynthesize(self, text: str, language_code: str, voice_name: str, audio_encoding: str) -> bytes:
+        from google.cloud import texttospeech
+
+        # Callers hold limits.slot("tts"), which keeps the pool below its cap: never wait here.
+        with get_registry().acquire("tts_async", timeout=0) as client:
+            resp = await client.synthesize_speech(
+                input=texttospeech.SynthesisInput(text=text),
+                voice=texttospeech.VoiceSelectionParams(language_code=language_code, name=voice_name),
+                audio_config=texttospeech.AudioConfig(
+                    audio_encoding=texttospeech.AudioEncoding[audio_encoding]
+                ),
+            )
+        return resp.audio_content
+
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, joint stereo: 417-byte frames of 1152 samples.
+MP3_FRAME_HEADER = bytes([0xFF, 0xFB, 0x90, 0x64])
+MP3_FRAME_BYTES = 417
+
+
+class LocalTTSBackend:
+    """
+    Offline stand-in that returns well-formed (silent) MP3 frames, roughly
+    two frames per character, after a configurable delay. Counts calls and
+    characters so cache hit rates and savings can be measured.
+    """
+
+    def __init__(self, latency_s: float = 0.0, per_char_latency_s: float = 0.0) -> None:
+        self.latency_s = latency_s
+        self.per_char_latency_s = per_char_latency_s
+        self.calls = 0
+        self.characters = 0
+        self._lock = threading.Lock()
+
+    def _count(self, text: str) -> float:
+        with self._lock:
+            self.calls += 1
+            self.characters += len(text)
+        return self.latency_s + self.per_char_latency_s * len(text)
+
+    @staticmethod
+    def _audio(text: str, voice_name: str) -> bytes:
+        seed = hashlib.sha256(f"{voice_name}\0{text}".encode("utf-8")).digest()
+        frame = MP3_FRAME_HEADER + seed + bytes(MP3_FRAME_BYTES - len(MP3_FRAME_HEADER) - len(seed))
+        return frame * max(1, 2 * len(text))
+
+    def synthesize(self, text: str, language_code: str, voice_name: str, audio_encoding: str) -> bytes:
+        delay = self._count(text)
+        if delay:
+            time.sleep(delay)
+        return self._audio(text, voice_name)
+
+    async def asynthesize(self, text: str, language_code: str, voice_name: str, audio_encoding: str) -> bytes:
+        delay = self._count(text)
+        if delay:
+            await asyncio.sleep(delay)
+        return self._audio(text, voice_name)
+
+
+def cache_key(text: str, language_code: str, voice_name: str, audio_encoding: str) -> str:
+    payload = json.dumps([text, language_code, voice_name, audio_encoding], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Content-addressed audio cache. Tier 1 is an in-process LRU bounded by
+    bytes; tier 2 is a directory of <key>.audio files bounded by total size,
+    evicting the least recently used files (mtime is bumped on every hit).
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path],
+        memory_bytes: int = 32 * 1024 * 1024,
+        disk_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        self._memory: LRUCache = LRUCache(maxsize=memory_bytes, getsizeof=len)
+        self.directory = directory
+        self.disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self._disk_used = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._disk_used = sum(p.stat().st_size for p in directory.glob("*.audio"))
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.audio"
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self.memory_hits += 1
+                return audio
+        if self.directory is not None:
+            path = self._path(key)
+            try:
+                audio = path.read_bytes()
+                os.utime(path)
+            except OSError:
+                audio = None
+            if audio is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    if len(audio) <= self._memory.maxsize:
+                        self._memory[key] = audio
+                return audio
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, audio: bytes) -> None:
+        with self._lock:
+            if len(audio) <= self._memory.maxsize:
+                self._memory[key] = audio
+        if self.directory is None or len(audio) > self.disk_bytes:
+            return
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_bytes(audio)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_used += len(audio)
+            if self._disk_used > self.disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        # Trim to 90% so a full cache doesn't rescan the directory on every put.
+        files = []
+        for path in self.directory.glob("*.audio"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        used = sum(size for _, size, _ in files)
+        target = int(self.disk_bytes * 0.9)
+        for _, size, path in files:
+            if used <= target:
+                break
+            try:
+                path.unlink()
+                used -= size
+            except OSError:
+                continue
+        self._disk_used = used
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory.currsize,
+                "disk_bytes": self._disk_used,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+class Synthesizer:
+    """TTS with the cache in front: the backend is only called on a miss."""
+
+    def __init__(self, backend: TTSBackend, cache: Optional[TTSCache] = None) -> None:
+        self.backend = backend
+        self.cache = cache
+
+    def synthesize(self, text: str, lang: str, audio_encoding: str = AUDIO_ENCODING) -> bytes:
+        language_code, voice_name = VOICE_MAP.get(lang, DEFAULT_VOICE)
+        return self.synthesize_voice(text, language_code, voice_name, audio_encoding)
+
+    def synthesize_voice(
+        self, text: str, language_code: str, voice_name: str, audio_encoding: str = AUDIO_ENCODING
+    ) -> bytes:
+        if self.cache is None:
+            return self.backend.synthesize(text, language_code, voice_name, audio_encoding)
+        key = cache_key(text, language_code, voice_name, audio_encoding)
+        audio = self.cache.get(key)
+        if audio is None:
+            audio = self.backend.synthesize(text, language_code, voice_name, audio_encoding)
+            self.cache.put(key, audio)
+        return audio
+
+    async def asynthesize(self, text: str, lang: str, audio_encoding: str = AUDIO_ENCODING) -> bytes:
+        """
+        synthesize() for async handlers. Cache lookups stay inline (memory, or
+        one small file read); only misses take a limits.slot("tts") and go to
+        the backend, natively async when it has asynthesize, else in a thread.
+        """
+        language_code, voice_name = VOICE_MAP.get(lang, DEFAULT_VOICE)
+        key = cache_key(text, language_code, voice_name, audio_encoding)
+        audio = self.cache.get(key) if self.cache is not None else None
+        if audio is not None:
+            return audio
+        async with limits.slot("tts"):
+            if hasattr(self.backend, "asynthesize"):
+                audio = await self.backend.asynthesize(text, language_code, voice_name, audio_encoding)
+            else:
+                audio = await asyncio.to_thread(
+                    self.backend.synthesize, text, language_code, voice_name, audio_encoding
+                )
+        if self.cache is not None:
+            self.cache.put(key, audio)
+        return audio
+
+
+BACKENDS = {"google": GoogleTTSBackend, "local": LocalTTSBackend}
+
+
+@lru_cache(maxsize=1)
+def get_synthesizer() -> Synthesizer:
+    backend = BACKENDS[os.getenv("TTS_BACKEND", "google")]()
+    cache = None
+    if os.getenv("TTS_CACHE", "1") == "1":
+        cache = TTSCache(
+            Path(os.getenv("TTS_CACHE_DIR", CACHE_DIR / "tts")),
+            memory_bytes=int(os.getenv("TTS_MEMORY_CACHE_BYTES", 32 * 1024 * 1024)),
+            disk_bytes=int(os.getenv("TTS_DISK_CACHE_BYTES", 512 * 1024 * 1024)),
+        )
+    return Synthesizer(backend, cache)
@@ -0,0 +1,2 @@
+# bench/__init__.py
+# Marks the bench directory as a Python package
\ No newline at end of file
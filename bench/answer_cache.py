@@ -0,0 +1,136 @@
+# bench/answer_cache.py
+"""
+Replay a stream of informational questions (paraphrase groups in EN/FR/NL,
+plus near-miss questions that must not share an answer) through the semantic
+answer cache at several thresholds: hit rate, wrong answers served, and the
+grounded-search time saved. Then one cold and one warm ChatBot turn against
+the local Gemini stand-in.
+
+    python -m bench.answer_cache
+    python -m bench.answer_cache --threshold 0.85 --grounding-s 2.5 --rounds 3
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from app.backend import answer_cache, intents
+
+from .nlu_turn import LocalModels, local_chatbot
+from .retrieval import _report
+
+# Questions in one group have the same grounded answer.
+GROUPS: List[List[str]] = [
+    ["What interest do you pay on a savings account?",
+     "How much interest do I get on my savings account?",
+     "What is the interest rate on savings accounts?",
+     "savings account interest rate"],
+    ["What are the fees for a credit card?",
+     "How much does a credit card cost per year?",
+     "credit card annual fee"],
+    ["What are the fees for a debit card?",
+     "How much does a debit card cost?"],
+    ["Can I make an appointment at a branch?",
+     "How do I book an appointment in a branch?",
+     "I want an appointment at an ING branch"],
+    ["How can I speak to an advisor?",
+     "I want to talk to an advisor",
+     "Can I speak with a human advisor please?"],
+    ["What mortgage rates do you offer?",
+     "What is your mortgage interest rate?",
+     "current mortgage rates"],
+    ["Do you offer accounts for children?",
+     "Is there a bank account for kids?",
+     "children's account"],
+    ["Quel est le taux d'intérêt du compte d'épargne ?",
+     "Combien d'intérêts rapporte un compte d'épargne ?",
+     "taux d'intérêt compte épargne"],
+    ["Quels sont les frais d'une carte de crédit ?",
+     "Combien coûte une carte de crédit par an ?"],
+    ["Je voudrais prendre rendez-vous en agence",
+     "Comment prendre un rendez-vous dans une agence ?"],
+    ["Hoeveel rente krijg ik op mijn spaarrekening?",
+     "Wat is de rente op een spaarrekening?",
+     "rente spaarrekening"],
+    ["Wat kost een kredietkaart per jaar?",
+     "Hoeveel kost een kredietkaart?"],
+    ["Ik wil een afspraak maken in een kantoor",
+     "Hoe maak ik een afspraak in een kantoor?"],
+    ["Welke hypotheekrente bieden jullie?",
+     "Wat is de rente op een woonlening?"],
+]
+
+
+def question_stream(rounds: int, seed: int = 0) -> List[Tuple[int, str]]:
+    """(group, question) pairs: every question ``rounds`` times, shuffled."""
+    stream = [(g, q) for g, group in enumerate(GROUPS) for q in group] * rounds
+    random.Random(seed).shuffle(stream)
+    return stream
+
+
+def replay(stream: List[Tuple[int, str]], threshold: float) -> Tuple[int, int, answer_cache.SemanticAnswerCache]:
+    """Hits and wrong hits when every miss is answered and stored under its group."""
+    cache = answer_cache.SemanticAnswerCache(threshold=threshold, version_path=None)
+    hits = wrong = 0
+    for group, question in stream:
+        hit = cache.get(question)
+        if hit is None:
+            cache.put(question, f"answer {group}", f"context {group}")
+        else:
+            hits += 1
+            wrong += hit.answer != f"answer {group}"
+    return hits, wrong, cache
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=answer_cache.THRESHOLD)
+    parser.add_argument("--rounds", type=int, default=3, help="times each question is asked")
+    parser.add_argument("--grounding-s", type=float, default=2.5, help="grounded search time to first chunk")
+    args = parser.parse_args()
+
+    stream = question_stream(args.rounds)
+    distinct = sum(len(group) for group in GROUPS)
+    print(f"{len(stream)} questions ({distinct} distinct, {len(GROUPS)} answers), "
+          f"grounded search {args.grounding_s:.1f}s")
+    print("\n  threshold  hit rate  paraphrase hits  wrong  saved/question")
+    for threshold in sorted({0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.0, args.threshold}):
+        hits, wrong, cache = replay(stream, threshold)
+        paraphrase = hits - cache.counts["exact_hits"]
+        marker = "  <-" if threshold == args.threshold else ""
+        print(f"  {threshold:9.2f}  {hits / len(stream):8.2f}  {paraphrase:15d}  {wrong:5d}  "
+              f"{(hits - wrong) / len(stream) * args.grounding_s * 1000:9.0f} ms{marker}")
+
+    _, _, cache = replay(stream, args.threshold)
+    snapshot = cache.snapshot()
+    print(f"\n== at {args.threshold:.2f}: best-match similarity p50 {snapshot['similarity_p50']}, "
+          f"p90 {snapshot['similarity_p90']}")
+    print("  " + ", ".join(f"{lang} {c['hit_rate']:.2f}" for lang, c in snapshot["per_lang"].items()))
+    print("  histogram " + " ".join(f"{edge}:{n}" for edge, n in snapshot["similarity_histogram"].items()))
+
+    timings: List[float] = []
+    for _, question in stream:
+        t0 = time.perf_counter()
+        cache.get(question)
+        timings.append((time.perf_counter() - t0) * 1000)
+    print(f"\n== lookup CPU time ({len(timings)} lookups, {len(cache)} cached answers)")
+    _report("lookup", timings)
+
+    # End to end: the same question twice, then a paraphrase, through start_convo.
+    intents.THRESHOLD = 2.0
+    models = LocalModels(args.grounding_s, 1.2)
+    bot = local_chatbot(models, answer_cache.SemanticAnswerCache(threshold=args.threshold, version_path=None))
+    print("\n== start_convo, informational intent")
+    for label, question in (("cold", GROUPS[0][0]), ("repeat", GROUPS[0][0]), ("paraphrase", GROUPS[0][1])):
+        started = time.perf_counter()
+        bot.start_convo(question, session_id="bench")
+        _report(label, [(time.perf_counter() - started) * 1000])
+    print(f"  grounded calls sent: {models.calls['grounding']} of 3")
+    hit = bot.answer_cache.get(GROUPS[0][1])
+    print(f"  paraphrase matched {hit.question!r} at similarity {hit.similarity:.3f}" if hit else "  paraphrase missed")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,114 @@
+# bench/assist_stream.py
+"""
+Time-to-first-audio of /assist (STT, whole reply, whole-reply TTS, one JSON
+body) vs /assist/stream (sentences go to TTS while the LLM is still
+generating, one SSE event each), against local stand-ins for Speech, the LLM
+and TTS. The app is driven in-process over ASGI so every body chunk is timed.
+
+    python -m bench.assist_stream
+    python -m bench.assist_stream --first-token 0.6 --token 0.03 --tts-per-char 0.003
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import List, Tuple
+
+os.environ.setdefault("LLM_BACKEND", "local")
+os.environ.setdefault("TTS_BACKEND", "local")
+os.environ.setdefault("TTS_CACHE", "0")
+
+from app.backend import clients, llm, main  # noqa: E402
+from app.backend.voice import tts as tts_voice  # noqa: E402
+
+from .concurrency import AUDIO_B64, LocalAsyncSpeech  # noqa: E402
+from .retrieval import _report  # noqa: E402
+
+
+async def request(
+    app, path: str, body: bytes, content_type: str = "application/json", query: str = ""
+) -> Tuple[int, List[Tuple[bytes, bytes]], List[Tuple[float, bytes]]]:
+    """Status, response headers and (seconds since request, chunk) for every body chunk the app sends."""
+    chunks: List[Tuple[float, bytes]] = []
+    start: dict = {}
+    delivered = False
+    started = time.perf_counter()
+
+    async def receive():
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body" and message.get("body"):
+            chunks.append((time.perf_counter() - started, message["body"]))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())],
+        "server": ("bench", 80), "client": ("bench", 1),
+    }
+    await app(scope, receive, send)
+    return start.get("status", 0), start.get("headers", []), chunks
+
+
+async def post(app, path: str, payload: dict) -> List[Tuple[float, bytes]]:
+    return (await request(app, path, json.dumps(payload).encode("utf-8")))[2]
+
+
+async def amain(args) -> None:
+    clients.set_registry(
+        clients.ClientRegistry({"speech_async": lambda _: LocalAsyncSpeech(args.stt_latency)}, credentials=None)
+    )
+    backend = llm.reply_backend("local")
+    backend.first_token_s, backend.token_s = args.first_token, args.token
+    tts_voice.get_synthesizer().backend = tts_voice.LocalTTSBackend(
+        latency_s=args.tts_latency, per_char_latency_s=args.tts_per_char
+    )
+    print(
+        f"stt {args.stt_latency * 1000:.0f} ms, llm first token {args.first_token * 1000:.0f} ms + "
+        f"{args.token * 1000:.0f} ms/token, tts {args.tts_latency * 1000:.0f} ms + {args.tts_per_char * 1000:.1f} ms/char"
+    )
+    payload = {"audio": AUDIO_B64, "lang": "en-GB"}
+    async with main.app.router.lifespan_context(main.app):
+        batch_first, batch_total, stream_first, stream_total, sentences = [], [], [], [], 0
+        for _ in range(args.repeat):
+            chunks = await post(main.app, "/assist", payload)
+            batch_first.append(chunks[0][0] * 1000)
+            batch_total.append(chunks[-1][0] * 1000)
+
+            chunks = await post(main.app, "/assist/stream", payload)
+            audio = [at for at, chunk in chunks if chunk.startswith(b"event: audio")]
+            sentences = len(audio)
+            stream_first.append(audio[0] * 1000)
+            stream_total.append(chunks[-1][0] * 1000)
+
+    print(f"\n== time to first audio ({args.repeat} runs)")
+    _report("/assist", batch_first)
+    _report("stream", stream_first)
+    print(f"\n== time to last byte ({sentences} sentences streamed)")
+    _report("/assist", batch_total)
+    _report("stream", stream_total)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--stt-latency", type=float, default=0.2)
+    parser.add_argument("--first-token", type=float, default=0.4)
+    parser.add_argument("--token", type=float, default=0.02)
+    parser.add_argument("--tts-latency", type=float, default=0.1)
+    parser.add_argument("--tts-per-char", type=float, default=0.002)
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
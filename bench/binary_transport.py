@@ -0,0 +1,104 @@
+# bench/binary_transport.py
+"""
+Bytes on the wire and server CPU per request: base64-in-JSON endpoints vs the
+binary ones (raw or multipart audio in, audio/mpeg out), with zero-latency
+local stand-ins so only transport and (de)serialisation are measured.
+
+    python -m bench.binary_transport
+    python -m bench.binary_transport --upload-kb 256 --reply-chars 400
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import time
+from typing import Dict, Tuple
+
+os.environ.setdefault("LLM_BACKEND", "local")
+os.environ.setdefault("TTS_BACKEND", "local")
+os.environ.setdefault("TTS_CACHE", "0")
+
+from app.backend import clients, llm, main  # noqa: E402
+from app.backend.voice import tts as tts_voice  # noqa: E402
+
+from .assist_stream import request  # noqa: E402
+from .concurrency import LocalAsyncSpeech  # noqa: E402
+from .stt_formats import webm_opus  # noqa: E402
+
+BOUNDARY = "benchboundary7MA4YWxkTrZu0gW"
+
+
+def multipart(audio: bytes, **fields: str) -> bytes:
+    parts = [
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode()
+        for name, value in fields.items()
+    ]
+    parts.append(
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"audio\"; filename=\"a.webm\"\r\n"
+        f"Content-Type: audio/webm\r\n\r\n".encode() + audio + b"\r\n"
+    )
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+def cases(audio: bytes, reply: str) -> Dict[str, Tuple[str, bytes, str, str]]:
+    """label -> (path, body, content type, query)"""
+    b64 = base64.b64encode(audio).decode("ascii")
+    form = f"multipart/form-data; boundary={BOUNDARY}"
+    return {
+        "stt json": ("/stt", json.dumps({"audio": b64, "lang": "en-GB"}).encode(), "application/json", ""),
+        "stt raw": ("/stt/audio", audio, "audio/webm", "lang=en-GB"),
+        "stt multipart": ("/stt/audio", multipart(audio, lang="en-GB"), form, ""),
+        "tts json": ("/tts", json.dumps({"text": reply, "lang": "en-GB"}).encode(), "application/json", ""),
+        "tts binary": ("/tts/audio", json.dumps({"text": reply, "lang": "en-GB"}).encode(), "application/json", ""),
+        "assist json": ("/assist", json.dumps({"audio": b64, "lang": "en-GB"}).encode(), "application/json", ""),
+        "assist raw": ("/assist/audio", audio, "audio/webm", "lang=en-GB"),
+        "assist multipart": ("/assist/audio", multipart(audio, lang="en-GB"), form, ""),
+    }
+
+
+async def measure(path: str, body: bytes, content_type: str, query: str, repeat: int) -> Tuple[int, int, float]:
+    """(request bytes, response bytes incl. headers, server CPU ms per request)"""
+    cpu = time.process_time()
+    for _ in range(repeat):
+        status, headers, chunks = await request(main.app, path, body, content_type, query)
+        assert status == 200, (path, status, chunks)
+    cpu_ms = (time.process_time() - cpu) * 1000 / repeat
+    header_bytes = sum(len(k) + len(v) + 4 for k, v in headers)
+    return len(body), header_bytes + sum(len(chunk) for _, chunk in chunks), cpu_ms
+
+
+async def amain(args) -> None:
+    clients.set_registry(
+        clients.ClientRegistry({"speech_async": lambda _: LocalAsyncSpeech(0.0)}, credentials=None)
+    )
+    reply = (llm.LocalReplyBackend.REPLY * 10)[: args.reply_chars]
+    backend = llm.reply_backend("local")
+    backend.first_token_s, backend.token_s, backend.reply = 0.0, 0.0, reply
+    tts_voice.get_synthesizer().backend = tts_voice.LocalTTSBackend()
+    rng = random.Random(0)
+    audio = webm_opus() + rng.randbytes(args.upload_kb * 1024)
+
+    print(f"upload {len(audio) / 1024:.0f} KiB, reply {len(reply)} chars, {args.repeat} requests per case")
+    async with main.app.router.lifespan_context(main.app):
+        for label, (path, body, content_type, query) in cases(audio, reply).items():
+            sent, received, cpu_ms = await measure(path, body, content_type, query, args.repeat)
+            print(
+                f"  {label:<17} in {sent / 1024:8.1f} KiB  out {received / 1024:8.1f} KiB  "
+                f"cpu {cpu_ms:6.2f} ms/request"
+            )
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upload-kb", type=int, default=96)
+    parser.add_argument("--reply-chars", type=int, default=240)
+    parser.add_argument("--repeat", type=int, default=50)
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,125 @@
+# bench/cold_start.py
+"""
+Cold start of the API: where import time goes (``python -X importtime``,
+rolled up per package) and wall time from process start to the first 200 on
+/healthz, with warm-up in the background (default) vs before the port opens.
+Every run is a fresh interpreter, so the numbers include the import cost.
+
+    python -m bench.cold_start
+    python -m bench.cold_start --runs 10 --modes background blocking --top 15
+    ENABLE_VERTEX=1 python -m bench.cold_start --skip-imports
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from .retrieval import _report
+
+APP = "app.backend.main"
+
+
+def import_report(module: str = APP) -> Tuple[float, Dict[str, float]]:
+    """Total import time of ``module`` and self time per package, in ms."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    per_package: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        parts = name.split(".")
+        # google.* is a namespace: report google.cloud.aiplatform, not "google".
+        depth = 3 if parts[:2] == ["google", "cloud"] else 2 if parts[0] == "google" else 1
+        per_package[".".join(parts[:depth])] += int(self_us) / 1000
+        if name == module:
+            total = int(cumulative_us) / 1000
+    return total, dict(per_package)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _healthz(port: int) -> Optional[dict]:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as resp:
+            return json.loads(resp.read()) if resp.status == 200 else None
+    except OSError:
+        return None
+
+
+def start_once(mode: str, timeout_s: float = 60.0, poll_s: float = 0.005) -> Tuple[float, Optional[float]]:
+    """(ms to first 200 on /healthz, ms until it reports warm) for one fresh uvicorn process."""
+    port = _free_port()
+    env = dict(os.environ, STARTUP_WARMUP=mode)
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{APP}:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first: Optional[float] = None
+    warm: Optional[float] = None
+    try:
+        while time.perf_counter() - started < timeout_s:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {proc.returncode}")
+            health = _healthz(port)
+            if health is not None:
+                now = (time.perf_counter() - started) * 1000
+                first = first if first is not None else now
+                if health.get("warm") or mode == "off":
+                    warm = now
+                    break
+            time.sleep(poll_s)
+    finally:
+        proc.terminate()
+        proc.wait()
+    if first is None:
+        raise RuntimeError(f"/healthz not up after {timeout_s:.0f}s")
+    return first, warm
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=["background", "blocking"], choices=["background", "blocking", "off"])
+    parser.add_argument("--top", type=int, default=10, help="packages to list in the import report")
+    parser.add_argument("--skip-imports", action="store_true")
+    args = parser.parse_args()
+
+    if not args.skip_imports:
+        total, per_package = import_report()
+        print(f"== import {APP}: {total:.0f} ms")
+        for name, ms in sorted(per_package.items(), key=lambda item: -item[1])[: args.top]:
+            print(f"  {ms:8.1f} ms  {name}")
+
+    for mode in args.modes:
+        first: List[float] = []
+        warm: List[float] = []
+        for _ in range(args.runs):
+            up, ready = start_once(mode)
+            first.append(up)
+            if ready is not None:
+                warm.append(ready)
+        print(f"\n== STARTUP_WARMUP={mode} ({args.runs} runs)")
+        _report("healthz", first)
+        if warm:
+            _report("warm", warm)
+
+
+if __name__ == "__main__":
+    main_cli()
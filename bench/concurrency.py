@@ -0,0 +1,164 @@
+# bench/concurrency.py
+"""
+Throughput of /tts, /stt and /assist at 80 concurrent requests (Cloud Run's
+containerConcurrency), blocking `def` handlers vs the async ones, against
+local stand-ins for Speech and TTS with injected latency. The last scenario
+floods a slow TTS and measures /stt latency next to it.
+
+    python -m bench.concurrency
+    python -m bench.concurrency --requests 800 --stt-latency 0.3 --tts-latency 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import os
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+os.environ.setdefault("TTS_BACKEND", "local")
+os.environ.setdefault("TTS_CACHE", "0")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from app.backend import clients, main  # noqa: E402
+from app.backend.voice import tts as tts_voice  # noqa: E402
+
+from .retrieval import _report  # noqa: E402
+
+AUDIO_B64 = base64.b64encode(b"\x1a\x45\xdf\xa3" + bytes(4000)).decode("ascii")
+
+
+def _response(transcript: str) -> SimpleNamespace:
+    alternative = SimpleNamespace(transcript=transcript)
+    return SimpleNamespace(results=[SimpleNamespace(alternatives=[alternative])])
+
+
+class LocalSpeech:
+    def __init__(self, latency_s: float) -> None:
+        self.latency_s = latency_s
+
+    def recognize(self, config, audio):
+        time.sleep(self.latency_s)
+        return _response("what is my balance")
+
+
+class LocalAsyncSpeech(LocalSpeech):
+    async def recognize(self, config, audio):
+        await asyncio.sleep(self.latency_s)
+        return _response("what is my balance")
+
+
+def blocking_app() -> FastAPI:
+    """The handlers as they were: plain `def`, run on Starlette's threadpool."""
+    app = FastAPI()
+    synthesizer = tts_voice.get_synthesizer()
+
+    def stt_text(audio: str, lang: str) -> str:
+        with clients.get_registry().acquire("speech") as client:
+            resp = client.recognize(config=None, audio=base64.b64decode(audio))
+        return " ".join(r.alternatives[0].transcript for r in resp.results)
+
+    def tts_b64(text: str, lang: str) -> str:
+        return base64.b64encode(synthesizer.synthesize(text, lang)).decode("utf-8")
+
+    @app.post("/tts")
+    def tts(body: main.TTSIn):
+        return {"audio": tts_b64(body.text, body.lang)}
+
+    @app.post("/stt")
+    def stt(body: main.STTIn):
+        return {"text": stt_text(body.audio, body.lang or "en-GB")}
+
+    @app.post("/assist")
+    def assist(body: main.AssistIn):
+        text = f"You said: {stt_text(body.audio, body.lang)}. How can I help next?"
+        return {"text": text, "audio": tts_b64(text, body.lang)}
+
+    return app
+
+
+PAYLOADS: Dict[str, dict] = {
+    "/tts": {"text": "Your balance is 1,234.50 euro.", "lang": "en-GB"},
+    "/stt": {"audio": AUDIO_B64, "lang": "en-GB"},
+    "/assist": {"audio": AUDIO_B64, "lang": "en-GB"},
+}
+
+
+async def _load(client: httpx.AsyncClient, path: str, n: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    timings: List[float] = []
+
+    async def one(i: int) -> None:
+        # Vary the text so nothing could be served from a cache.
+        payload = dict(PAYLOADS[path], text=f"{PAYLOADS[path].get('text', '')} {i}")
+        async with semaphore:
+            started = time.perf_counter()
+            resp = await client.post(path, json=payload)
+            resp.raise_for_status()
+            timings.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return timings
+
+
+async def run_app(label: str, app: FastAPI, args) -> None:
+    print(f"\n== {label}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for path in PAYLOADS:
+            started = time.perf_counter()
+            timings = await _load(client, path, args.requests, args.concurrency)
+            elapsed = time.perf_counter() - started
+            print(f"  {path:<8} {args.requests / elapsed:7.1f} req/s")
+            _report(path, timings)
+
+        # A slow TTS at full concurrency must not hold up STT.
+        synthesizer = tts_voice.get_synthesizer()
+        fast_backend = synthesizer.backend
+        synthesizer.backend = tts_voice.LocalTTSBackend(latency_s=args.slow_tts_latency)
+        flood = asyncio.ensure_future(_load(client, "/tts", args.concurrency, args.concurrency))
+        await asyncio.sleep(0.05)
+        stt_timings = await _load(client, "/stt", args.concurrency // 4, args.concurrency // 4)
+        await flood
+        synthesizer.backend = fast_backend
+        _report("stt|slowtts", stt_timings)
+
+
+async def amain(args) -> None:
+    clients.set_registry(
+        clients.ClientRegistry(
+            {
+                "speech": lambda _: LocalSpeech(args.stt_latency),
+                "speech_async": lambda _: LocalAsyncSpeech(args.stt_latency),
+            },
+            credentials=None,
+        )
+    )
+    tts_voice.get_synthesizer().backend = tts_voice.LocalTTSBackend(latency_s=args.tts_latency)
+    print(
+        f"{args.requests} requests per endpoint at concurrency {args.concurrency}; "
+        f"stt {args.stt_latency * 1000:.0f} ms, tts {args.tts_latency * 1000:.0f} ms, "
+        f"slow tts {args.slow_tts_latency * 1000:.0f} ms"
+    )
+    await run_app("blocking def handlers (threadpool)", blocking_app(), args)
+    async with main.app.router.lifespan_context(main.app):
+        await run_app("async handlers + per-backend limits", main.app, args)
+        print(f"  limits: {clients.limits.snapshot()}")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=80)
+    parser.add_argument("--stt-latency", type=float, default=0.2)
+    parser.add_argument("--tts-latency", type=float, default=0.15)
+    parser.add_argument("--slow-tts-latency", type=float, default=2.0)
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
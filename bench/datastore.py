@@ -0,0 +1,122 @@
+# bench/datastore.py
+"""
+Per-request cost of the DataStore customer lookups on a synthetic book:
+"scan" is the previous boolean mask over the whole products/transactions
+column plus a copy, "indexed" the slice of the customer's rows that
+DataStore now keeps sorted by customer. Also the one-off sort at load time.
+That both return the same rows is checked in tests/test_data.py.
+
+Ids are integers and only the columns the lookups read are generated, so
+that large books fit in memory; 1M customers / 100M transactions needs
+roughly 8 GB.
+
+    python -m bench.datastore
+    python -m bench.datastore --customers 1000000 --transactions 100000000 --lookups 50
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.backend.data import CARD_KEYWORDS, DataStore
+
+from .retrieval import _report
+
+PRODUCT_TYPES = np.array(["Current Account", "Savings Account", "Visa Credit Card", "Debit Card", "Mortgage"], dtype=object)
+STATUSES = np.array(["Active", "Active", "Active", "Blocked by Customer"], dtype=object)
+MERCHANTS = np.array(["albert heijn", "delhaize", "colruyt", "sncb", "spotify", "shell", "amazon", "salary"], dtype=object)
+
+
+def synthetic_frames(customers: int, transactions: int, products_per_customer: int, seed: int = 7) -> Tuple[pd.DataFrame, ...]:
+    rng = np.random.default_rng(seed)
+    n_products = customers * products_per_customer
+    product_customer = np.repeat(np.arange(customers, dtype=np.int64), products_per_customer)
+    # Shuffled, as a book loaded from CSV is ordered by product, not by customer.
+    order = rng.permutation(n_products)
+    products = pd.DataFrame({
+        "product_id": order.astype(np.int64),
+        "customer_id": product_customer[order],
+        "product_type": PRODUCT_TYPES[rng.integers(0, len(PRODUCT_TYPES), n_products)],
+        "product_name": "Product",
+        "status": STATUSES[rng.integers(0, len(STATUSES), n_products)],
+    })
+    products_closed = products.iloc[0:0].copy()
+    product_ids = rng.integers(0, n_products, transactions)
+    tx = pd.DataFrame({
+        "product_id": product_ids,
+        "customer_id": product_customer[product_ids],
+        "date": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, transactions), unit="D"),
+        "amount": rng.gamma(2.0, 40.0, transactions).round(2),
+        "normalized_merchant": pd.Categorical.from_codes(rng.integers(0, len(MERCHANTS), transactions), MERCHANTS),
+    })
+    del product_ids
+    customers_df = pd.DataFrame({"name": "Customer"}, index=pd.Index(np.arange(customers, dtype=np.int64), name="customer_id"))
+    return customers_df, products, products_closed, tx
+
+
+# ---------------- Previous lookups ----------------
+def scan_active_accounts(store: DataStore, customer_id) -> pd.DataFrame:
+    df = store.products[store.products["customer_id"] == customer_id].copy()
+    df["account_type"] = df["product_type"].apply(store.infer_account_type)
+    df = df[~df["status"].str.lower().str.contains("closed")]
+    return df[df["account_type"].notna()]
+
+
+def scan_card_products(store: DataStore, customer_id) -> pd.DataFrame:
+    df = store.products[store.products["customer_id"] == customer_id].copy()
+    df["is_card"] = df["product_type"].str.lower().apply(
+        lambda value: any(keyword in value for keyword in CARD_KEYWORDS)
+    )
+    return df[df["is_card"]]
+
+
+def scan_transactions(store: DataStore, customer_id) -> pd.DataFrame:
+    df = store.transactions[store.transactions["customer_id"] == customer_id].copy()
+    df = df[df["amount"].abs() >= 10.0]
+    df.sort_values("date", ascending=False, inplace=True)
+    return df.head(20)
+
+
+def indexed_transactions(store: DataStore, customer_id) -> pd.DataFrame:
+    return store.filter_transactions(customer_id, None, 20, None, None, 10.0)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--transactions", type=int, default=5_000_000)
+    parser.add_argument("--products-per-customer", type=int, default=3)
+    parser.add_argument("--lookups", type=int, default=100, help="customers looked up per method")
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.customers, args.transactions, args.products_per_customer)
+    t0 = time.perf_counter()
+    store = DataStore(*frames, {})
+    del frames
+    print(f"{args.customers:,} customers, {len(store.products):,} products, {len(store.transactions):,} transactions "
+          f"({store.transactions.memory_usage(deep=False).sum() / 2**20:,.0f} MiB); "
+          f"sorted and indexed by customer in {time.perf_counter() - t0:.1f}s")
+
+    sample = np.random.default_rng(1).integers(0, args.customers, args.lookups)
+    methods: Dict[str, Dict[str, Callable]] = {
+        "list_active_accounts": {"scan": scan_active_accounts, "indexed": DataStore.list_active_accounts},
+        "list_card_products": {"scan": scan_card_products, "indexed": DataStore.list_card_products},
+        "filter_transactions": {"scan": scan_transactions, "indexed": indexed_transactions},
+    }
+    for name, variants in methods.items():
+        print(f"\n== {name}, {args.lookups} customers")
+        for label, fn in variants.items():
+            timings: List[float] = []
+            for customer_id in sample:
+                t0 = time.perf_counter()
+                fn(store, int(customer_id))
+                timings.append((time.perf_counter() - t0) * 1000)
+            _report(label, timings)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,92 @@
+# bench/intent_stream.py
+"""
+How much earlier start_convo can route when the streamed intent JSON is parsed
+member by member: the old turn waited for the whole classify_intent response
+(summary and questions included) before branching; now the branch is taken
+once "intent" and "auth_required" close, and the stream is dropped when the
+branch doesn't use the rest. Gemini is the local stand-in of bench.nlu_turn.
+
+    python -m bench.intent_stream
+    python -m bench.intent_stream --chunk-ms 30 --chunk-chars 16 --repeat 3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from typing import List
+
+from app.backend import intents, nlu
+from app.backend.dialog.utils import IncrementalJSONObject
+
+from .nlu_turn import SCENARIOS, LocalModels, local_chatbot
+from .retrieval import _report
+
+
+def full_parse_turn(bot: nlu.ChatBot, query: str) -> None:
+    """The previous start_convo: branch only after the whole intent JSON is in."""
+    cancel = threading.Event()
+    grounding = nlu.get_executor().submit(bot.retrieve_grounded_info, query, cancel)
+    intent_js = bot._parse_json(bot.classify_intent(query))
+    if nlu.needs_grounding(intent_js):
+        grounding.result()
+    else:
+        cancel.set()
+        grounding.cancel()
+
+
+def parser_cpu_ms(text: str, chunk_chars: int, repeat: int = 2000) -> List[float]:
+    pieces = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        parser = IncrementalJSONObject()
+        for piece in pieces:
+            parser.feed(piece)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return timings
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grounding-s", type=float, default=2.5, help="grounded search time to first chunk")
+    parser.add_argument("--intent-s", type=float, default=1.2, help="classifier time to first chunk")
+    parser.add_argument("--chunk-ms", type=float, default=20, help="time between streamed chunks")
+    parser.add_argument("--chunk-chars", type=int, default=24, help="characters per streamed chunk")
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    intents.THRESHOLD = 2.0
+    models = LocalModels(args.grounding_s, args.intent_s, chunk_s=args.chunk_ms / 1000, chunk_chars=args.chunk_chars)
+    bot = local_chatbot(models)
+    print(f"intent {args.intent_s:.1f}s to first chunk, then {args.chunk_chars} chars every {args.chunk_ms:.0f} ms; "
+          f"grounding {args.grounding_s:.1f}s")
+    saved: List[float] = []
+    for query, expected in SCENARIOS.items():
+        before: List[float] = []
+        after: List[float] = []
+        route: List[float] = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            full_parse_turn(bot, query)
+            before.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            bot.start_convo(query, session_id="bench")
+            after.append((time.perf_counter() - started) * 1000)
+            route.append(bot.sessions.get("bench").timings["route_ms"])
+        saved.append(sum(before) / len(before) - sum(after) / len(after))
+        print(f"\n== {expected['intent']} (auth_required={expected['auth_required']})")
+        _report("full parse", before)
+        _report("streamed", after)
+        _report("routed at", route)
+    print(f"\n== saved per turn: " + ", ".join(f"{ms:.0f} ms" for ms in saved)
+          + f" (mean {sum(saved) / len(saved):.0f} ms)")
+
+    text = json.dumps(next(iter(SCENARIOS.values())))
+    print(f"\n== parser CPU time, {len(text)} chars in {args.chunk_chars}-char pieces")
+    _report("feed", parser_cpu_ms(text, args.chunk_chars))
+
+
+if __name__ == "__main__":
+    main_cli()
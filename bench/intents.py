@@ -0,0 +1,93 @@
+# bench/intents.py
+"""
+Evaluate the local intent classifier on held-out EN/FR/NL utterances: accuracy,
+calibration, how many turns it answers without Gemini at each threshold and
+how much classifier latency that saves, plus its own CPU time per utterance.
+
+    python -m bench.intents
+    python -m bench.intents --threshold 0.9 --llm-ms 1200 --eval app/data/intents/eval.tsv
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+from app.backend import intents
+
+from .retrieval import _report
+
+EVAL_PATH = intents.UTTERANCES_PATH.with_name("eval.tsv")
+
+
+def calibration_error(confidences: np.ndarray, correct: np.ndarray, bins: int = 10) -> float:
+    """Expected calibration error: mean |accuracy - confidence| over equal-width confidence bins."""
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    error = 0.0
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        mask = (confidences > lo) & (confidences <= hi)
+        if mask.any():
+            error += mask.mean() * abs(correct[mask].mean() - confidences[mask].mean())
+    return float(error)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eval", type=Path, default=EVAL_PATH)
+    parser.add_argument("--threshold", type=float, default=intents.THRESHOLD)
+    parser.add_argument("--llm-ms", type=float, default=1200, help="Gemini classify_intent latency to credit per local answer")
+    parser.add_argument("--repeat", type=int, default=200, help="timing passes over the eval set")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    model = intents.train_from_utterances()
+    print(f"trained on {len(intents.load_utterances())} utterances in {time.perf_counter() - started:.2f}s, "
+          f"temperature {model.temperature:.2f}")
+
+    rows = intents.load_utterances(args.eval)
+    predictions = [model.classify(text) for _, _, text in rows]
+    confidences = np.array([p.confidence for p in predictions])
+    correct = np.array([p.key == key for p, (key, _, _) in zip(predictions, rows)])
+    lang_ok = np.array([p.lang == lang for p, (_, lang, _) in zip(predictions, rows)])
+
+    print(f"\n== held-out {len(rows)} utterances ({args.eval.name})")
+    print(f"  accuracy {correct.mean():.3f}, language {lang_ok.mean():.3f}, "
+          f"calibration error {calibration_error(confidences, correct):.3f}")
+    per_lang = defaultdict(list)
+    for ok, (_, lang, _) in zip(correct, rows):
+        per_lang[lang].append(ok)
+    print("  " + ", ".join(f"{lang} {np.mean(oks):.3f}" for lang, oks in sorted(per_lang.items())))
+
+    print("\n  threshold  local  local acc  saved/turn")
+    for threshold in sorted({0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99, args.threshold}):
+        local = confidences >= threshold
+        acc = correct[local].mean() if local.any() else float("nan")
+        marker = "  <-" if threshold == args.threshold else ""
+        print(f"  {threshold:9.2f}  {local.mean():5.2f}  {acc:9.3f}  {local.mean() * args.llm_ms:7.0f} ms{marker}")
+
+    misses: List[Tuple[float, str, str, str]] = [
+        (p.confidence, key, p.key, text) for p, (key, _, text) in zip(predictions, rows) if p.key != key
+    ]
+    if misses:
+        print("\n  misses (confidence, expected -> got):")
+        for confidence, expected, got, text in sorted(misses, reverse=True):
+            flag = "" if confidence < args.threshold else "  [accepted]"
+            print(f"    {confidence:.3f}  {expected} -> {got}: {text}{flag}")
+
+    timings: List[float] = []
+    texts = [text for _, _, text in rows]
+    for _ in range(args.repeat):
+        for text in texts:
+            t0 = time.perf_counter()
+            model.classify(text)
+            timings.append((time.perf_counter() - t0) * 1000)
+    print(f"\n== classify CPU time ({len(timings)} calls)")
+    _report("local", timings)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,123 @@
+# bench/llm_telemetry.py
+"""
+What the per-call telemetry of nlu.ChatBot records, and what a per-stage
+budget buys: a few turns against the local Gemini stand-in (which "thinks"
+for a number of tokens before its first chunk unless thinking_budget is 0)
+with the default budgets, then with the intent stage's thinking turned off,
+then with a flaky backend and a tight timeout. Also the wrapper's own cost.
+
+    python -m bench.llm_telemetry
+    python -m bench.llm_telemetry --thinking-tokens 400 --thinking-ms 2 --prometheus
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import replace
+from typing import Dict, List
+
+from google.genai import errors
+
+from app.backend import intents, telemetry
+
+from .nlu_turn import SCENARIOS, LocalModels, local_chatbot
+from .retrieval import _report
+
+
+class FlakyModels(LocalModels):
+    """Fails the first ``failures`` calls with a 503, like an overloaded endpoint."""
+
+    def __init__(self, *args, failures: int = 1, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+
+    def generate_content_stream(self, model: str, contents, config):
+        if self.failures:
+            self.failures -= 1
+            raise errors.ServerError(503, {"error": {"code": 503, "message": "overloaded", "status": "UNAVAILABLE"}})
+        yield from super().generate_content_stream(model, contents, config)
+
+
+def run_turns(models: LocalModels) -> None:
+    bot = local_chatbot(models)
+    for query in SCENARIOS:
+        bot.start_convo(query, session_id="bench")
+    bot.start_convo("What is the balance of my current account?", session_id="bench")
+    bot.continue_convo_auth("Jan Peeters, 12/03/1985", "Query for their account balance", session_id="bench")
+
+
+def print_snapshot(title: str) -> None:
+    print(f"\n== {title}")
+    print("  stage          calls  ok  err  tmo  cnc  retry  ttfc p50   lat p50   in tok  out tok  think tok")
+    for stage, s in telemetry.llm_telemetry.snapshot().items():
+        print(f"  {stage:<13} {s['calls']:6d} {s['ok']:3d} {s['error']:4d} {s['timeout']:4d} {s['cancelled']:4d} "
+              f"{s['retries']:6d} {s['ttfc_p50_ms'] or 0:8.0f} ms {s['latency_p50_ms']:6.0f} ms "
+              f"{s['mean_input_tokens']:7.0f} {s['mean_output_tokens']:8.0f} {s['mean_thinking_tokens']:10.0f}")
+
+
+def wrapper_overhead_ms(chunks: int = 50, repeat: int = 2000) -> Dict[str, List[float]]:
+    items = [object()] * chunks
+    quiet = telemetry.LLMTelemetry(log=False)
+    timings: Dict[str, List[float]] = {"plain": [], "observed": []}
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in iter(items):
+            pass
+        timings["plain"].append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        for _ in telemetry.observe_stream("intent", lambda: iter(items), telemetry=quiet):
+            pass
+        timings["observed"].append((time.perf_counter() - t0) * 1000)
+    return timings
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grounding-s", type=float, default=2.5, help="grounded search time to first chunk")
+    parser.add_argument("--intent-s", type=float, default=0.6, help="classifier time to first chunk, before thinking")
+    parser.add_argument("--thinking-tokens", type=int, default=300, help="tokens thought per call when thinking is on")
+    parser.add_argument("--thinking-ms", type=float, default=2.0, help="time per thinking token")
+    parser.add_argument("--prometheus", action="store_true", help="print the /metrics text at the end")
+    args = parser.parse_args()
+
+    intents.THRESHOLD = 2.0
+    telemetry.llm_telemetry.log = False
+
+    def models(cls=LocalModels, **kwargs) -> LocalModels:
+        return cls(args.grounding_s, args.intent_s, thinking_tokens=args.thinking_tokens,
+                   thinking_token_s=args.thinking_ms / 1000, **kwargs)
+
+    run_turns(models())
+    print_snapshot("default budgets (thinking_budget=-1, 65535 output tokens)")
+
+    telemetry.llm_telemetry.stages.clear()
+    default_intent = telemetry.BUDGETS["intent"]
+    telemetry.BUDGETS["intent"] = replace(default_intent, thinking_budget=0, max_output_tokens=512)
+    run_turns(models())
+    print_snapshot("NLU_INTENT_THINKING_BUDGET=0, NLU_INTENT_MAX_OUTPUT_TOKENS=512")
+    telemetry.BUDGETS["intent"] = default_intent
+
+    if args.prometheus:
+        print("\n== /metrics")
+        print(telemetry.llm_telemetry.prometheus())
+
+    telemetry.llm_telemetry.stages.clear()
+    run_turns(models(FlakyModels, failures=2))
+    default_grounding = telemetry.BUDGETS["grounding"]
+    telemetry.BUDGETS["grounding"] = replace(default_grounding, timeout_s=args.grounding_s / 2)
+    bot = local_chatbot(models())
+    try:
+        bot.retrieve_grounded_info("What interest do you pay on a savings account?")
+    except TimeoutError as exc:
+        print(f"\n  grounding with NLU_GROUNDING_TIMEOUT_S={args.grounding_s / 2:g}: {exc}")
+    telemetry.BUDGETS["grounding"] = default_grounding
+    print_snapshot("two 503s from the backend, then a grounding call past its timeout")
+
+    timings = wrapper_overhead_ms()
+    print("\n== observe_stream cost, 50 chunks per call")
+    _report("plain", timings["plain"])
+    _report("observed", timings["observed"])
+
+
+if __name__ == "__main__":
+    main_cli()
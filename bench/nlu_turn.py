@@ -0,0 +1,169 @@
+# bench/nlu_turn.py
+"""
+Wall-clock latency of one ChatBot.start_convo turn with grounding and intent
+classification run one after the other (as before) vs side by side with the
+grounded call dropped when the intent doesn't use it. Gemini is replaced by a
+local stand-in that streams canned chunks with configurable latency.
+
+    python -m bench.nlu_turn
+    python -m bench.nlu_turn --grounding-s 2.5 --intent-s 1.2 --repeat 3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+
+from app.backend import intents, nlu
+from app.backend.answer_cache import SemanticAnswerCache
+
+from .retrieval import _report
+
+# query -> what the classifier answers for it
+SCENARIOS: Dict[str, dict] = {
+    "What interest do you pay on a savings account?": {
+        "intent": "Get more information about the bank's product",
+        "summary": "The customer wants to know the interest rate ING pays on savings accounts, including any "
+                   "base rate and fidelity premium, and whether the rate differs between savings products.",
+        "auth_required": False,
+    },
+    "What is the balance of my current account?": {
+        "intent": "Query for their account balance",
+        "summary": "The customer asks for the current balance of their current (checking) account. We need to "
+                   "identify the customer and the account before calling the balances API.",
+        "auth_required": True,
+        "questions": "What is your full name and date of birth? Which account would you like the balance of?",
+    },
+    "Please block my card": {
+        "intent": "Block or unblock or card",
+        "summary": "The customer asks to block their bank card, possibly because it was lost or stolen; the "
+                   "action is block and the card still has to be identified.",
+        "auth_required": False,
+    },
+    "Can you tell me a joke?": {
+        "intent": "Something else",
+        "summary": "The customer asks for a joke, which is not related to any banking task we can perform.",
+        "auth_required": False,
+    },
+}
+
+
+def _chunk(text: str, docs: List[str] = (), usage: Optional[SimpleNamespace] = None) -> SimpleNamespace:
+    grounding = SimpleNamespace(
+        grounding_chunks=[SimpleNamespace(retrieved_context=SimpleNamespace(text=doc)) for doc in docs] or None
+    )
+    candidate = SimpleNamespace(content=SimpleNamespace(parts=[text]), grounding_metadata=grounding)
+    return SimpleNamespace(candidates=[candidate], text=text, usage_metadata=usage)
+
+
+class LocalModels:
+    """``models.generate_content_stream`` with Gemini-like latency: the grounded call has tools in its config."""
+
+    def __init__(
+        self,
+        grounding_s: float,
+        intent_s: float,
+        chunk_s: float = 0.02,
+        chunks: int = 8,
+        chunk_chars: int = 24,
+        thinking_tokens: int = 0,
+        thinking_token_s: float = 0.0,
+    ) -> None:
+        self.grounding_s = grounding_s
+        self.intent_s = intent_s
+        self.chunk_s = chunk_s
+        self.chunks = chunks
+        self.chunk_chars = chunk_chars
+        # Tokens "thought" before the first chunk unless the config sets thinking_budget=0.
+        self.thinking_tokens = thinking_tokens
+        self.thinking_token_s = thinking_token_s
+        self.calls: Dict[str, int] = {"grounding": 0, "intent": 0, "other": 0}
+        self.prompt_chars: List[int] = []
+
+    def generate_content_stream(self, model: str, contents, config) -> Iterator[SimpleNamespace]:
+        query = contents[-1].parts[0].text
+        self.prompt_chars.append(sum(len(part.text) for content in contents for part in content.parts))
+        if config.tools:
+            self.calls["grounding"] += 1
+            first_s, pieces = self.grounding_s, [f"Grounded answer to {query!r}, part {i}. " for i in range(self.chunks)]
+            docs = ["ING savings accounts pay a base rate plus a fidelity premium."]
+        elif config.response_schema is not None and "reply" in config.response_schema["properties"]:
+            # Slot-filling turn: the stand-in only talks; extraction is left to the local policy.
+            self.calls["other"] += 1
+            first_s, pieces, docs = self.intent_s, [json.dumps({"reply": "Could you tell me a bit more?", "slots": {}})], []
+        elif config.response_schema is not None:
+            self.calls["intent"] += 1
+            answer = SCENARIOS.get(query, {"intent": "Something else", "summary": query, "auth_required": False})
+            order = config.response_schema.get("propertyOrdering", list(answer))
+            text = json.dumps({key: answer[key] for key in order if key in answer})
+            # Gemini streams JSON a few tokens at a time, cutting anywhere.
+            pieces = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+            first_s, docs = self.intent_s, []
+        else:
+            self.calls["other"] += 1
+            first_s, pieces, docs = self.intent_s, ["True"], []
+        thinking = getattr(config, "thinking_config", None)
+        thoughts = 0 if thinking is not None and thinking.thinking_budget == 0 else self.thinking_tokens
+        system = sum(len(part.text) for part in config.system_instruction or [])
+        usage = SimpleNamespace(
+            prompt_token_count=(self.prompt_chars[-1] + system) // 4 + 1,
+            candidates_token_count=sum(len(piece) for piece in pieces) // 4 + 1,
+            thoughts_token_count=thoughts,
+            cached_content_token_count=0,
+        )
+        time.sleep(first_s + thoughts * self.thinking_token_s)
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(self.chunk_s)
+            yield _chunk(piece, docs, usage if i == len(pieces) - 1 else None)
+
+
+def local_chatbot(models: LocalModels, answer_cache: Optional[SemanticAnswerCache] = None) -> nlu.ChatBot:
+    # The answer cache is off unless given, so repeated queries keep paying for grounding.
+    if answer_cache is None:
+        answer_cache = SemanticAnswerCache(threshold=2.0, version_path=None)
+    bot = nlu.ChatBot(answer_cache=answer_cache)
+    bot._api_client = SimpleNamespace(models=models)
+    return bot
+
+
+def sequential_turn(bot: nlu.ChatBot, query: str) -> None:
+    """What start_convo did before: ground, then classify."""
+    bot.retrieve_grounded_info(query)
+    bot._parse_json(bot.classify_intent(query))
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grounding-s", type=float, default=2.5, help="grounded search time to first chunk")
+    parser.add_argument("--intent-s", type=float, default=1.2, help="classifier time to first chunk")
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--local-intents", action="store_true", help="let the local classifier answer first")
+    args = parser.parse_args()
+
+    if not args.local_intents:
+        intents.THRESHOLD = 2.0
+
+    models = LocalModels(args.grounding_s, args.intent_s)
+    bot = local_chatbot(models)
+    print(f"grounding {args.grounding_s:.1f}s, intent {args.intent_s:.1f}s to first chunk")
+    for query, expected in SCENARIOS.items():
+        before: List[float] = []
+        after: List[float] = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            sequential_turn(bot, query)
+            before.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            bot.start_convo(query, session_id="bench")
+            after.append((time.perf_counter() - started) * 1000)
+        cancelled = "grounding cancelled" if bot.sessions.get("bench").timings["grounding_cancelled"] else "grounding used"
+        print(f"\n== {expected['intent']} (auth_required={expected['auth_required']}, {cancelled})")
+        _report("sequential", before)
+        _report("concurrent", after)
+
+
+if __name__ == "__main__":
+    main_cli()
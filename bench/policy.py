@@ -0,0 +1,85 @@
+# bench/policy.py
+"""
+Scripted EN/FR/NL slot-filling dialogues through ChatBot.continue_convo_auth
+against the local Gemini stand-in: whether each one completes on the expected
+turn with the expected payload, Gemini calls per turn, and turn latency with
+the local completeness check vs the evaluate_chat_history round trip it replaces.
+
+    python -m bench.policy
+    python -m bench.policy --llm-s 1.0
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+from app.backend import intents
+from app.backend.dialog.policy import policy
+from app.backend.dialog.session import SessionStore
+
+from .nlu_turn import LocalModels, local_chatbot
+from .retrieval import _report
+
+# (intent, opening, customer turns, expected slots once complete)
+DIALOGUES: List[Tuple[str, str, List[str], Dict[str, object]]] = [
+    ("Block or unblock or card", "Please block my card", ["My name is Jan Peeters and I was born on 12/03/1985"],
+     {"name": "Jan Peeters", "birthdate": "1985-03-12", "action": "block"}),
+    ("Block or unblock or card", "J'ai un problème avec ma carte", ["Marie Dubois, 3 mars 1990", "je veux la débloquer"],
+     {"name": "Marie Dubois", "birthdate": "1990-03-03", "action": "unblock"}),
+    ("Update customer information", "Ik wil mijn gegevens aanpassen",
+     ["Ik heet Pieter De Smet", "geboren op 5 januari 1979", "mijn nieuwe e-mail is pieter.desmet@example.be"],
+     {"name": "Pieter De Smet", "birthdate": "1979-01-05", "email": "pieter.desmet@example.be"}),
+    ("Update customer information", "I moved house", ["Jan Peeters, 1985-03-12", "my new address is Kerkstraat 12, 9000 Gent"],
+     {"name": "Jan Peeters", "birthdate": "1985-03-12", "address": "Kerkstraat 12, 9000 Gent"}),
+    ("Query for their account balance", "What's the balance of my savings account?", ["I am Jan Peeters, born 12-03-1985"],
+     {"name": "Jan Peeters", "birthdate": "1985-03-12", "account_type": "savings"}),
+    ("Query for details about their transactions", "Montrez-moi mes 10 dernières transactions",
+     ["Je m'appelle Marie Dubois", "née le 03/03/1990"],
+     {"name": "Marie Dubois", "birthdate": "1990-03-03", "n": 10}),
+    ("Query for details about their existing product", "Welke producten heb ik?", ["Pieter De Smet 05/01/1979"],
+     {"name": "Pieter De Smet", "birthdate": "1979-01-05"}),
+]
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-s", type=float, default=0.8, help="stand-in Gemini latency per call")
+    args = parser.parse_args()
+    intents.THRESHOLD = 2.0
+
+    models = LocalModels(grounding_s=0.0, intent_s=args.llm_s, chunk_s=0.0)
+    bot = local_chatbot(models)
+    bot.sessions = SessionStore()
+    turn_ms: List[float] = []
+    calls_before = models.calls["other"]
+    ok = 0
+    print(f"== {len(DIALOGUES)} scripted dialogues")
+    for n, (intent, opening, turns, expected) in enumerate(DIALOGUES):
+        session_id = f"dialogue-{n}"
+        with bot.sessions.open(session_id) as session:
+            session.reset()
+            session.intent = intent
+            policy.update(intent, session.slots, opening)
+        replies = []
+        for text in turns:
+            started = time.perf_counter()
+            replies.append(bot.continue_convo_auth(text, intent, session_id=session_id))
+            turn_ms.append((time.perf_counter() - started) * 1000)
+        session = bot.sessions.get(session_id)
+        good = session.end_convo and all(session.slots.get(k) == v for k, v in expected.items())
+        ok += good
+        print(f"  {'ok  ' if good else 'FAIL'} {intent} ({len(turns)} turns): {session.slots}")
+        if not good:
+            print(f"       replies: {replies}")
+    calls = models.calls["other"] - calls_before
+    print(f"\n  {ok}/{len(DIALOGUES)} complete with the expected slots, "
+          f"{calls / len(turn_ms):.1f} Gemini calls per turn (was 2: reply + evaluate_chat_history)")
+
+    print(f"\n== turn latency, stand-in Gemini at {args.llm_s:.1f}s per call")
+    _report("before", [ms + args.llm_s * 1000 for ms in turn_ms])
+    _report("policy", turn_ms)
+
+
+if __name__ == "__main__":
+    main_cli()
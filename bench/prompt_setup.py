@@ -0,0 +1,85 @@
+# bench/prompt_setup.py
+"""
+Per-turn Python overhead of the ChatBot request setup and the size of what
+each turn sends. "rebuilt" builds the GenerateContentConfig objects (tools,
+schema, safety settings, system instruction) for every call, as each call
+used to; "static" takes the ones built once per process. Prompt sizes are
+estimated at ~4 characters per token, static prefix vs per-turn input, with
+the indented literals the instructions used to be written as for comparison.
+
+    python -m bench.prompt_setup
+    python -m bench.prompt_setup --turns 2000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import textwrap
+import time
+from typing import List
+
+from app.backend import nlu
+from app.backend.dialog.session import estimate_tokens
+
+from .nlu_turn import LocalModels, local_chatbot
+from .retrieval import _report
+
+INTENT = "Query for their account balance"
+QUERY = "What is the balance of my current account?"
+# Gemini's smallest cacheable prefix; shorter ones are sent inline whatever NLU_CONTEXT_CACHE says.
+MIN_CACHE_TOKENS = 1024
+
+
+def rebuilt_turn(bot: nlu.ChatBot) -> None:
+    bot._build_config("grounding")
+    bot._build_config("intent")
+    bot._slot_configs.pop(INTENT, None)
+    bot._slot_config(INTENT)
+
+
+def static_turn(bot: nlu.ChatBot) -> None:
+    bot._static_config("grounding")
+    bot._static_config("intent")
+    bot._slot_config(INTENT)
+
+
+def indented(text: str, width: int) -> str:
+    """``text`` as it was written inside the method body: every line after the first indented."""
+    first, _, rest = text.partition("\n")
+    return first + "\n" + textwrap.indent(rest, " " * width) if rest else first
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=1000)
+    args = parser.parse_args()
+
+    bot = local_chatbot(LocalModels(0.0, 0.0))
+    static_turn(bot)
+    print(f"== request setup per turn (grounding + intent + slot-filling configs), {args.turns} turns")
+    for label, turn in (("rebuilt", rebuilt_turn), ("static", static_turn)):
+        timings: List[float] = []
+        for _ in range(args.turns):
+            t0 = time.perf_counter()
+            turn(bot)
+            timings.append((time.perf_counter() - t0) * 1000)
+        _report(label, timings)
+
+    schema = json.dumps(nlu.INTENT_SCHEMA)
+    slot_instruction = bot._slot_config(INTENT).system_instruction[0].text
+    rows = [
+        ("grounding", nlu.GROUNDING_INSTRUCTION, indented(nlu.GROUNDING_INSTRUCTION, 16), ""),
+        ("intent", nlu.INTENT_INSTRUCTION, indented(nlu.INTENT_INSTRUCTION, 8), schema),
+        ("slot_filling", slot_instruction, slot_instruction, json.dumps(nlu.policy.response_schema(nlu.policy.specs[INTENT]))),
+    ]
+    print(f"\n== estimated prompt tokens per call ({QUERY!r})")
+    print("  stage          instruction  was indented  schema  per-turn input  cacheable prefix")
+    for stage, instruction, old, schema_text in rows:
+        static = estimate_tokens(instruction) + (estimate_tokens(schema_text) if schema_text else 0)
+        cacheable = "yes" if static >= MIN_CACHE_TOKENS else f"no, {static} < {MIN_CACHE_TOKENS}"
+        print(f"  {stage:<13} {estimate_tokens(instruction):12d} {estimate_tokens(old):13d} "
+              f"{estimate_tokens(schema_text) if schema_text else 0:7d} {estimate_tokens(QUERY):15d}  {cacheable}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,242 @@
+# bench/retrieval.py
+"""
+Compare the original per-query chunk scanner with the persisted BM25 index.
+
+    python -m bench.retrieval
+    python -m bench.retrieval --synthetic-docs 100000 --scan-queries 3
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import random
+import re
+import shutil
+import statistics
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List
+
+from app.backend import rag
+from app.backend.config import default_chunks_directory
+
+LANG_QUERIES = [
+    ("en-GB", "how do I block my debit card"),
+    ("en-GB", "opening hours of the branch"),
+    ("nl-BE", "hoe blokkeer ik mijn bankkaart"),
+    ("fr-BE", "comment ouvrir un compte épargne"),
+    ("en-GB", "interest rate on the orange savings account"),
+    ("nl-BE", "kosten van een zichtrekening"),
+    ("nl-BE", "online betalen met de ing card reader"),
+    ("fr-BE", "frais de retrait d'argent à l'étranger"),
+]
+QUERIES = [query for _, query in LANG_QUERIES]
+
+
+def scan_retrieve(root: str, query: str, max_docs: int = 5) -> List[str]:
+    """The keyword scanner _retrieve_context used before the index existed."""
+    q_tokens = [t for t in re.findall(r"\b\w+\b", (query or "").lower()) if len(t) > 2]
+    q_counts = Counter(q_tokens)
+    scored = []
+    for path in glob.glob(os.path.join(root, "**", "*.txt"), recursive=True):
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                text = f.read()[:2000]
+        except Exception:
+            continue
+        if not text:
+            continue
+        t_tokens = re.findall(r"\b\w+\b", text.lower())
+        score = sum(q_counts[t] for t in t_tokens)
+        scored.append((score, path, text))
+    scored.sort(reverse=True, key=lambda x: x[0])
+    return [path for _, path, _ in scored[:max_docs]]
+
+
+def _time_queries(fn: Callable[[str], object], queries: List[str]) -> List[float]:
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _report(label: str, timings: List[float]) -> None:
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(
+        f"  {label:<10} n={len(timings):<4} mean={statistics.mean(timings):9.3f} ms  "
+        f"p50={statistics.median(timings):9.3f} ms  p95={p95:9.3f} ms"
+    )
+
+
+def write_synthetic_corpus(source: Path, target: Path, n_docs: int, seed: int = 0) -> None:
+    """Sample documents from the shipped vocabulary so term statistics stay realistic."""
+    vocabulary: List[str] = []
+    for _, path in rag.iter_chunk_files(source):
+        vocabulary.extend(rag.tokenize(rag.read_chunk(path)))
+    rng = random.Random(seed)
+    per_dir = 1000
+    for i in range(n_docs):
+        folder = target / f"{i // per_dir:04d}"
+        if i % per_dir == 0:
+            folder.mkdir(parents=True, exist_ok=True)
+        length = rng.randint(80, 400)
+        (folder / f"{i}.txt").write_text(" ".join(rng.choices(vocabulary, k=length)), encoding="utf-8")
+
+
+def bench_corpus(label: str, root: Path, scan_queries: int, repeat: int) -> None:
+    print(f"\n== {label}: {root}")
+    started = time.perf_counter()
+    index = rag.BM25Index.from_directory(root)
+    build_s = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "index.json"
+        index.save(path)
+        size_mb = path.stat().st_size / 1e6
+        started = time.perf_counter()
+        index = rag.BM25Index.load(path)
+        load_s = time.perf_counter() - started
+
+    print(
+        f"  {len(index)} chunks, {len(index.postings)} terms; build {build_s:.2f}s, "
+        f"load {load_s:.2f}s, on disk {size_mb:.1f} MB"
+    )
+    _report("scan", _time_queries(lambda q: scan_retrieve(str(root), q), QUERIES[:scan_queries]))
+    _report("bm25", _time_queries(lambda q: index.search(q, 5), QUERIES * repeat))
+
+
+def bench_partitions(root: Path, repeat: int) -> None:
+    """Pooled index over every language vs one index per language folder."""
+    print(f"\n== pooled vs per-language partitions: {root}")
+    pooled = rag.BM25Index.from_directory(root)
+    partitioned = rag.PartitionedIndex(
+        {
+            folder.name: rag.BM25Index.from_directory(folder, root)
+            for folder in sorted(root.iterdir())
+            if folder.is_dir()
+        },
+        rag.LANG_PRIORITY,
+    )
+    pooled_ms, partitioned_ms = [], []
+    for _ in range(repeat):
+        for lang, query in LANG_QUERIES:
+            started = time.perf_counter()
+            pooled.search(query, 5)
+            pooled_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            partitioned.search(query, lang=lang, k=5)
+            partitioned_ms.append((time.perf_counter() - started) * 1000)
+    _report("pooled", pooled_ms)
+    _report("partition", partitioned_ms)
+    for name, row in partitioned.stats.snapshot().items():
+        print(
+            f"  {name}: searches={row['searches']} mean={row['mean_search_ms']:.3f} ms "
+            f"fallback_rate={row['fallback_rate']:.2%}"
+        )
+
+
+def bench_dedup(root: Path, repeat: int) -> None:
+    """Index size, query latency and near-copy slots in the top 5, with and without dedup."""
+    print(f"\n== dedup off vs on: {root}")
+    probe = rag.Deduplicator()
+    for dedup in (False, True):
+        started = time.perf_counter()
+        index = rag.PartitionedIndex(
+            {
+                folder.name: rag.BM25Index.from_directory(folder, root, dedup=dedup)
+                for folder in sorted(root.iterdir())
+                if folder.is_dir()
+            },
+            rag.LANG_PRIORITY,
+        )
+        build_s = time.perf_counter() - started
+        with tempfile.TemporaryDirectory() as tmp:
+            size_mb = sidecar_mb = 0.0
+            for name, partition in index.partitions.items():
+                path = Path(tmp) / f"{name}.json"
+                partition.save(path)
+                size_mb += path.stat().st_size / 1e6
+                if partition.signatures_path(path).exists():
+                    sidecar_mb += partition.signatures_path(path).stat().st_size / 1e6
+        postings = sum(len(p) for part in index.partitions.values() for p in part.postings.values()) // 2
+
+        timings, copies = [], 0
+        for _ in range(repeat):
+            for lang, query in LANG_QUERIES:
+                started = time.perf_counter()
+                hits = index.search(query, lang=lang, k=5)
+                timings.append((time.perf_counter() - started) * 1000)
+                signatures = [probe.signature(hit.doc.text) for hit in hits]
+                copies += sum(
+                    any(probe.similarity(signatures[i], signatures[j]) >= probe.threshold for j in range(i))
+                    for i in range(len(signatures))
+                )
+        label = "dedup" if dedup else "no dedup"
+        print(
+            f"  {label:<10} passages={len(index)} postings={postings} on disk {size_mb:.2f} MB "
+            f"(+{sidecar_mb:.2f} MB signatures), "
+            f"build {build_s:.2f}s, near-copy slots in top-5: {copies // repeat}/{len(LANG_QUERIES) * 5}"
+        )
+        _report(label, timings)
+
+
+def bench_incremental(root: Path, n_changed: int) -> None:
+    """Full rebuild vs manifest-driven update after a small scrape delta."""
+    print(f"\n== incremental update, {n_changed} changed chunks")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        corpus = tmp_path / "chunks"
+        shutil.copytree(root, corpus)
+        index_dir, vector_dir, manifest = tmp_path / "bm25", tmp_path / "faiss", tmp_path / "manifest.json"
+
+        started = time.perf_counter()
+        rag.build_indexes(corpus, index_dir, manifest)
+        embedder = rag.HashingEmbedder()
+        for folder in sorted(p for p in corpus.iterdir() if p.is_dir()):
+            passages = rag.BM25Index.load(index_dir / f"{folder.name}.json")
+            rag.VectorIndex.build(rag.passage_texts(passages, corpus), embedder).save(vector_dir, folder.name)
+        print(f"  full build    {time.perf_counter() - started:.2f}s")
+
+        rng = random.Random(0)
+        for path in rng.sample(sorted(corpus.rglob("*.txt")), n_changed):
+            path.write_text(path.read_text(encoding="utf-8") + "\nUpdated.", encoding="utf-8")
+        started = time.perf_counter()
+        diff = rag.update_indexes(corpus, index_dir, vector_dir, manifest)
+        print(
+            f"  update        {time.perf_counter() - started:.2f}s "
+            f"({len(diff.changed)} changed in {', '.join(diff.partitions())})"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=Path, default=default_chunks_directory())
+    parser.add_argument("--synthetic-docs", type=int, default=100_000)
+    parser.add_argument("--scan-queries", type=int, default=len(QUERIES))
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--changed", type=int, default=20)
+    args = parser.parse_args()
+
+    bench_corpus("shipped corpus", args.chunks, args.scan_queries, args.repeat)
+    bench_partitions(args.chunks, args.repeat)
+    bench_dedup(args.chunks, args.repeat)
+    bench_incremental(args.chunks, args.changed)
+    if args.synthetic_docs:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_synthetic_corpus(args.chunks, Path(tmp), args.synthetic_docs)
+            bench_corpus(
+                f"synthetic {args.synthetic_docs} chunks",
+                Path(tmp),
+                min(args.scan_queries, 3),
+                args.repeat,
+            )
+
+
+if __name__ == "__main__":
+    main()
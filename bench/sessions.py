@@ -0,0 +1,93 @@
+# bench/sessions.py
+"""
+Many callers on one process-wide ChatBot: concurrent sessions that each run
+an opening turn and a long slot-filling exchange, against the local Gemini
+stand-in. Reports prompt size per turn (whole history resent vs the token
+budget), store memory, and that no session saw another one's turns.
+
+    python -m bench.sessions
+    python -m bench.sessions --sessions 200 --turns 40 --threads 32 --budget 2000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from app.backend import intents
+from app.backend.dialog.session import SessionStore
+
+from .nlu_turn import LocalModels, local_chatbot
+
+OPENING = "What is the balance of my current account?"
+
+
+def run(sessions: int, turns: int, threads: int, store: SessionStore, latency_s: float) -> dict:
+    models = LocalModels(grounding_s=latency_s, intent_s=latency_s, chunk_s=0.0)
+    bot = local_chatbot(models)
+    bot.sessions = store
+
+    def converse(i: int) -> None:
+        session_id = f"caller-{i}"
+        bot.start_convo(OPENING, session_id=session_id)
+        for turn in range(turns):
+            bot.continue_convo_auth(
+                f"caller {i} turn {turn}: my name is Customer {i} and I was born on 1990-01-{turn % 28 + 1:02d}, "
+                "and I would like the balance of my current account please",
+                "Query for their account balance",
+                session_id=session_id,
+            )
+
+    tracemalloc.start()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(converse, range(sessions)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    leaked = 0
+    for i in range(sessions):
+        for turn in store.get(f"caller-{i}").turns:
+            if turn.role == "user" and turn.text.startswith("caller ") and not turn.text.startswith(f"caller {i} "):
+                leaked += 1
+    prompts = models.prompt_chars
+    return {
+        "last_prompt_tokens": prompts[-1] // 4,
+        "max_prompt_tokens": max(prompts) // 4,
+        "peak_mb": peak / 1e6,
+        "leaked_turns": leaked,
+        "store": store.snapshot(),
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--budget", type=int, default=500, help="history token budget per session")
+    parser.add_argument("--latency", type=float, default=0.005, help="stand-in Gemini latency per call (s)")
+    args = parser.parse_args()
+    intents.THRESHOLD = 2.0
+
+    print(f"{args.sessions} sessions x {args.turns} turns on {args.threads} threads, one ChatBot")
+    for label, budget in (("whole history", 10 ** 9), (f"budget {args.budget}", args.budget)):
+        result = run(args.sessions, args.turns, args.threads, SessionStore(history_tokens=budget), args.latency)
+        print(
+            f"  {label:<14} max prompt {result['max_prompt_tokens']:6d} tok, last {result['last_prompt_tokens']:6d} tok, "
+            f"peak {result['peak_mb']:6.1f} MB, cross-session turns {result['leaked_turns']}"
+        )
+    print(f"\n  store: {result['store']}")
+
+    store = SessionStore(ttl_s=0.05, max_sessions=args.sessions // 2)
+    for i in range(args.sessions):
+        store.get(f"idle-{i}")
+    time.sleep(0.1)
+    expired = store.evict_expired()
+    print(f"  ttl/lru: {args.sessions} sessions into max_sessions={args.sessions // 2} -> "
+          f"{store.counts['evicted']} evicted, {expired} expired after idling, {len(store)} left")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,100 @@
+# bench/stt_formats.py
+"""
+Recognize calls and latency per upload for the audio fixtures of every
+format we expect: the old WEBM_OPUS -> auto -> MP3 fallback chain vs one
+sniffed request, against a stand-in recognizer that (like Speech) rejects a
+config whose encoding doesn't match the audio. What each fixture is detected
+as is checked in tests/test_stt.py.
+
+    python -m bench.stt_formats
+    python -m bench.stt_formats --latency 0.25
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict
+
+from google.cloud import speech
+
+from app.backend.voice import stt
+
+
+# ---------------- Fixtures ----------------
+# Encoded uploads of every format we expect (tests/fixtures/audio/generate.py), plus bytes nobody can sniff.
+FIXTURE_DIR = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "audio"
+FIXTURES: Dict[str, bytes] = {
+    path.name: path.read_bytes()
+    for path in sorted(FIXTURE_DIR.iterdir())
+    if path.is_file() and path.suffix != ".py"
+}
+FIXTURES["unknown"] = bytes(1024)
+
+
+# ---------------- Stand-in recognizer ----------------
+class StrictRecognizer:
+    """Accepts the matching encoding, or ENCODING_UNSPECIFIED for WAV/FLAC headers; raises otherwise."""
+
+    def __init__(self, latency_s: float) -> None:
+        self.latency_s = latency_s
+        self.calls = 0
+
+    async def recognize(self, config, audio):
+        self.calls += 1
+        await asyncio.sleep(self.latency_s)
+        actual = stt.sniff(audio.content)
+        requested = speech.RecognitionConfig.AudioEncoding(config.encoding).name
+        if requested == actual.encoding or (
+            requested == "ENCODING_UNSPECIFIED" and actual.container in ("wav", "flac")
+        ):
+            alternative = SimpleNamespace(transcript="hello")
+            return SimpleNamespace(results=[SimpleNamespace(alternatives=[alternative])])
+        raise ValueError(f"bad encoding {requested} for {actual.container}")
+
+
+async def fallback_chain(client, audio_bytes: bytes, lang: str) -> str:
+    """The recognize sequence _stt_bytes_to_text used before sniffing."""
+    audio = speech.RecognitionAudio(content=audio_bytes)
+    for encoding, rate in (("WEBM_OPUS", None), ("ENCODING_UNSPECIFIED", None), ("MP3", 44100)):
+        cfg = speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding[encoding],
+            sample_rate_hertz=rate,
+            language_code=lang,
+            enable_automatic_punctuation=True,
+            model="latest_short",
+        )
+        try:
+            return stt.transcript(await client.recognize(config=cfg, audio=audio))
+        except Exception:
+            continue
+    return ""
+
+
+async def amain(args) -> None:
+    print(f"== recognize calls and latency per upload ({args.latency * 1000:.0f} ms per call)")
+    for name, audio in FIXTURES.items():
+        result = []
+        for fn in (fallback_chain, stt.transcribe):
+            client = StrictRecognizer(args.latency)
+            started = time.perf_counter()
+            text = await fn(client, audio, "en-GB")
+            result.append((client.calls, (time.perf_counter() - started) * 1000, bool(text)))
+        (old_calls, old_ms, old_ok), (new_calls, new_ms, new_ok) = result
+        print(
+            f"  {name:<24} chain: {old_calls} calls {old_ms:6.0f} ms {'ok' if old_ok else '--'}   "
+            f"sniffed: {new_calls} call {new_ms:6.0f} ms {'ok' if new_ok else '--'}"
+        )
+    print(f"\n  outcomes: {stt.detection_stats.snapshot()['outcomes']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2)
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
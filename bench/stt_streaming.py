@@ -0,0 +1,117 @@
+# bench/stt_streaming.py
+"""
+Offline check of the /ws/stt protocol against the local streaming recognizer,
+plus the two numbers it exists for: transcript latency after the user stops
+talking (streaming vs upload-then-recognize) and bounded buffering when the
+recognizer is slower than the client.
+
+    python -m bench.stt_streaming
+    python -m bench.stt_streaming --frame-ms 20 --speech-s 3 --stt-latency 0.4
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+import time
+from typing import List
+
+os.environ.setdefault("STT_STREAMING_BACKEND", "local")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.backend import main  # noqa: E402
+from app.backend.voice import streaming  # noqa: E402
+
+from .stt_formats import FIXTURES  # noqa: E402
+
+FRAME_BYTES = 960
+VOICED = b"\x01" * FRAME_BYTES
+SILENT = bytes(FRAME_BYTES)
+
+
+def run_utterance(client: TestClient, voiced: int, silent: int, frame_s: float, end: bool = False) -> dict:
+    """Send frames (paced like a microphone when frame_s > 0) while reading replies on this thread."""
+    messages: List[dict] = []
+    marks = {}
+    started = time.perf_counter()
+    with client.websocket_connect("/ws/stt?lang=en-GB") as ws:
+
+        def send() -> None:
+            ws.send_bytes(FIXTURES["chrome.webm"] + VOICED)
+            for i in range(voiced + silent):
+                ws.send_bytes(VOICED if i < voiced else SILENT)
+                if i == voiced - 1:
+                    marks["last_voiced"] = time.perf_counter()
+                if frame_s:
+                    time.sleep(frame_s)
+            if end:
+                ws.send_text('{"type": "end"}')
+
+        sender = threading.Thread(target=send, daemon=True)
+        sender.start()
+        while True:
+            message = ws.receive_json()
+            messages.append(message)
+            if message["type"] == "interim":
+                marks.setdefault("first_interim", time.perf_counter())
+            if message["type"] == "end":
+                break
+        sender.join()
+    done = time.perf_counter()
+    return {
+        "types": [m["type"] for m in messages],
+        "text": messages[-1]["text"],
+        "after_speech_ms": (done - marks.get("last_voiced", done)) * 1000,
+        "first_interim_ms": (marks.get("first_interim", done) - started) * 1000,
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frame-ms", type=float, default=20)
+    parser.add_argument("--speech-s", type=float, default=2.0)
+    parser.add_argument("--stt-latency", type=float, default=0.4, help="batch recognize round trip (s)")
+    parser.add_argument("--slow-frame-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    recognizer = streaming.get_streaming_recognizer()
+    frame_s = args.frame_ms / 1000
+    voiced = int(args.speech_s / frame_s)
+
+    with TestClient(main.app) as client:
+        print("== protocol")
+        result = run_utterance(client, 40, recognizer.silence_frames + 5, 0)
+        kinds = result["types"]
+        assert "interim" in kinds and kinds[-3:] == ["endpoint", "final", "end"], kinds
+        print(f"  endpointed: {kinds.count('interim')} interim, then {kinds[-3:]}; text={result['text']!r}")
+        result = run_utterance(client, 12, 0, 0, end=True)
+        assert result["types"][-2:] == ["final", "end"], result["types"]
+        print(f"  client end: {result['types']}")
+
+        print(f"\n== latency, {args.speech_s:.1f}s of speech in {args.frame_ms:.0f} ms frames")
+        result = run_utterance(client, voiced, recognizer.silence_frames, frame_s)
+        # Upload-then-recognize needs the same silence to end the recording, then a full round trip.
+        batch_ms = recognizer.silence_frames * args.frame_ms + args.stt_latency * 1000
+        print(
+            f"  streaming  first interim {result['first_interim_ms']:6.0f} ms into speech, "
+            f"transcript {result['after_speech_ms']:5.0f} ms after speech"
+        )
+        print(f"  batch      no interim,                        transcript {batch_ms:5.0f} ms after speech (+ upload)")
+
+        print(f"\n== backpressure, recognizer at {args.slow_frame_ms:.0f} ms/frame, client unpaced")
+        recognizer.frame_latency_s = args.slow_frame_ms / 1000
+        before = streaming.stream_stats.snapshot()
+        started = time.perf_counter()
+        result = run_utterance(client, 400, 0, 0, end=True)
+        after = streaming.stream_stats.snapshot()
+        recognizer.frame_latency_s = 0.0
+        print(
+            f"  400 frames in {time.perf_counter() - started:.2f}s, queue capped at {streaming.QUEUE_FRAMES} frames, "
+            f"receiver paused {after['backpressure_waits'] - before['backpressure_waits']} times"
+        )
+        print(f"\n  stats: {streaming.stream_stats.snapshot()}")
+
+
+if __name__ == "__main__":
+    main_cli()
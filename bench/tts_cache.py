@@ -0,0 +1,75 @@
+# bench/tts_cache.py
+"""
+Hit rate and latency of the two-tier TTS cache against the local stand-in backend.
+
+    python -m bench.tts_cache
+    python -m bench.tts_cache --requests 2000 --latency 0.15
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.backend.voice import tts
+
+# Fixed prompts that dominate real traffic, in every voice.
+FIXED = [
+    "I didn’t catch that. Please try again.",
+    "Please try again so that I can help you.",
+    "Thank you for you cooperation. I have all the information I need. I will proceed with your request",
+    "I still need more information frorm you",
+]
+
+
+def _workload(n: int, fixed_share: float, seed: int = 0):
+    rng = random.Random(seed)
+    langs = list(tts.VOICE_MAP)
+    for i in range(n):
+        lang = rng.choice(langs)
+        if rng.random() < fixed_share:
+            yield rng.choice(FIXED), lang
+        else:
+            yield f"Your balance is {rng.randint(0, 99999) / 100:.2f} euro.", lang
+
+
+def run(label: str, synthesizer: tts.Synthesizer, backend: tts.LocalTTSBackend, args) -> None:
+    timings = []
+    for text, lang in _workload(args.requests, args.fixed_share):
+        started = time.perf_counter()
+        synthesizer.synthesize(text, lang)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(
+        f"  {label:<14} backend calls={backend.calls:<5} chars={backend.characters:<7} "
+        f"mean={statistics.mean(timings):8.3f} ms  p50={statistics.median(timings):8.3f} ms"
+    )
+    if synthesizer.cache is not None:
+        print(f"  {'':<14} {synthesizer.cache.snapshot()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--fixed-share", type=float, default=0.7)
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in backend delay per call (s)")
+    args = parser.parse_args()
+
+    print(f"== {args.requests} requests, {args.fixed_share:.0%} fixed prompts, backend latency {args.latency * 1000:.0f} ms")
+    backend = tts.LocalTTSBackend(latency_s=args.latency)
+    run("no cache", tts.Synthesizer(backend), backend, args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = tts.LocalTTSBackend(latency_s=args.latency)
+        cache = tts.TTSCache(Path(tmp))
+        run("cold cache", tts.Synthesizer(backend, cache), backend, args)
+
+        # A fresh process: empty memory tier, warm disk tier.
+        backend = tts.LocalTTSBackend(latency_s=args.latency)
+        run("disk tier only", tts.Synthesizer(backend, tts.TTSCache(Path(tmp))), backend, args)
+
+
+if __name__ == "__main__":
+    main()
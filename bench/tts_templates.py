@@ -0,0 +1,73 @@
+# bench/tts_templates.py
+"""
+TTS characters, backend calls and latency per handler reply: whole-sentence
+synthesis vs template stitching, both behind the TTS cache, against the local
+stand-in backend.
+
+    python -m bench.tts_templates
+    python -m bench.tts_templates --replies 1000 --latency 0.08 --per-char 0.001
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app.backend.voice import templates, tts
+
+
+def _replies(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    langs = list(tts.VOICE_MAP)
+    accounts = ["ING Lion Account", "ING Orange Savings", "ING Green Account"]
+    start = datetime(2025, 11, 3)
+    for _ in range(n):
+        lang = rng.choice(langs)
+        kind = rng.choice(["balance", "appointment_offer", "contact_update"])
+        if kind == "balance":
+            slots = {"account": rng.choice(accounts), "amount": rng.randint(0, 2_000_000) / 100}
+        elif kind == "appointment_offer":
+            slots = {"slot": start + timedelta(days=rng.randint(1, 3), hours=rng.choice([10, 14]))}
+        else:
+            slots = {"ticket_id": " ".join(f"{rng.getrandbits(32):08X}")}
+        yield lang, kind, slots
+
+
+async def run(label: str, stitched: bool, args) -> None:
+    backend = tts.LocalTTSBackend(latency_s=args.latency, per_char_latency_s=args.per_char)
+    synthesizer = tts.Synthesizer(backend, tts.TTSCache(None, memory_bytes=256 * 1024 * 1024))
+    if stitched:
+        await templates.warm_templates(synthesizer)
+        backend.calls = backend.characters = 0
+    timings = []
+    for lang, kind, slots in _replies(args.replies):
+        started = time.perf_counter()
+        if stitched:
+            await templates.render_audio(synthesizer, kind, lang, **slots)
+        else:
+            await synthesizer.asynthesize(templates.render_text(kind, lang, **slots), lang)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(
+        f"  {label:<10} backend calls={backend.calls:<5} tts chars/reply={backend.characters / args.replies:6.1f} "
+        f"mean={statistics.mean(timings):8.2f} ms  p50={statistics.median(timings):8.2f} ms  "
+        f"hit_rate={synthesizer.cache.snapshot()['hit_rate']:.2%}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replies", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.05, help="stand-in delay per call (s)")
+    parser.add_argument("--per-char", type=float, default=0.0005, help="stand-in delay per character (s)")
+    args = parser.parse_args()
+
+    print(f"== {args.replies} handler replies")
+    asyncio.run(run("sentence", False, args))
+    asyncio.run(run("stitched", True, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench/vectors.py
+"""
+Lookup latency of the memory-mapped dense index, flat and IVF, as the corpus grows.
+
+    python -m bench.vectors
+    python -m bench.vectors --sizes 10000 100000 --nlist 256
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.backend import rag
+from app.backend.config import default_chunks_directory
+
+from .retrieval import QUERIES, _report
+
+
+def _time_search(index: rag.VectorIndex, queries: np.ndarray, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        for q in queries:
+            started = time.perf_counter()
+            index.search(q, 5)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def bench_index(label: str, index: rag.VectorIndex, queries: np.ndarray, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        index.save(Path(tmp), "bench")
+        save_s = time.perf_counter() - started
+        started = time.perf_counter()
+        loaded = rag.VectorIndex.load(Path(tmp), "bench")
+        load_ms = (time.perf_counter() - started) * 1000
+        print(f"\n== {label}: {len(loaded)} rows, save {save_s:.2f}s, mmap load {load_ms:.2f} ms")
+        _report("single", _time_search(loaded, queries, repeat))
+        started = time.perf_counter()
+        loaded.search(queries, 5)
+        per_query = (time.perf_counter() - started) * 1000 / len(queries)
+        print(f"  batched    {len(queries)} queries, {per_query:.4f} ms/query")
+        del loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=Path, default=default_chunks_directory())
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000])
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    embedder = rag.HashingEmbedder()
+    queries = embedder.embed(QUERIES)
+    shipped = rag.VectorIndex.build(
+        ((doc_id, rag.read_chunk(path)) for doc_id, path in rag.iter_chunk_files(args.chunks)),
+        embedder,
+    )
+    bench_index("shipped corpus, flat", shipped, queries, args.repeat)
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        vectors = rng.standard_normal((size, embedder.dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        doc_ids = [f"synthetic/{i}.txt" for i in range(size)]
+        bench_index(f"synthetic {size}, flat", rag.VectorIndex.from_vectors(vectors, doc_ids, embedder), queries, args.repeat)
+        bench_index(
+            f"synthetic {size}, ivf nlist={args.nlist}",
+            rag.VectorIndex.from_vectors(vectors, doc_ids, embedder, nlist=args.nlist),
+            queries,
+            args.repeat,
+        )
+
+
+if __name__ == "__main__":
+    main()
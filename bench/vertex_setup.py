@@ -0,0 +1,81 @@
+# bench/vertex_setup.py
+"""
+Per-request Gemini setup: what _assistant_reply used to do on every /assist
+(import vertexai, vertexai.init, new GenerativeModel, new SafetySetting list,
+and the new prediction client the first generate call builds) vs the
+process-wide model in llm.VertexReplyBackend. Offline: anonymous credentials,
+no RPC is sent, so TLS and token refresh a new client adds are not included.
+
+    python -m bench.vertex_setup
+    python -m bench.vertex_setup --requests 500
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import warnings
+
+from app.backend import llm
+
+from .retrieval import _report
+
+
+def cold_import_ms() -> float:
+    code = "import time; t = time.perf_counter(); import vertexai.generative_models; print((time.perf_counter() - t) * 1000)"
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip())
+
+
+def per_request_setup() -> None:
+    """The setup block _assistant_reply ran before every generate_content call."""
+    from vertexai import init as vertex_init
+    from vertexai.generative_models import GenerativeModel, SafetySetting
+
+    vertex_init(project=os.getenv("GCP_PROJECT"), location=os.getenv("VERTEX_LOCATION", "europe-west1"))
+    model = GenerativeModel("gemini-1.5-flash")
+    [SafetySetting(category=SafetySetting.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+                   threshold=SafetySetting.HarmBlockThreshold.BLOCK_ONLY_HIGH)]
+    model._prediction_async_client
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    import google.auth
+    from google.auth.credentials import AnonymousCredentials
+
+    os.environ.setdefault("GCP_PROJECT", "bench")
+    google.auth.default = lambda *a, **k: (AnonymousCredentials(), "bench")
+
+    print(f"== cold `import vertexai.generative_models`: {cold_import_ms():.0f} ms (once per process either way)")
+
+    timings = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        per_request_setup()
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"\n== setup per /assist request, {args.requests} requests")
+    _report("per-call", timings)
+
+    backend = llm.VertexReplyBackend()
+    started = time.perf_counter()
+    backend.warm()
+    backend.model()._prediction_async_client
+    warm_ms = (time.perf_counter() - started) * 1000
+    timings = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        backend._setup()._prediction_async_client
+        timings.append((time.perf_counter() - started) * 1000)
+    _report("singleton", timings)
+    print(f"  singleton warm-up (once, in the lifespan): {warm_ms:.1f} ms; stats {backend.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# tests/__init__.py
+# Marks the tests directory as a Python package
@@ -0,0 +1,17 @@
+# tests/conftest.py
+"""
+Shared setup for the pytest suite: run from the repository root with
+
+    python -m pytest -q tests
+
+Module-level settings (cache directories, backends) are read from the
+environment at import time, so they are pointed at a scratch directory and
+the offline stand-ins before any ``app.backend`` module is imported.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="gdg-tests-"))
+os.environ.setdefault("TTS_BACKEND", "local")
@@ -0,0 +1,67 @@
+# tests/fixtures/audio/generate.py
+"""
+Writes the audio fixtures next to this file: a short two-tone phrase encoded
+in every upload format voice/stt.py sniffs, as browsers and phones produce
+them. Only needed to regenerate them; requires PyAV (bundled ffmpeg):
+
+    pip install av
+    python tests/fixtures/audio/generate.py
+"""
+from __future__ import annotations
+
+from fractions import Fraction
+from pathlib import Path
+
+import av
+import numpy as np
+
+HERE = Path(__file__).resolve().parent
+DURATION_S = 0.3
+
+# file name -> (container, codec, sample rate, channels, sample format, muxer options)
+FIXTURES = {
+    "chrome.webm": ("webm", "libopus", 48000, 1, "s16", {}),
+    "firefox.ogg": ("ogg", "libopus", 16000, 1, "s16", {}),
+    "pcm16_16k_mono.wav": ("wav", "pcm_s16le", 16000, 1, "s16", {}),
+    "mulaw_8k_mono.wav": ("wav", "pcm_mulaw", 8000, 1, "s16", {}),
+    "44k_stereo.flac": ("flac", "flac", 44100, 2, "s16", {}),
+    "id3_44k_stereo.mp3": ("mp3", "libmp3lame", 44100, 2, "s16p", {}),
+    "noid3_16k_mono.mp3": ("mp3", "libmp3lame", 16000, 1, "s16p", {"id3v2_version": "0", "write_xing": "0"}),
+    "phone.amr": ("amr", "libopencore_amrnb", 8000, 1, "s16", {}),
+}
+
+
+def phrase(rate: int, channels: int) -> np.ndarray:
+    t = np.arange(int(rate * DURATION_S)) / rate
+    envelope = np.sin(np.pi * t / DURATION_S)
+    tone = 0.4 * envelope * (np.sin(2 * np.pi * 220 * t) + 0.5 * np.sin(2 * np.pi * 660 * t))
+    return np.repeat((tone * 32767).astype(np.int16)[None, :], channels, axis=0)
+
+
+def write(name: str, container: str, codec: str, rate: int, channels: int, sample_format: str, options) -> None:
+    samples = phrase(rate, channels)
+    layout = "mono" if channels == 1 else "stereo"
+    with av.open(str(HERE / name), "w", format=container, options=options) as out:
+        stream = out.add_stream(codec, rate=rate, layout=layout)
+        if codec == "libopencore_amrnb":
+            stream.bit_rate = 12200
+        frame_size = stream.codec_context.frame_size or 1024
+        for start in range(0, samples.shape[1], frame_size):
+            chunk = samples[:, start:start + frame_size]
+            if chunk.shape[1] < frame_size and stream.codec_context.frame_size:
+                chunk = np.pad(chunk, ((0, 0), (0, frame_size - chunk.shape[1])))
+            data = chunk if sample_format.endswith("p") else chunk.T.reshape(1, -1)
+            frame = av.AudioFrame.from_ndarray(np.ascontiguousarray(data), format=sample_format, layout=layout)
+            frame.sample_rate = rate
+            frame.pts = start
+            frame.time_base = Fraction(1, rate)
+            for packet in stream.encode(frame):
+                out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+
+
+if __name__ == "__main__":
+    for name, spec in FIXTURES.items():
+        write(name, *spec)
+        print(f"{name}: {(HERE / name).stat().st_size} bytes")
@@ -0,0 +1,53 @@
+# tests/test_data.py
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.backend.data import CustomerRows, DataStore
+from bench.datastore import scan_active_accounts, scan_card_products, scan_transactions, synthetic_frames
+
+
+def test_customer_rows_offsets_bound_each_customer():
+    frame = pd.DataFrame({"customer_id": ["c3", "c1", None, "c3", "c2", "c1", "c3"], "row": range(7)})
+    frame, rows = CustomerRows.sort(frame)
+
+    assert list(rows.keys) == ["c1", "c2", "c3"]
+    assert list(rows.offsets) == [0, 2, 3, 6]
+    # Stable: each customer's rows keep their load order; the row without a customer sorts last.
+    assert list(frame["row"]) == [1, 5, 4, 0, 3, 6, 2]
+    assert list(rows.rows(frame, "c3")["row"]) == [0, 3, 6]
+    assert list(rows.rows(frame, "c2")["row"]) == [4]
+
+
+@pytest.mark.parametrize("customer_id", ["c0", "c2.5", "c9"])
+def test_customer_rows_unknown_customer_is_empty(customer_id):
+    frame, rows = CustomerRows.sort(pd.DataFrame({"customer_id": ["c1", "c2", "c3"]}))
+    assert rows.rows(frame, customer_id).empty
+
+
+def test_customer_rows_of_empty_frame():
+    frame, rows = CustomerRows.sort(pd.DataFrame({"customer_id": pd.Series([], dtype=object)}))
+    assert list(rows.offsets) == [0]
+    assert rows.rows(frame, "c1").empty
+
+
+@pytest.fixture(scope="module")
+def store():
+    return DataStore(*synthetic_frames(customers=500, transactions=20_000, products_per_customer=3), {})
+
+
+@pytest.mark.parametrize(
+    "scan, indexed",
+    [
+        (scan_active_accounts, DataStore.list_active_accounts),
+        (scan_card_products, DataStore.list_card_products),
+        (scan_transactions, lambda store, c: store.filter_transactions(c, None, 20, None, None, 10.0)),
+    ],
+    ids=["list_active_accounts", "list_card_products", "filter_transactions"],
+)
+def test_indexed_lookups_match_full_scans(store, scan, indexed):
+    for customer_id in np.random.default_rng(1).integers(0, 500, 50).tolist():
+        expected, actual = scan(store, customer_id), indexed(store, customer_id)
+        assert list(actual.index) == list(expected.index), customer_id
@@ -0,0 +1,65 @@
+# tests/test_dialog_utils.py
+from __future__ import annotations
+
+import json
+
+from app.backend.dialog.utils import IncrementalJSONObject
+
+REPLY = {
+    "intent": "Block or unblock or card",
+    "summary": "Customer says \"lost\" {card}, wants it blocked, now",
+    "auth_required": True,
+    "questions": None,
+    "slots": {"action": "block", "n": [1, 2]},
+    "confidence": 0.92,
+}
+
+
+def _feed_in_pieces(text: str, size: int):
+    parser = IncrementalJSONObject()
+    closed = []
+    for start in range(0, len(text), size):
+        for key, value in parser.feed(text[start:start + size]).items():
+            closed.append((start, key, value))
+    return parser, closed
+
+
+def test_members_match_json_loads_for_any_piece_size():
+    text = json.dumps(REPLY, indent=1)
+    for size in (1, 3, 7, len(text)):
+        parser, closed = _feed_in_pieces(text, size)
+        assert parser.done
+        assert parser.value() == REPLY
+        assert [key for _, key, _ in closed] == list(REPLY)
+
+
+def test_string_member_closes_at_its_quote():
+    parser = IncrementalJSONObject()
+    assert parser.feed('{"intent": "Block or unblock or card", "summ') == {"intent": "Block or unblock or card"}
+    assert parser.feed('ary": "lost car') == {}
+    assert parser.members == {"intent": "Block or unblock or card"}
+    assert not parser.done
+
+
+def test_scalar_member_closes_at_the_delimiter():
+    parser = IncrementalJSONObject()
+    assert parser.feed('{"auth_required": true') == {}
+    assert parser.feed(', "n": 10') == {"auth_required": True}
+    assert parser.feed("}") == {"n": 10}
+    assert parser.done
+
+
+def test_text_after_the_object_is_ignored():
+    parser = IncrementalJSONObject()
+    parser.feed('{"intent": "Something else"}\n```\n{"intent": "other"}')
+    assert parser.value() == {"intent": "Something else"}
+
+
+def test_value_falls_back_to_a_lenient_parse():
+    parser = IncrementalJSONObject()
+    parser.feed("{'intent': 'Something else', 'auth_required': False}")
+    assert parser.value() == {"intent": "Something else", "auth_required": False}
+
+    parser = IncrementalJSONObject()
+    parser.feed("not json at all")
+    assert parser.value() == {}
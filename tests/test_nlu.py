@@ -0,0 +1,72 @@
+# tests/test_nlu.py
+from __future__ import annotations
+
+import pytest
+
+from app.backend import intents
+from app.backend.dialog.session import SessionStore
+from bench.nlu_turn import SCENARIOS, LocalModels, local_chatbot
+
+
+@pytest.fixture
+def models():
+    return LocalModels(grounding_s=0.0, intent_s=0.0, chunk_s=0.0)
+
+
+@pytest.fixture
+def bot(models):
+    bot = local_chatbot(models)
+    bot.sessions = SessionStore()
+    return bot
+
+
+def _predict(monkeypatch, key):
+    calls = []
+
+    def classify_local(query, threshold=None):
+        calls.append(query)
+        return intents.IntentPrediction(key, 0.99, "en") if key else None
+
+    monkeypatch.setattr(intents, "classify_local", classify_local)
+    return calls
+
+
+def test_local_prediction_without_grounding_skips_the_grounded_search(monkeypatch, bot, models):
+    calls = _predict(monkeypatch, "other")
+    reply, docs, intent_js = bot.start_convo("Can you tell me a joke?", session_id="s")
+
+    assert intent_js["intent"] == "Something else"
+    assert models.calls == {"grounding": 0, "intent": 0, "other": 0}
+    assert calls == ["Can you tell me a joke?"]
+
+
+@pytest.mark.parametrize("key", ["product_info", "balance"])
+def test_local_prediction_that_replies_with_grounding_starts_it(monkeypatch, bot, models, key):
+    calls = _predict(monkeypatch, key)
+    reply, docs, intent_js = bot.start_convo("What interest do you pay?", session_id="s")
+
+    assert intent_js["intent"] == intents.INTENTS[key]
+    assert "Grounded answer" in reply
+    assert models.calls["grounding"] == 1 and models.calls["intent"] == 0
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("query", list(SCENARIOS))
+def test_without_local_prediction_gemini_classifies_and_grounding_runs_alongside(monkeypatch, bot, models, query):
+    _predict(monkeypatch, None)
+    bot.start_convo(query, session_id="s")
+
+    assert bot.sessions.get("s").intent == SCENARIOS[query]["intent"]
+    assert models.calls["intent"] == 1
+    assert models.calls["grounding"] <= 1
+
+
+def test_turn_timings_are_kept_per_session(monkeypatch, bot, models):
+    _predict(monkeypatch, None)
+    bot.start_convo("Can you tell me a joke?", session_id="a")
+    bot.start_convo("What interest do you pay on a savings account?", session_id="b")
+
+    a, b = bot.sessions.get("a").timings, bot.sessions.get("b").timings
+    assert a["grounding_cancelled"] and not b["grounding_cancelled"]
+    assert a["route_ms"] <= a["turn_ms"] and b["route_ms"] <= b["turn_ms"]
+    assert not hasattr(bot, "last_turn")
@@ -0,0 +1,96 @@
+# tests/test_policy.py
+from __future__ import annotations
+
+import pytest
+
+from app.backend import intents
+from app.backend.dialog.policy import SPECS, extract, policy
+from app.backend.dialog.session import SessionStore
+from bench.nlu_turn import LocalModels, local_chatbot
+from bench.policy import DIALOGUES
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("My name is Jan Peeters and I was born on 12/03/1985",
+         {"name": "Jan Peeters", "birthdate": "1985-03-12"}),
+        ("Marie Dubois, 3 mars 1990", {"name": "Marie Dubois", "birthdate": "1990-03-03"}),
+        ("geboren op 5 januari 1979", {"birthdate": "1979-01-05"}),
+        ("Jan Peeters, 1985-03-12", {"name": "Jan Peeters", "birthdate": "1985-03-12"}),
+        ("mijn nieuwe e-mail is pieter.desmet@example.be", {"email": "pieter.desmet@example.be"}),
+        ("my new number is +32 470 12 34 56", {"phone": "+32470123456"}),
+        ("my new address is Kerkstraat 12, 9000 Gent", {"address": "Kerkstraat 12, 9000 Gent"}),
+        ("je veux la débloquer", {"action": "unblock"}),
+        ("I lost my card", {"action": "block"}),
+        ("What's the balance of my savings account?", {"account_type": "savings"}),
+        ("Montrez-moi mes 10 dernières transactions", {"n": 10}),
+    ],
+)
+def test_extract(text, expected):
+    values = extract(text)
+    assert {name: values.get(name) for name in expected} == expected
+
+
+def test_extract_ignores_invalid_dates_and_numberless_addresses():
+    values = extract("born 31/02/1985, my address has changed")
+    assert "birthdate" not in values
+    assert "address" not in values
+
+
+def test_update_keeps_only_the_intent_slots_and_local_values_win():
+    slots = {}
+    policy.update("Block or unblock or card", slots, "Please block my card, my email is jan@example.be",
+                  extracted={"action": "unblock", "name": "Jan Peeters"})
+    assert slots == {"action": "block", "name": "Jan Peeters"}
+
+
+def test_decide_asks_for_identity_then_the_intent_fields():
+    intent = "Update customer information"
+    slots = {}
+    decision = policy.step(intent, slots, "I want to change my details")
+    assert not decision.complete
+    assert decision.question == policy.question(["name", "birthdate"], "en")
+
+    decision = policy.step(intent, slots, "Jan Peeters, 12/03/1985")
+    assert not decision.complete
+    assert decision.missing == ["contact"]
+
+    decision = policy.step(intent, slots, "my new email is jan@example.be")
+    assert decision.complete
+    assert decision.api == SPECS[intent].api
+    assert decision.payload == {"email": "jan@example.be"}
+    assert decision.identity.name == "Jan Peeters"
+
+
+@pytest.mark.parametrize("intent, opening, turns, expected", DIALOGUES, ids=[f"dialogue-{n}" for n in range(len(DIALOGUES))])
+def test_scripted_dialogues_complete(monkeypatch, intent, opening, turns, expected):
+    monkeypatch.setattr(intents, "THRESHOLD", 2.0)
+    bot = local_chatbot(LocalModels(grounding_s=0.0, intent_s=0.0, chunk_s=0.0))
+    bot.sessions = SessionStore()
+    with bot.sessions.open("dialogue") as session:
+        session.intent = intent
+        policy.update(intent, session.slots, opening)
+    for text in turns:
+        bot.continue_convo_auth(text, intent, session_id="dialogue")
+
+    session = bot.sessions.get("dialogue")
+    assert session.end_convo
+    assert {name: session.slots.get(name) for name in expected} == expected
+
+
+@pytest.mark.parametrize("intent", list(SPECS))
+def test_payload_prompt_lists_the_request_model_slots(intent):
+    prompt = policy.payload_prompt(SPECS[intent])
+    for name in SPECS[intent].slots:
+        assert f'"{name}":' in prompt
+    assert "customer_id" not in prompt
+
+
+def test_payload_prompt_of_contact_update():
+    prompt = policy.payload_prompt(SPECS["Update customer information"])
+    assert '"email": STRING' in prompt and '"birthdate": DATE (YYYY-MM-DD)' in prompt
+    assert "action" not in prompt and "(optional)" not in prompt
+    assert prompt.endswith("At least one of email, phone, address is required.")
+    assert '"action": ENUM["block", "unblock"]' in policy.payload_prompt(SPECS["Block or unblock or card"])
+    assert '"n": INTEGER (optional)' in policy.payload_prompt(SPECS["Query for details about their transactions"])
@@ -0,0 +1,161 @@
+# tests/test_rag_manifest.py
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.backend import rag
+
+WORDS = (
+    "account card savings interest rate branch transfer debit credit balance fee online "
+    "rekening kaart sparen rente kantoor overschrijving compte carte épargne taux agence virement"
+).split()
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def _corpus(root: Path, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    for lang in ("en", "fr", "nl"):
+        for i in range(30):
+            _write(root / lang / f"page{i // 10}" / f"{i}.txt", " ".join(rng.choices(WORDS, k=rng.randint(20, 80))))
+    # Exact copies of a passage, as the scraper produces for shared footers.
+    _write(root / "en" / "copy" / "a.txt", (root / "en" / "page0" / "3.txt").read_text(encoding="utf-8"))
+    _write(root / "en" / "copy" / "b.txt", (root / "en" / "page0" / "3.txt").read_text(encoding="utf-8"))
+
+
+def _build(corpus: Path, out: Path) -> None:
+    rag.build_indexes(corpus, out / "bm25", out / "manifest.json")
+    embedder = rag.HashingEmbedder()
+    for folder in sorted(p for p in corpus.iterdir() if p.is_dir()):
+        passages = rag.BM25Index.load(out / "bm25" / f"{folder.name}.json")
+        rag.VectorIndex.build(rag.passage_texts(passages, corpus), embedder).save(out / "faiss", folder.name)
+
+
+def _passages(index: rag.BM25Index):
+    """Passages by content, with the chunk files carrying each, independent of insertion order."""
+    return {doc.content_hash: (doc.text, doc.length, sorted(doc.sources)) for doc in index.docs}
+
+
+def _postings(index: rag.BM25Index):
+    return {
+        term: sorted((index.docs[plist[i]].content_hash, plist[i + 1]) for i in range(0, len(plist), 2))
+        for term, plist in index.postings.items()
+    }
+
+
+def _vectors(index: rag.VectorIndex):
+    return {doc_id: np.asarray(index.vectors[row]) for row, doc_id in enumerate(index.doc_ids)}
+
+
+def _edit(corpus: Path) -> None:
+    rng = random.Random(1)
+    _write(corpus / "en" / "page1" / "12.txt", "the card was updated with a new fee " * 3)
+    _write(corpus / "fr" / "page2" / "new.txt", " ".join(rng.choices(WORDS, k=40)))
+    (corpus / "nl" / "page0" / "4.txt").unlink()
+    # Removing the representative of the copied passage leaves the other copies indexed.
+    (corpus / "en" / "page0" / "3.txt").unlink()
+    # Same content rewritten: the mtime changes, the hash does not.
+    path = corpus / "fr" / "page0" / "1.txt"
+    path.write_text(path.read_text(encoding="utf-8"), encoding="utf-8")
+
+
+@pytest.fixture
+def updated_and_fresh(tmp_path):
+    corpus = tmp_path / "chunks"
+    _corpus(corpus)
+    _build(corpus, tmp_path / "updated")
+    _edit(corpus)
+    diff = rag.update_indexes(
+        corpus, tmp_path / "updated" / "bm25", tmp_path / "updated" / "faiss", tmp_path / "updated" / "manifest.json"
+    )
+    _build(corpus, tmp_path / "fresh")
+    return diff, tmp_path / "updated", tmp_path / "fresh"
+
+
+def test_diff_lists_added_changed_and_deleted_chunks(updated_and_fresh):
+    diff, _, _ = updated_and_fresh
+    assert diff.added == ["fr/page2/new.txt"]
+    assert diff.changed == ["en/page1/12.txt"]
+    assert diff.deleted == ["en/page0/3.txt", "nl/page0/4.txt"]
+    assert diff.partitions() == ["en", "fr", "nl"]
+
+
+@pytest.mark.parametrize("partition", ["en", "fr", "nl"])
+def test_update_matches_fresh_build(updated_and_fresh, partition):
+    _, updated, fresh = updated_and_fresh
+    patched = rag.BM25Index.load(updated / "bm25" / f"{partition}.json")
+    rebuilt = rag.BM25Index.load(fresh / "bm25" / f"{partition}.json")
+    assert _passages(patched) == _passages(rebuilt)
+    assert _postings(patched) == _postings(rebuilt)
+    for query in ("savings interest rate", "carte virement agence", "kaart rente"):
+        assert [round(hit.score, 9) for hit in patched.search(query, 5)] == [
+            round(hit.score, 9) for hit in rebuilt.search(query, 5)
+        ]
+
+    patched_vectors = _vectors(rag.VectorIndex.load(updated / "faiss", partition))
+    rebuilt_vectors = _vectors(rag.VectorIndex.load(fresh / "faiss", partition))
+    assert sorted(patched_vectors) == sorted(rebuilt_vectors)
+    for doc_id, vector in rebuilt_vectors.items():
+        np.testing.assert_allclose(patched_vectors[doc_id], vector, atol=1e-6)
+
+
+def test_update_without_changes_is_a_no_op(updated_and_fresh):
+    _, updated, _ = updated_and_fresh
+    corpus = updated.parent / "chunks"
+    assert not rag.update_indexes(corpus, updated / "bm25", updated / "faiss", updated / "manifest.json")
+
+
+def test_manifest_round_trips(tmp_path):
+    _corpus(tmp_path / "chunks")
+    diff = rag.Manifest().diff(tmp_path / "chunks")
+    diff.manifest.save(tmp_path / "manifest.json")
+    loaded = rag.Manifest.load(tmp_path / "manifest.json")
+    assert loaded.entries == diff.manifest.entries
+    assert rag.Manifest.load(tmp_path / "missing.json") is None
+
+
+@pytest.fixture
+def served_index(tmp_path, monkeypatch):
+    """rag.get_index serving a corpus under tmp_path, with a fresh query cache."""
+    corpus = tmp_path / "chunks"
+    _corpus(corpus)
+    rag.build_indexes(corpus, tmp_path / "bm25", tmp_path / "manifest.json")
+    monkeypatch.setattr(rag, "default_chunks_directory", lambda: corpus)
+    monkeypatch.setattr(rag, "INDEX_DIR", tmp_path / "bm25")
+    monkeypatch.setattr(rag, "MANIFEST_PATH", tmp_path / "manifest.json")
+    monkeypatch.setattr(rag, "query_cache", rag.QueryCache())
+    monkeypatch.setattr(rag, "_index", None)
+    return corpus
+
+
+def test_update_reloads_index_and_drops_cached_results(served_index, tmp_path, monkeypatch):
+    query = "zebra crossing opening hours"
+    before = rag.retrieve_context(query, lang="en")
+    assert rag.retrieve_context(query, lang="en") == before
+    assert rag.query_cache.hits == 1
+
+    _write(served_index / "en" / "page1" / "12.txt", "zebra crossing opening hours are nine to five")
+    rag.update_indexes(served_index, tmp_path / "bm25", tmp_path / "faiss", tmp_path / "manifest.json")
+    # Within the check interval the loaded index (and its cached results) are still served.
+    assert rag.retrieve_context(query, lang="en") == before
+
+    monkeypatch.setattr(rag, "INDEX_CHECK_S", 0.0)
+    after = rag.retrieve_context(query, lang="en")
+    assert "zebra crossing opening hours are nine to five" in after
+    assert rag.query_cache.invalidations == 1
+    assert rag.query_cache.snapshot()["size"] == 1
+
+
+def test_unchanged_manifest_keeps_the_loaded_index(served_index, monkeypatch):
+    monkeypatch.setattr(rag, "INDEX_CHECK_S", 0.0)
+    index = rag.get_index()
+    assert rag.get_index() is index
+    rag.reload_index()
+    assert rag.get_index() is not index
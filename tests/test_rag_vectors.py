@@ -0,0 +1,61 @@
+# tests/test_rag_vectors.py
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.backend import rag
+
+
+def _index(n: int, nlist: int = 0) -> rag.VectorIndex:
+    docs = [(f"en/{i}.txt", f"card account balance {i} transfer {i % 7} fee {i % 3}") for i in range(n)]
+    return rag.VectorIndex.build(docs, rag.HashingEmbedder(), nlist=nlist)
+
+
+def _files(directory):
+    return sorted(p.name for p in directory.iterdir() if p.name.endswith((".index", ".ivf.npy")))
+
+
+def test_save_replaces_the_previous_version(tmp_path):
+    _index(5, nlist=1).save(tmp_path, "en")
+    before = rag.VectorIndex.load(tmp_path, "en")
+    first = np.asarray(before.vectors).copy()
+
+    _index(12).save(tmp_path, "en")
+    after = rag.VectorIndex.load(tmp_path, "en")
+
+    assert len(after) == 12 and after.centroids is None
+    assert [name.split(".")[0] for name in _files(tmp_path)] == ["en"]
+    # A reader holding the previous version keeps reading it after the swap.
+    assert np.array_equal(np.asarray(before.vectors), first)
+
+
+def test_load_retries_when_a_save_removes_the_version_it_read(tmp_path, monkeypatch):
+    _index(5).save(tmp_path, "en")
+    real_load = np.load
+    saves = []
+
+    def load_after_a_save(path, *args, **kwargs):
+        # Between reading the sidecar and opening the matrix, another process saves a new version.
+        if not saves:
+            saves.append(path)
+            _index(9).save(tmp_path, "en")
+        return real_load(path, *args, **kwargs)
+
+    monkeypatch.setattr(rag.np, "load", load_after_a_save)
+    index = rag.VectorIndex.load(tmp_path, "en")
+
+    assert len(saves) == 1 and not saves[0].exists()
+    assert len(index) == 9 and np.asarray(index.vectors).shape[0] == 9
+
+
+def test_load_gives_up_when_the_named_version_stays_missing(tmp_path):
+    _index(5).save(tmp_path, "en")
+    for name in _files(tmp_path):
+        (tmp_path / name).unlink()
+    with pytest.raises(FileNotFoundError):
+        rag.VectorIndex.load(tmp_path, "en")
+
+
+def test_unbuilt_partition_loads_as_none(tmp_path):
+    assert rag.VectorIndex.load(tmp_path, "en") is None
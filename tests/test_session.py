@@ -0,0 +1,147 @@
+# tests/test_session.py
+from __future__ import annotations
+
+import threading
+import time
+
+from app.backend.dialog.session import JsonFilePersistence, Session, SessionStore, Turn
+
+
+def _session(n_turns: int, chars: int = 400) -> Session:
+    session = Session("s")
+    for i in range(n_turns):
+        session.add("user" if i % 2 == 0 else "model", f"turn {i} " + "x" * chars)
+    return session
+
+
+def test_trim_keeps_opening_and_newest_turns_and_summarises_the_rest():
+    session = _session(20, chars=40)
+    opening = session.turns[0]
+    dropped = session.trim(budget=200)
+
+    assert dropped > 0
+    assert session.tokens() <= 200
+    assert session.turns[0] is opening
+    assert session.turns[-1].text.startswith("turn 19 ")
+    assert len(session.turns) == 20 - dropped
+    # Only what the customer said in the dropped turns is summarised.
+    assert "turn 2 " in session.summary and "turn 1 " not in session.summary
+
+
+def test_trim_is_a_no_op_under_budget_or_with_two_turns():
+    session = _session(4, chars=10)
+    assert session.trim(budget=1000) == 0
+    assert len(session.turns) == 4
+
+    session = _session(2, chars=10_000)
+    assert session.trim(budget=10) == 0
+    assert len(session.turns) == 2
+
+
+def test_trim_keeps_the_newest_turn_even_when_it_alone_is_over_budget():
+    session = _session(3)
+    session.add("user", "y" * 20_000)
+    session.trim(budget=500)
+    assert [turn.text[:1] for turn in session.turns] == ["t", "y"]
+
+
+def test_trim_uses_the_given_summarizer():
+    session = _session(20)
+    session.trim(budget=1000, summarize=lambda previous, dropped: f"{len(dropped)} turns")
+    assert session.summary.endswith(" turns")
+
+
+def test_session_round_trips_through_dict():
+    session = _session(3)
+    session.slots = {"name": "Jan Peeters"}
+    restored = Session.from_dict(session.to_dict())
+    assert restored == session
+    assert isinstance(restored.turns[0], Turn)
+
+
+def test_store_expires_idle_sessions_and_evicts_lru():
+    store = SessionStore(ttl_s=60, max_sessions=2)
+    first = store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+    assert sorted(store._sessions) == ["a", "c"]
+    assert store.get("a") is first
+
+    first.last_seen = time.time() - 120
+    assert store.evict_expired() == 1
+    assert store.counts["evicted"] == 1 and store.counts["expired"] == 1
+
+
+def test_open_trims_and_persists_and_reloads_after_eviction(tmp_path):
+    store = SessionStore(max_sessions=1, persistence=JsonFilePersistence(tmp_path), history_tokens=1000)
+    with store.open("a") as session:
+        for turn in _session(20).turns:
+            session.turns.append(turn)
+    assert store.counts["trimmed_turns"] > 0
+
+    store.get("b")
+    assert "a" not in store._sessions
+    reloaded = store.get("a")
+    assert reloaded.tokens() <= 1000
+    assert store.counts["loaded"] == 1
+
+
+def test_open_serialises_turns_of_one_session():
+    store = SessionStore()
+    active, overlaps = [], []
+
+    def turn():
+        with store.open("same") as session:
+            active.append(1)
+            overlaps.append(len(active))
+            time.sleep(0.001)
+            session.add("user", "hi")
+            active.pop()
+
+    threads = [threading.Thread(target=turn) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(overlaps) == 1
+    assert len(store.get("same").turns) == 20
+
+
+def test_expired_sessions_are_deleted_from_persistence(tmp_path):
+    persistence = JsonFilePersistence(tmp_path)
+    store = SessionStore(ttl_s=60, persistence=persistence, sweep_every=0)
+    for sid in ("a", "b"):
+        with store.open(sid) as session:
+            session.add("user", "hi")
+    store.get("a").last_seen = time.time() - 120
+    store.get("b").last_seen = time.time() - 120
+
+    fresh = store.get("a")
+    assert fresh.turns == []
+    assert persistence.load("a") is None
+    assert store.evict_expired() == 1
+    assert persistence.load("b") is None
+    assert store.counts["expired"] == 2
+
+
+def test_expired_persisted_session_is_not_reloaded(tmp_path):
+    persistence = JsonFilePersistence(tmp_path)
+    old = Session("a", last_seen=time.time() - 120)
+    old.add("user", "hi")
+    persistence.save("a", old.to_dict())
+
+    store = SessionStore(ttl_s=60, persistence=persistence)
+    assert store.get("a").turns == []
+    assert store.counts["expired"] == 1 and store.counts["loaded"] == 0
+
+
+def test_store_sweeps_idle_sessions_every_n_gets():
+    store = SessionStore(ttl_s=60, sweep_every=5)
+    for sid in ("a", "b", "c"):
+        store.get(sid).last_seen = time.time() - 120
+    store.get("d")
+    assert len(store) == 4
+    store.get("d")
+    assert sorted(store._sessions) == ["d"]
+    assert store.snapshot()["expired"] == 3
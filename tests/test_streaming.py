@@ -0,0 +1,77 @@
+# tests/test_streaming.py
+from __future__ import annotations
+
+import asyncio
+import time
+
+from app.backend.voice import streaming
+
+
+class FakeSocket:
+    """Replays ``messages`` through ``receive``, then blocks like an idle client."""
+
+    def __init__(self, messages) -> None:
+        self.messages = list(messages)
+
+    async def receive(self):
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.Event().wait()
+
+
+def _frame(i: int):
+    return {"type": "websocket.receive", "bytes": bytes([i + 1]) * 4}
+
+
+async def _drain(queue) -> list:
+    frames = []
+    async for chunk in streaming._frames(b"first", queue):
+        frames.append(chunk)
+    return frames
+
+
+def test_end_on_a_full_queue_keeps_every_frame():
+    async def scenario():
+        queue = asyncio.Queue(maxsize=2)
+        ws = FakeSocket([_frame(i) for i in range(4)] + [{"type": "websocket.receive", "text": '{"type": "end"}'}])
+        receiver = asyncio.create_task(streaming._receive_frames(ws, queue, time.monotonic() + 10))
+        await asyncio.sleep(0.01)
+        assert queue.full() and not receiver.done()
+        frames = await _drain(queue)
+        await receiver
+        return frames
+
+    frames = asyncio.run(scenario())
+    assert frames == [b"first"] + [bytes([i + 1]) * 4 for i in range(4)]
+
+
+def test_endpoint_cancel_on_a_full_queue_keeps_the_queued_frames():
+    async def scenario():
+        queue = asyncio.Queue(maxsize=2)
+        receiver = asyncio.create_task(streaming._receive_frames(FakeSocket([_frame(i) for i in range(3)]), queue, time.monotonic() + 10))
+        await asyncio.sleep(0.01)
+        assert queue.full()
+        # What run_session does on an endpoint event.
+        receiver.cancel()
+        frames = await asyncio.wait_for(_drain(queue), timeout=1)
+        await asyncio.gather(receiver, return_exceptions=True)
+        return frames
+
+    frames = asyncio.run(scenario())
+    assert frames == [b"first", bytes([1]) * 4, bytes([2]) * 4]
+
+
+def test_recognizer_that_stops_reading_does_not_leave_the_receiver_waiting():
+    async def scenario():
+        queue = asyncio.Queue(maxsize=1)
+        receiver = asyncio.create_task(streaming._receive_frames(FakeSocket([_frame(0), _frame(1)]), queue, time.monotonic() + 10))
+        await asyncio.sleep(0.01)
+        receiver.cancel()
+        await asyncio.sleep(0.01)
+        assert not receiver.done()
+        # run_session's finally, after the recognizer returned without draining the queue.
+        receiver.cancel()
+        await asyncio.gather(receiver, return_exceptions=True)
+        return receiver
+
+    assert asyncio.run(scenario()).done()
@@ -0,0 +1,110 @@
+# tests/test_stt.py
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from google.cloud import speech
+
+from app.backend.voice import stt
+
+FIXTURES = Path(__file__).parent / "fixtures" / "audio"
+
+# Encoded by tests/fixtures/audio/generate.py.
+EXPECTED = {
+    "chrome.webm": stt.AudioFormat("webm", "WEBM_OPUS", 48000, 1),
+    "firefox.ogg": stt.AudioFormat("ogg", "OGG_OPUS", 16000, 1),
+    "pcm16_16k_mono.wav": stt.AudioFormat("wav", "LINEAR16", 16000, 1),
+    "mulaw_8k_mono.wav": stt.AudioFormat("wav", "MULAW", 8000, 1),
+    "44k_stereo.flac": stt.AudioFormat("flac", "FLAC", 44100, 2),
+    "id3_44k_stereo.mp3": stt.AudioFormat("mp3", "MP3", 44100, 2),
+    "noid3_16k_mono.mp3": stt.AudioFormat("mp3", "MP3", 16000, 1),
+    "phone.amr": stt.AudioFormat("amr", "AMR", 8000, 1),
+}
+
+
+class FakeRecognizer:
+    """``SpeechAsyncClient.recognize`` stand-in that records each request."""
+
+    def __init__(self, transcript: str = "hello", error: Exception = None) -> None:
+        self.transcript = transcript
+        self.error = error
+        self.requests = []
+
+    async def recognize(self, config, audio):
+        self.requests.append((config, audio))
+        if self.error is not None:
+            raise self.error
+        alternatives = [SimpleNamespace(transcript=self.transcript)] if self.transcript else []
+        return SimpleNamespace(results=[SimpleNamespace(alternatives=alternatives)])
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    fresh = stt.DetectionStats()
+    monkeypatch.setattr(stt, "detection_stats", fresh)
+    return fresh
+
+
+def test_every_fixture_is_covered():
+    assert sorted(p.name for p in FIXTURES.iterdir() if p.is_file() and p.suffix != ".py") == sorted(EXPECTED)
+
+
+@pytest.mark.parametrize("name", list(EXPECTED))
+def test_sniff_fixture(name):
+    audio = (FIXTURES / name).read_bytes()
+    assert stt.sniff(audio) == EXPECTED[name]
+
+
+def test_id3_fixture_has_a_tag_and_the_other_starts_with_a_frame():
+    assert (FIXTURES / "id3_44k_stereo.mp3").read_bytes()[:3] == b"ID3"
+    assert (FIXTURES / "noid3_16k_mono.mp3").read_bytes()[:2] == b"\xff\xf3"
+
+
+@pytest.mark.parametrize(
+    "audio, expected",
+    [
+        (b"#!AMR-WB\n" + bytes(64), stt.AudioFormat("amr", "AMR_WB", 16000, 1)),
+        (b"\x1a\x45\xdf\xa3" + b"\x42\x82\x84webm" + b"\x86\x88A_VORBIS" + bytes(64), stt.AudioFormat("webm", "ENCODING_UNSPECIFIED")),
+        (bytes(1024), stt.UNKNOWN),
+        (b"", stt.UNKNOWN),
+    ],
+    ids=["amr-wb", "webm-vorbis", "zeros", "empty"],
+)
+def test_sniff_other_inputs(audio, expected):
+    assert stt.sniff(audio) == expected
+
+
+@pytest.mark.parametrize("name", list(EXPECTED))
+def test_transcribe_makes_one_recognize_call_with_the_sniffed_config(name, stats):
+    audio = (FIXTURES / name).read_bytes()
+    expected = EXPECTED[name]
+    client = FakeRecognizer()
+
+    assert asyncio.run(stt.transcribe(client, audio, "nl-BE")) == "hello"
+    assert len(client.requests) == 1
+    config, sent = client.requests[0]
+    assert speech.RecognitionConfig.AudioEncoding(config.encoding).name == expected.encoding
+    assert config.sample_rate_hertz == expected.sample_rate_hertz
+    assert config.audio_channel_count == (expected.channels if expected.channels > 1 else 0)
+    assert config.language_code == "nl-BE"
+    assert sent.content == audio
+    assert stats.snapshot() == {"formats": {f"{expected.container}/{expected.encoding}": 1}, "outcomes": {"ok": 1}}
+
+
+def test_detection_counters_accumulate_across_outcomes(stats):
+    wav = (FIXTURES / "pcm16_16k_mono.wav").read_bytes()
+    webm = (FIXTURES / "chrome.webm").read_bytes()
+    failing = FakeRecognizer(error=RuntimeError("quota"))
+
+    asyncio.run(stt.transcribe(FakeRecognizer(), wav, "en-GB"))
+    assert asyncio.run(stt.transcribe(FakeRecognizer(transcript=""), wav, "en-GB")) == ""
+    assert asyncio.run(stt.transcribe(failing, webm, "en-GB")) == ""
+
+    assert len(failing.requests) == 1
+    assert stats.snapshot() == {
+        "formats": {"wav/LINEAR16": 2, "webm/WEBM_OPUS": 1},
+        "outcomes": {"ok": 1, "empty": 1, "error": 1},
+    }
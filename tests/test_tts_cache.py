@@ -0,0 +1,69 @@
+# tests/test_tts_cache.py
+from __future__ import annotations
+
+import os
+
+from app.backend.voice import tts
+
+
+def _audio(n: int, fill: int = 1) -> bytes:
+    return bytes([fill]) * n
+
+
+def test_memory_tier_evicts_least_recently_used_by_bytes():
+    cache = tts.TTSCache(None, memory_bytes=300)
+    cache.put("a", _audio(100))
+    cache.put("b", _audio(100))
+    cache.get("a")
+    cache.put("c", _audio(150))
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.snapshot()["memory_bytes"] <= 300
+
+
+def test_memory_tier_skips_audio_larger_than_budget(tmp_path):
+    cache = tts.TTSCache(tmp_path, memory_bytes=50)
+    cache.put("big", _audio(100))
+
+    assert cache.snapshot()["memory_entries"] == 0
+    assert cache.get("big") == _audio(100)
+    assert cache.snapshot()["disk_hits"] == 1
+
+
+def test_disk_tier_evicts_oldest_files_down_to_ninety_percent(tmp_path):
+    cache = tts.TTSCache(tmp_path, memory_bytes=0, disk_bytes=900)
+    for i in range(4):
+        cache.put(f"k{i}", _audio(200, i))
+        os.utime(cache._path(f"k{i}"), (1000 + i, 1000 + i))
+    # A hit bumps the mtime, so k0 is now the newest file.
+    assert cache.get("k0") == _audio(200, 0)
+    cache.put("k4", _audio(200, 4))
+
+    remaining = sorted(p.stem for p in tmp_path.glob("*.audio"))
+    assert remaining == ["k0", "k2", "k3", "k4"]
+    assert cache.snapshot()["disk_bytes"] == 800
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    tts.TTSCache(tmp_path).put("key", _audio(64))
+
+    fresh = tts.TTSCache(tmp_path)
+    assert fresh.snapshot()["disk_bytes"] == 64
+    assert fresh.get("key") == _audio(64)
+    assert fresh.get("key") == _audio(64)
+    snapshot = fresh.snapshot()
+    assert (snapshot["disk_hits"], snapshot["memory_hits"], snapshot["misses"]) == (1, 1, 0)
+
+
+def test_synthesizer_only_calls_backend_on_miss(tmp_path):
+    backend = tts.LocalTTSBackend()
+    synthesizer = tts.Synthesizer(backend, tts.TTSCache(tmp_path))
+
+    first = synthesizer.synthesize("Your balance is 12.50 euro.", "en-GB")
+    second = synthesizer.synthesize("Your balance is 12.50 euro.", "en-GB")
+    other_voice = synthesizer.synthesize("Your balance is 12.50 euro.", "nl-BE")
+
+    assert first == second != other_voice
+    assert backend.calls == 2